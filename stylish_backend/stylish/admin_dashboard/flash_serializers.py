@@ -94,8 +94,11 @@ class AdminFlashSaleSerializer(serializers.ModelSerializer):
     time_remaining = serializers.SerializerMethodField()
     total_products = serializers.SerializerMethodField()
     total_sold = serializers.SerializerMethodField()
-    imag_url = serializers.SerializerMethodField()
+    image_url = serializers.SerializerMethodField()
     average_order_value = serializers.SerializerMethodField()
+    minimum_order_value = serializers.DecimalField(
+        source="minimun_order_value", max_digits=6, decimal_places=2, read_only=True
+    )
 
     class Meta:
         model = FlashSale
@@ -106,7 +109,7 @@ class AdminFlashSaleSerializer(serializers.ModelSerializer):
             "image",
             "image_url",
             "discount_percentage",
-            "start_data",
+            "start_date",
             "end_date",
             "is_active",
             "status",
@@ -223,7 +223,7 @@ class FlashSaleService:
             # Base stats
             stats = {
                 'total_flash_sales': FlashSale.objects.count(), 
-                'active_flash_sales': FlashSale.objects.filter(is_active = True, start_date__lte = now, end_date_gt = now).count(), 
+                'active_flash_sales': FlashSale.objects.filter(is_active = True, start_date__lte = now, end_date__gt = now).count(), 
                 'upcoming_flash_sales': FlashSale.objects.filter(is_active = True, start_date__gt = now).count(), 
                 'expired_flash_sales': FlashSale.objects.filter(end_date__lt = now).count()
             }  
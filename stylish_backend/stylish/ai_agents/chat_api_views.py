@@ -1,4 +1,5 @@
 import json
+import time
 import uuid
 import logging
 from datetime import datetime, timedelta
@@ -40,7 +41,11 @@ from .services.chat_agent import (
 )
 from ai_agents.services.chatagent.monitoring import HealthChecker
 from ai_agents.services.chatagent.metrics import metrics_collector
-from asgiref.sync import async_to_sync, sync_to_async
+from ai_agents.services.chatagent.message_writer import message_writer
+from ai_agents.services.chatagent.retention import analytics_retention
+from ai_agents.services.chatagent.latency import latency_histogram
+from ai_agents.mcp_server.executor import run_db_task
+from asgiref.sync import async_to_sync
 
 logger = logging.getLogger(__name__)
 
@@ -152,46 +157,48 @@ class ChatQueryViewSet(viewsets.GenericViewSet):
     permission_classes = [permissions.IsAuthenticated]
     throttle_classes = [ChatAnonRateThrottle, ChatRateThrottle]
 
+    # The viewset is instantiated per request, so the active Agent row is cached on the class
+    # to keep the DB lookup off the request path. Agents themselves hold loop-bound async
+    # clients and are still built per request.
+    AGENT_MODEL_TTL = 60
+    _agent_model_cache: Dict[str, Any] = {}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.health_checker = HealthChecker()
-        self._agent_cache = {}
+
+    @classmethod
+    def _get_agent_model(cls) -> Agent:
+        """Return the active chat Agent row, refreshing the cached copy after AGENT_MODEL_TTL seconds"""
+        cached = cls._agent_model_cache.get("chat_agent_active")
+        if cached and time.monotonic() - cached[1] < cls.AGENT_MODEL_TTL:
+            return cached[0]
+
+        agent_model = Agent.objects.filter(
+            agent_type="chat_assistant", is_active=True
+        ).first()
+        if not agent_model:
+            raise ValidationError("No active chat agent available")
+        cls._agent_model_cache["chat_agent_active"] = (agent_model, time.monotonic())
+        return agent_model
 
     def get_chat_agent(self) -> ProductionChatAssistantAgent:
         """Get or create chat agent instance"""
-        cache_key = "chat_agent_active"
-        if cache_key not in self._agent_cache:
-            try:
-                agent_model = Agent.objects.filter(
-                    agent_type="chat_assistant", is_active=True
-                ).first()
-                if not agent_model:
-                    raise ValidationError("No active chat agent available")
-                self._agent_cache[cache_key] = ProductionChatAssistantAgent(agent_model)
-
-            except Exception as e:
-                logger.error(f"Failed to get chat agent: {str(e)}")
-                raise ValidationError("chat agent unavailable")
-        return self._agent_cache[cache_key]
+        try:
+            return ProductionChatAssistantAgent(self._get_agent_model())
+        except Exception as e:
+            logger.error(f"Failed to get chat agent: {str(e)}")
+            raise ValidationError("chat agent unavailable")
 
     async def get_chat_agent_async(self) -> ProductionChatAssistantAgent:
         """Async version for getting the chat agent"""
-        cache_key = "chat_agent_active"
-        if cache_key not in self._agent_cache:
-            try:
-                agent_model = await sync_to_async(
-                    lambda: Agent.objects.filter(
-                        agent_type="chat_assistant", is_active=True
-                    ).first()
-                )()
-                if not agent_model:
-                    raise ValidationError("No active chat agent available")
-                self._agent_cache[cache_key] = ProductionChatAssistantAgent(agent_model)
-
-            except Exception as e:
-                logger.error(f"Failed to get async chat agent: {str(e)}")
-                raise ValidationError("chat agent unavailable")
-        return self._agent_cache[cache_key]
+        try:
+            return ProductionChatAssistantAgent(
+                await run_db_task(self._get_agent_model)
+            )
+        except Exception as e:
+            logger.error(f"Failed to get async chat agent: {str(e)}")
+            raise ValidationError("chat agent unavailable")
 
     def create_chat_context(self, request, session_id: str = None) -> ChatContext:
         """Create ChatContext from request"""
@@ -289,6 +296,8 @@ class ChatQueryViewSet(viewsets.GenericViewSet):
 
         response["Cache-control"] = "no-cache"
         response["Connection"] = "keep-alive"
+        # Disable proxy buffering so narrative tokens reach the client as they are generated
+        response["X-Accel-Buffering"] = "no"
         response["Access-Control-Allow-Origin"] = "*"
         return response
 
@@ -448,6 +457,31 @@ class ChatAnalyticsViewSet(viewsets.GenericViewSet):
         serializer = ChatAnalyticsSerializer(analytics_data)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], permission_classes=[permissions.IsAdminUser])
+    def latency(self, request):
+        """Chat execution-time percentiles (p50/p95/p99) overall and per intent"""
+        try:
+            hours = min(max(int(request.query_params.get("hours", 24)), 1), 24 * 30)
+            minutes = min(max(int(request.query_params.get("minutes", 60)), 1), 24 * 60)
+        except ValueError:
+            return Response(
+                {"error": "hours and minutes must be integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            report = async_to_sync(latency_histogram.report)(
+                hours=hours,
+                intents=[intent.value for intent in QueryIntent],
+                minutes=minutes,
+            )
+        except Exception as e:
+            logger.error(f"Latency report failed: {str(e)}", exc_info=True)
+            return Response(
+                {"error": "Latency metrics unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response(report)
+
     def get_confidence_stats(self, message_qs):
         """Calculate confidences score statistics"""
         scores = list(message_qs.values_list("confidence_score", flat=True))
@@ -531,6 +565,9 @@ class ChatHealthViewSet(viewsets.GenericViewSet):
                 {
                     "timestamp": timezone.now().isoformat(),
                     "metrics": metrics_data,
+                    "message_persistence": message_writer.get_stats(),
+                    "analytics_keys": self.get_analytics_key_stats(),
+                    "latency": self.get_latency_stats(),
                     "uptime": self.get_uptime(),
                     "active_sessions": self.get_active_sessions_count(),
                 }
@@ -543,6 +580,22 @@ class ChatHealthViewSet(viewsets.GenericViewSet):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """Chat execution-time percentiles for the last hour and the last day"""
+        try:
+            return async_to_sync(latency_histogram.report)(hours=24, minutes=60)
+        except Exception as e:
+            logger.warning(f"Latency stats unavailable: {str(e)}")
+            return {"error": "Latency stats unavailable"}
+
+    def get_analytics_key_stats(self) -> Dict[str, Any]:
+        """Key counts and memory of the chat analytics keys in Redis"""
+        try:
+            return async_to_sync(analytics_retention.get_stats)()
+        except Exception as e:
+            logger.warning(f"Analytics key stats unavailable: {str(e)}")
+            return {"error": "Analytics key stats unavailable"}
+
     def get_active_sessions_count(self) -> int:
         """Count active sessions (sessions with activity in last hour )"""
         one_hour_ago = timezone.now() - timedelta(hours=1)
@@ -0,0 +1,117 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+
+from ai_agents.services.chat_agent import QueryIntent
+from ai_agents.services.chatagent.config import get_chat_config
+from ai_agents.services.chatagent.intent_classifier import LocalIntentClassifier
+
+
+# Labelled queries used when there is not enough stored chat history to benchmark against
+BUILTIN_SAMPLES = [
+    ("How many black t-shirts do we have in stock?", QueryIntent.INVENTORY_STATUS),
+    ("Which products are out of stock?", QueryIntent.INVENTORY_STATUS),
+    ("Show me low stock items that need a reorder", QueryIntent.INVENTORY_STATUS),
+    ("What is our current inventory level?", QueryIntent.INVENTORY_STATUS),
+    ("What were our total sales last month?", QueryIntent.SALES_DATA),
+    ("Show me sales for this week", QueryIntent.SALES_DATA),
+    ("How many items were sold today?", QueryIntent.SALES_DATA),
+    ("What is the sales trend over the last quarter?", QueryIntent.SALES_DATA),
+    ("Show product performance for the last 30 days", QueryIntent.PRODUCT_PERFORMANCE),
+    ("What are the worst performing products?", QueryIntent.PRODUCT_PERFORMANCE),
+    ("Which products are underperforming?", QueryIntent.PRODUCT_PERFORMANCE),
+    ("Which are our best selling products?", QueryIntent.TOP_PRODUCTS),
+    ("List the top selling products this month", QueryIntent.TOP_PRODUCTS),
+    ("Show me our top products and whether they are running low", QueryIntent.TOP_PRODUCTS),
+    ("What are our best sellers this week?", QueryIntent.TOP_PRODUCTS),
+    ("How many orders are pending?", QueryIntent.ORDER_STATUS),
+    ("Show me orders that are in transit", QueryIntent.ORDER_STATUS),
+    ("How many orders were delivered yesterday?", QueryIntent.ORDER_STATUS),
+    ("What is the status of recent orders?", QueryIntent.ORDER_STATUS),
+    ("Who are our top 10 customers by spending?", QueryIntent.CUSTOMER_INSIGHTS),
+    ("What is the average customer lifetime value?", QueryIntent.CUSTOMER_INSIGHTS),
+    ("Which customers are at risk of churn?", QueryIntent.CUSTOMER_INSIGHTS),
+    ("Show me our loyal buyers", QueryIntent.CUSTOMER_INSIGHTS),
+    ("Show me our revenue for Q2", QueryIntent.REVENUE_ANALYSIS),
+    ("What is our profit margin this month?", QueryIntent.REVENUE_ANALYSIS),
+    ("How much revenue did we make last year?", QueryIntent.REVENUE_ANALYSIS),
+    ("Give me a financial summary of earnings", QueryIntent.REVENUE_ANALYSIS),
+    ("Give me an overview of the business", QueryIntent.GENERAL_STATS),
+    ("How is business going?", QueryIntent.GENERAL_STATS),
+    ("Show me the dashboard summary", QueryIntent.GENERAL_STATS),
+    ("Hello, what can you do?", QueryIntent.GENERAL_STATS),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the local intent classifier offline for accuracy, LLM fallback rate and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=['history', 'builtin'], default='history', help='Evaluate on stored chat history or the built-in labelled queries')
+        parser.add_argument('--limit', type=int, default=5000, help='Maximum number of history samples to load')
+        parser.add_argument('--holdout', type=float, default=0.2, help='Fraction of history samples held out for evaluation')
+        parser.add_argument('--threshold', type=float, default=None, help='Confidence threshold for answering locally (defaults to CHAT_LOCAL_INTENT_THRESHOLD)')
+        parser.add_argument('--repeat', type=int, default=100, help='Number of timing repetitions per query')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the train/holdout split')
+
+    def handle(self, *args, **options):
+        threshold = options['threshold']
+        if threshold is None:
+            threshold = get_chat_config().local_intent_confidence_threshold
+
+        classifier = LocalIntentClassifier()
+        eval_samples = [(query, intent.value) for query, intent in BUILTIN_SAMPLES]
+
+        if options['source'] == 'history':
+            history = classifier.load_training_samples(limit=options['limit'])
+            if len(history) < classifier.min_training_samples:
+                self.stdout.write(self.style.WARNING(
+                    f'Only {len(history)} history samples found, falling back to built-in samples (rules only)'
+                ))
+            else:
+                random.Random(options['seed']).shuffle(history)
+                split = max(1, int(len(history) * options['holdout']))
+                eval_samples, train_samples = history[:split], history[split:]
+                trained = classifier.fit(train_samples)
+                self.stdout.write(f'Trained on {trained} samples, evaluating on {len(eval_samples)} held-out samples')
+
+        self.run_benchmark(classifier, eval_samples, threshold, options['repeat'])
+
+    def run_benchmark(self, classifier, samples, threshold, repeat):
+        correct = 0
+        local_answered = 0
+        local_correct = 0
+        timings = []
+
+        for query, expected in samples:
+            classification = classifier.classify(query)
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                classifier.classify(query)
+            timings.append((time.perf_counter() - start) / repeat)
+
+            is_correct = classification.intent.value == expected
+            correct += is_correct
+            if classification.confidence >= threshold:
+                local_answered += 1
+                local_correct += is_correct
+
+        total = len(samples)
+        if not total:
+            self.stdout.write(self.style.ERROR('No samples to evaluate'))
+            return
+
+        timings.sort()
+
+        def percentile(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))] * 1_000_000
+
+        self.stdout.write(self.style.SUCCESS('Local intent classifier benchmark'))
+        self.stdout.write(f'  Samples:                  {total}')
+        self.stdout.write(f'  Confidence threshold:     {threshold:.2f}')
+        self.stdout.write(f'  Top-1 accuracy (all):     {correct / total:.1%}')
+        self.stdout.write(f'  Answered locally:         {local_answered / total:.1%} ({local_answered}/{total})')
+        self.stdout.write(f'  Accuracy when local:      {(local_correct / local_answered if local_answered else 0):.1%}')
+        self.stdout.write(f'  LLM fallback rate:        {(total - local_answered) / total:.1%}')
+        self.stdout.write(f'  Latency p50/p95/p99 (us): {percentile(0.5):.1f} / {percentile(0.95):.1f} / {percentile(0.99):.1f}')
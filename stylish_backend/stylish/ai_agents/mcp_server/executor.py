@@ -0,0 +1,39 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from core.tracing import KIND_CLIENT, tracer
+
+logger = logging.getLogger(__name__)
+
+
+# Dedicated pool for MCP tool queries. Django connections are per-thread, so every worker holds its own
+# DB connection and independent tool calls run in parallel instead of queueing on the thread-sensitive executor.
+MCP_DB_POOL_SIZE = getattr(settings, "MCP_DB_POOL_SIZE", 8)
+
+_db_executor = ThreadPoolExecutor(
+    max_workers=MCP_DB_POOL_SIZE, thread_name_prefix="mcp-db"
+)
+
+
+def _call_with_connection(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking ORM function on a pool thread, recycling stale or broken connections around it"""
+    close_old_connections()
+    try:
+        with tracer.traced_queries(connection):
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db_task(func: Callable, *args, **kwargs) -> Any:
+    """Await a blocking ORM function on the dedicated MCP database pool"""
+    # sync_to_async copies the current context into the pool thread, so query spans nest under this one
+    with tracer.span(f"mcp.{func.__name__.lstrip('_')}", KIND_CLIENT):
+        return await sync_to_async(
+            _call_with_connection, thread_sensitive=False, executor=_db_executor
+        )(func, *args, **kwargs)
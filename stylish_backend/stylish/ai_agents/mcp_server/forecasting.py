@@ -0,0 +1,169 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+from django.db.models import F, QuerySet, Sum
+from django.db.models.functions import TruncDate
+
+from analytics.models import ProductSalesDaily
+from analytics.rollups import day_bounds, product_rollups_cover
+from ecommerce.models import OrderItem
+
+
+class BatchDemandForecaster:
+    """Forecasts demand for many products at once. Daily demand for every product is loaded in one query
+    into a products x days matrix; moving averages, weekly seasonality and stockout days are computed with
+    array operations instead of per-product loops"""
+
+    def __init__(
+        self,
+        short_window: int = 7,
+        long_window: int = 28,
+        short_weight: float = 0.6,
+        seasonality_prior: float = 14.0,
+    ):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.short_weight = short_weight
+        # Pseudo-count of units pulling sparse weekday profiles towards a flat profile
+        self.seasonality_prior = seasonality_prior
+
+    def load_products(self, products_qs: QuerySet) -> List[Dict[str, Any]]:
+        """Product ids, names and current stock in one joined query"""
+        return list(
+            products_qs.order_by()
+            .values("id", "name")
+            .annotate(current_stock=F("inventory__current_stock"))
+        )
+
+    def load_demand_matrix(
+        self,
+        products_qs: QuerySet,
+        product_ids: List[Any],
+        start_day: date,
+        end_day: date,
+    ) -> np.ndarray:
+        """Daily units sold per product in [start_day, end_day] as a (products, days) matrix. Reads the
+        per-product rollups when they cover the window and falls back to a single OrderItem group-by, so a
+        missing or empty per-product table never reads as zero demand
+        """
+        num_days = (end_day - start_day).days + 1
+        matrix = np.zeros((len(product_ids), num_days), dtype=np.float64)
+        if not product_ids or num_days <= 0:
+            return matrix
+
+        row_index = {product_id: row for row, product_id in enumerate(product_ids)}
+        product_filter = products_qs.order_by().values("id")
+
+        if product_rollups_cover(start_day, end_day):
+            rows = (
+                ProductSalesDaily.objects.filter(
+                    date__gte=start_day,
+                    date__lte=end_day,
+                    product_id__in=product_filter,
+                )
+                .values_list("product_id", "date", "units_sold")
+                .iterator(chunk_size=5000)
+            )
+        else:
+            start, end = day_bounds(start_day, end_day)
+            rows = (
+                OrderItem.objects.filter(
+                    order__created_at__gte=start,
+                    order__created_at__lt=end,
+                    product_id__in=product_filter,
+                )
+                .annotate(day=TruncDate("order__created_at"))
+                .values("product_id", "day")
+                .annotate(units=Sum("quantity"))
+                .order_by()
+                .values_list("product_id", "day", "units")
+                .iterator(chunk_size=5000)
+            )
+
+        product_rows, day_columns, units = [], [], []
+        for product_id, day, quantity in rows:
+            row = row_index.get(product_id)
+            if row is None:
+                continue
+            product_rows.append(row)
+            day_columns.append((day - start_day).days)
+            units.append(quantity or 0)
+
+        if units:
+            np.add.at(matrix, (np.array(product_rows), np.array(day_columns)), units)
+        return matrix
+
+    def forecast(
+        self,
+        demand: np.ndarray,
+        current_stock: np.ndarray,
+        history_start: date,
+        forecast_days: int,
+        include_seasonality: bool = True,
+    ) -> Dict[str, np.ndarray]:
+        """Vectorized forecast over a (products, days) demand matrix whose last column is the day before
+        the forecast starts"""
+        num_products, num_days = demand.shape
+        forecast_days = max(forecast_days, 1)
+
+        if num_days == 0:
+            zeros = np.zeros(num_products)
+            return {
+                "avg_daily_demand": zeros,
+                "moving_average_short": zeros,
+                "moving_average_long": zeros,
+                "daily_forecast": np.zeros((num_products, forecast_days)),
+                "forecast_demand": zeros,
+                "days_until_stockout": np.full(num_products, np.inf),
+                "weekday_index": np.ones((num_products, 7)),
+            }
+
+        avg_daily = demand.mean(axis=1)
+        ma_short = demand[:, -min(self.short_window, num_days) :].mean(axis=1)
+        ma_long = demand[:, -min(self.long_window, num_days) :].mean(axis=1)
+        base = self.short_weight * ma_short + (1 - self.short_weight) * ma_long
+
+        # Weekday multipliers: mean demand per weekday relative to the overall mean, shrunk towards 1
+        weekday_index = np.ones((num_products, 7))
+        if include_seasonality and num_days >= 7:
+            history_weekdays = (history_start.weekday() + np.arange(num_days)) % 7
+            one_hot = np.eye(7)[history_weekdays]
+            weekday_counts = one_hot.sum(axis=0)
+            weekday_means = (demand @ one_hot) / np.maximum(weekday_counts, 1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                raw_index = np.where(
+                    avg_daily[:, None] > 0, weekday_means / avg_daily[:, None], 1.0
+                )
+            totals = demand.sum(axis=1, keepdims=True)
+            confidence = totals / (totals + self.seasonality_prior)
+            weekday_index = confidence * raw_index + (1 - confidence) * 1.0
+
+        forecast_start = history_start + timedelta(days=num_days)
+        future_weekdays = (forecast_start.weekday() + np.arange(forecast_days)) % 7
+        daily_forecast = base[:, None] * weekday_index[:, future_weekdays]
+
+        # First forecast day on which cumulative demand reaches current stock
+        cumulative = np.cumsum(daily_forecast, axis=1)
+        stock = np.maximum(current_stock, 0)[:, None]
+        reached = cumulative >= stock
+        within_horizon = reached.any(axis=1)
+        first_day = np.where(stock[:, 0] > 0, reached.argmax(axis=1) + 1, 0).astype(
+            np.float64
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            beyond_horizon = stock[:, 0] / base
+        # Products without demand never stock out, whatever their stock level
+        days_until_stockout = np.where(
+            base > 0, np.where(within_horizon, first_day, beyond_horizon), np.inf
+        )
+
+        return {
+            "avg_daily_demand": avg_daily,
+            "moving_average_short": ma_short,
+            "moving_average_long": ma_long,
+            "daily_forecast": daily_forecast,
+            "forecast_demand": cumulative[:, -1],
+            "days_until_stockout": days_until_stockout,
+            "weekday_index": weekday_index,
+        }
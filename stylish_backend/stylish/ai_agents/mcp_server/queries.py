@@ -0,0 +1,116 @@
+from typing import Any, Dict
+
+from django.conf import settings
+from django.db.models import (
+    Avg,
+    Case,
+    CharField,
+    Count,
+    F,
+    Q,
+    QuerySet,
+    Sum,
+    Value,
+    When,
+)
+
+from ecommerce.models import Order, OrderItem
+
+ORDER_STATUSES = [value for value, _ in Order.STATUS_CHOICES]
+
+
+def order_metrics_aggregates() -> Dict[str, Any]:
+    """Aggregate expressions for order totals, revenue and a per-status breakdown"""
+    aggregates = {
+        "total_orders": Count("id"),
+        "total_revenue": Sum("total_amount"),
+        "avg_order_value": Avg("total_amount"),
+    }
+    for status in ORDER_STATUSES:
+        aggregates[f"status_{status}"] = Count("id", filter=Q(status=status))
+    return aggregates
+
+
+def get_order_metrics(orders_qs: QuerySet) -> Dict[str, Any]:
+    """Compute order metrics for a filtered Order queryset in a single conditional aggregate query"""
+    row = orders_qs.order_by().aggregate(**order_metrics_aggregates())
+    return {
+        "total": row["total_orders"],
+        "revenue": float(row["total_revenue"] or 0),
+        "average_order_value": float(row["avg_order_value"] or 0),
+        "by_status": {status: row[f"status_{status}"] for status in ORDER_STATUSES},
+    }
+
+
+def combine_order_metrics(*parts: Dict[str, Any]) -> Dict[str, Any]:
+    """Sum order metrics computed over disjoint ranges, e.g. rolled-up history plus today's live orders"""
+    total = sum(part["total"] for part in parts)
+    revenue = sum(part["revenue"] for part in parts)
+    by_status = {status: 0 for status in ORDER_STATUSES}
+    for part in parts:
+        for status, count in part["by_status"].items():
+            by_status[status] = by_status.get(status, 0) + count
+    return {
+        "total": total,
+        "revenue": revenue,
+        "average_order_value": revenue / total if total else 0.0,
+        "by_status": by_status,
+    }
+
+
+def get_live_product_sales(start, end) -> Dict[Any, Dict[str, Any]]:
+    """Units, revenue and order count per product straight from OrderItem, keyed like the product rollups"""
+    rows = (
+        OrderItem.objects.filter(
+            order__created_at__gte=start, order__created_at__lte=end
+        )
+        .values("product_id")
+        .annotate(
+            units=Sum("quantity"),
+            revenue=Sum(F("quantity") * F("price")),
+            orders=Count("order_id", distinct=True),
+        )
+        .order_by()
+    )
+    return {
+        row["product_id"]: {
+            "units": row["units"] or 0,
+            "revenue": float(row["revenue"] or 0),
+            "orders": row["orders"],
+        }
+        for row in rows
+    }
+
+
+def merge_product_sales(*parts: Dict[Any, Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+    """Sum per-product sales maps from disjoint ranges"""
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for part in parts:
+        for product_id, sales in part.items():
+            entry = merged.setdefault(
+                product_id, {"units": 0, "revenue": 0.0, "orders": 0}
+            )
+            entry["units"] += sales["units"]
+            entry["revenue"] += sales["revenue"]
+            entry["orders"] += sales["orders"]
+    return merged
+
+
+def stock_class_expression() -> Case:
+    """SQL CASE classifying an InventoryRecord as out_of_stock, low_stock or in_stock, matching
+    InventoryRecord.stock_status"""
+    default_threshold = getattr(settings, "LOW_STOCK_THRESHOLD", 5)
+    # stock_status uses `low_stock_threshold or default`, so a threshold of 0 falls back like NULL does
+    threshold = Case(
+        When(
+            Q(low_stock_threshold__isnull=True) | Q(low_stock_threshold=0),
+            then=Value(default_threshold),
+        ),
+        default=F("low_stock_threshold"),
+    )
+    return Case(
+        When(current_stock__lte=0, then=Value("out_of_stock")),
+        When(current_stock__lte=threshold, then=Value("low_stock")),
+        default=Value("in_stock"),
+        output_field=CharField(),
+    )
@@ -1,12 +1,30 @@
 from typing import Dict, Any, List
+import numpy as np
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db.models import Sum, Count, Avg, F, Q
-from asgiref.sync import sync_to_async
+from django.db.models import Sum, Count, Avg, F, Q, Case, When
 from .core import MCPTool
+from .executor import run_db_task
+from .forecasting import BatchDemandForecaster
+from .queries import (
+    combine_order_metrics,
+    get_live_product_sales,
+    get_order_metrics,
+    merge_product_sales,
+    stock_class_expression,
+)
 from ecommerce.models import Order, OrderItem, Product
-from authentication.models import CustomUser
 from inventory.models import StockAdjustment, InventoryRecord
+from recommendations.models import SimilarProducts
+from analytics.customers import segment_thresholds
+from analytics.models import CustomerStats
+from analytics.rollups import (
+    day_bounds,
+    get_product_sales,
+    get_sales_summary,
+    get_sales_timeline,
+    rollups_cover,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -76,69 +94,110 @@ class EcommerceMCPTools:
         else:
             start_date = end_date - timedelta(days=30)
 
-        return await sync_to_async(EcommerceMCPTools._get_sales_data)(
-            start_date, end_date, metrics, group_by
+        return await run_db_task(
+            EcommerceMCPTools._get_sales_data, start_date, end_date, metrics, group_by
         )
 
     @staticmethod
     def _get_sales_data(start_date, end_date, metrics, group_by) -> Dict[str, Any]:
-        """Get sales data with proper field access"""
+        """Get sales data. Whole past days are read from the daily sales rollups and only today is
+        aggregated live; if the rollups do not cover the period it falls back to scanning orders
+        """
         try:
-            orders_qs = (
-                Order.objects.filter(
-                    created_at__gte=start_date, created_at__lte=end_date
+            start_day = timezone.localdate(start_date)
+            today = timezone.localdate(end_date)
+            history_end = today - timedelta(days=1)
+            today_start, _ = day_bounds(today, today)
+            use_rollups = rollups_cover(start_day, history_end)
+
+            if use_rollups:
+                # Align the period to whole days so it matches the rollup granularity
+                start_date = min(start_date, day_bounds(start_day, start_day)[0])
+                live_orders = Order.objects.filter(
+                    created_at__gte=today_start, created_at__lte=end_date
                 )
-                .select_related("user")
-                .prefetch_related("items__proudct")
+                live_metrics = get_order_metrics(live_orders)
+                order_metrics = combine_order_metrics(
+                    get_sales_summary(start_day, history_end), live_metrics
+                )
+            else:
+                logger.info(
+                    f"Sales rollups missing for {start_day} to {history_end}, scanning orders"
+                )
+                order_metrics = get_order_metrics(
+                    Order.objects.filter(
+                        created_at__gte=start_date, created_at__lte=end_date
+                    )
+                )
+
+            orders_qs = Order.objects.filter(
+                created_at__gte=start_date, created_at__lte=end_date
             )
             result = {
                 "period": f"{start_date.isoformat()} to {end_date.isoformat()}",
-                "total_records": orders_qs.count(),
+                "total_records": order_metrics["total"],
+                "source": "rollup" if use_rollups else "live",
             }
 
-            if "revenue" in metrics:
-                revenue_data = orders_qs.aggregate(
-                    total_revenue=Sum("total_amount"),
-                    avg_order_value=Avg("total_amount"),
-                )
+            if "revenue" in metrics or "avg_order_value" in metrics:
                 result["revenue"] = {
-                    "total": float(revenue_data.get("total_revenue", 0) or 0),
-                    "average_order_value": float(
-                        revenue_data.get("avg_order_value", 0) or 0
-                    ),
+                    "total": order_metrics["revenue"],
+                    "average_order_value": order_metrics["average_order_value"],
                 }
 
             if "orders" in metrics:
                 result["orders"] = {
-                    "total": orders_qs.count(),
-                    "completed": orders_qs.filter(status="completed").count(),
-                    "processing": orders_qs.filter(status="processing").count(),
-                    "in_transit": orders_qs.filter(status="in_transit").count(),
-                    "on_hold": orders_qs.filter(status="on_hold").count(),
-                    "rejected": orders_qs.filter(status="rejected").count(),
+                    "total": order_metrics["total"],
+                    **order_metrics["by_status"],
                 }
 
+            live_product_sales = None
+            if use_rollups and group_by in ("day", "week", "month"):
+                live_product_sales = get_live_product_sales(today_start, end_date)
+                result["timeline"] = get_sales_timeline(
+                    start_day,
+                    history_end,
+                    group_by,
+                    live={
+                        "day": today,
+                        "revenue": live_metrics["revenue"],
+                        "orders": live_metrics["total"],
+                        "units": sum(
+                            sales["units"] for sales in live_product_sales.values()
+                        ),
+                    },
+                )
+
             if "top_products" in metrics:
-                top_products = (
-                    OrderItem.objects.filter(
-                        order__created_at__gte=start_date,
-                        order__created_at__lte=end_date,
+                if use_rollups:
+                    if live_product_sales is None:
+                        live_product_sales = get_live_product_sales(
+                            today_start, end_date
+                        )
+                    product_sales = merge_product_sales(
+                        get_product_sales(start_day, history_end), live_product_sales
                     )
-                    .values("product__name", "product__id")
-                    .annotate(
-                        total_sold=Sum("quantity"),
-                        total_revenue=Sum(F("quantity") * F("price")),
-                    )
-                    .order_by("-total_revenue")[:10]
+                else:
+                    product_sales = get_live_product_sales(start_date, end_date)
+
+                top = sorted(
+                    product_sales.items(),
+                    key=lambda item: item[1]["revenue"],
+                    reverse=True,
+                )[:10]
+                names = dict(
+                    Product.objects.filter(
+                        id__in=[product_id for product_id, _ in top]
+                    ).values_list("id", "name")
                 )
                 result["top_products"] = [
                     {
-                        "id": item["product__id"],
-                        "name": item["product__name"],
-                        "quantity_sold": item["total_sold"],
-                        "revenue": float(item["total_revenue"]),
+                        "id": product_id,
+                        "name": names.get(product_id),
+                        "quantity_sold": sales["units"],
+                        "revenue": sales["revenue"],
                     }
-                    for item in top_products
+                    for product_id, sales in top
                 ]
 
             if "customer_segments" in metrics:
@@ -177,7 +236,7 @@ class EcommerceMCPTools:
                 "properties": {
                     "product_ids": {
                         "type": "array",
-                        "items": {"type": "integer"},
+                        "items": {"type": "string"},
                         "description": "Specific product IDs to check",
                     },
                     "category": {
@@ -199,6 +258,11 @@ class EcommerceMCPTools:
                         "type": "boolean",
                         "description": "Whether to include restock recommendations",
                     },
+                    "limit": {
+                        "type": "integer",
+                        "default": 50,
+                        "description": "Maximum number of alerts returned, most urgent first",
+                    },
                 },
             },
         )
@@ -210,18 +274,25 @@ class EcommerceMCPTools:
         category = args.get("category")
         alert_level = args.get("alert_level", "all")
         include_recommendations = args.get("include_recommendations", False)
-
-        return await sync_to_async(EcommerceMCPTools._get_inventory_data)(
-            product_ids, category, alert_level, include_recommendations
+        limit = args.get("limit", 50)
+
+        return await run_db_task(
+            EcommerceMCPTools._get_inventory_data,
+            product_ids,
+            category,
+            alert_level,
+            include_recommendations,
+            limit,
         )
 
     @staticmethod
     def _get_inventory_data(
-        product_ids, category, alert_level, include_recommendations
+        product_ids, category, alert_level, include_recommendations, limit=50
     ) -> Dict[str, Any]:
-        """Get inventory data with proper model relationships"""
+        """Get inventory data. Each record is classified once in SQL; the summary comes from one conditional
+        aggregate and alerts and recommendations from one bounded result set"""
         try:
-            products_qs = Product.objects.select_related("category")
+            products_qs = Product.objects.all()
 
             if product_ids:
                 products_qs = products_qs.filter(id__in=product_ids)
@@ -231,57 +302,72 @@ class EcommerceMCPTools:
 
             inventory_records = InventoryRecord.objects.filter(
                 product__in=products_qs
-            ).select_related("product", "product__category")
+            ).annotate(stock_class=stock_class_expression())
 
-            alerts = []
+            alert_types = [
+                alert_type
+                for alert_type in ("out_of_stock", "low_stock")
+                if alert_level in (alert_type, "all")
+            ]
 
-            if alert_level in ["low_stock", "all"]:
-                low_stock_items = inventory_records.filter(
-                    current_stock__lte=F("low_stock_threshold"), current_stock__gt=0
-                )
+            inventory_stats = inventory_records.aggregate(
+                total_products=Count("id"),
+                total_stock_value=Sum(F("current_stock") * F("product__cost")),
+                out_of_stock=Count("id", filter=Q(stock_class="out_of_stock")),
+                low_stock=Count("id", filter=Q(stock_class="low_stock")),
+            )
+            alert_count = sum(inventory_stats[alert_type] for alert_type in alert_types)
 
-                alerts.extend(
-                    [
-                        {
-                            "type": "low_stock",
-                            "product_id": str(inv.product.id),
-                            "product_name": inv.product.name,
-                            "current_stock": inv.current_stock,
-                            "threshold": inv.low_stock_threshold,
-                            "category": (
-                                inv.product.category.name
-                                if inv.product.category
-                                else None
-                            ),
-                        }
-                        for inv in low_stock_items
-                    ]
+            alert_rows = (
+                inventory_records.filter(stock_class__in=alert_types)
+                .order_by(
+                    Case(When(stock_class="out_of_stock", then=0), default=1),
+                    "current_stock",
                 )
+                .values(
+                    "stock_class",
+                    "current_stock",
+                    "low_stock_threshold",
+                    "reorder_quantity",
+                    "product_id",
+                    "product__name",
+                    "product__cost",
+                    "product__category__name",
+                )[:limit]
+                if alert_types
+                else []
+            )
 
-            if alert_level in ["out_of_stock", "all"]:
-                out_of_stock_items = inventory_records.filter(current_stock=0)
+            alerts = []
+            recommendations = []
+            for row in alert_rows:
+                alert = {
+                    "type": row["stock_class"],
+                    "product_id": str(row["product_id"]),
+                    "product_name": row["product__name"],
+                    "current_stock": row["current_stock"],
+                    "category": row["product__category__name"],
+                }
+                if row["stock_class"] == "low_stock":
+                    alert["threshold"] = row["low_stock_threshold"]
+                alerts.append(alert)
 
-                alerts.extend(
-                    [
+                if include_recommendations and row["reorder_quantity"]:
+                    recommendations.append(
                         {
-                            "type": "out_of_stock",
-                            "product_id": str(inv.product.id),
-                            "product_name": inv.product.name,
-                            "current_stock": 0,
-                            "category": (
-                                inv.product.category.name
-                                if inv.product.category
-                                else None
+                            "product_id": alert["product_id"],
+                            "product_name": alert["product_name"],
+                            "recommended_quantity": row["reorder_quantity"],
+                            "estimated_cost": float(
+                                row["product__cost"] * row["reorder_quantity"]
+                            ),
+                            "priority": (
+                                "high"
+                                if row["stock_class"] == "out_of_stock"
+                                else "medium"
                             ),
                         }
-                        for inv in out_of_stock_items
-                    ]
-                )
-
-            inventory_stats = inventory_records.aggregate(
-                total_products=Count("id"),
-                total_stock_value=Sum(F("current_stock") * F("product__cost")),
-            )
+                    )
 
             result = {
                 "summary": {
@@ -289,40 +375,15 @@ class EcommerceMCPTools:
                     "total_stock_value": float(
                         inventory_stats.get("total_stock_value", 0) or 0
                     ),
-                    "alert_count": len(alerts),
+                    "alert_count": alert_count,
+                    "out_of_stock": inventory_stats["out_of_stock"],
+                    "low_stock": inventory_stats["low_stock"],
                 },
                 "alerts": alerts,
+                "alerts_truncated": alert_count > len(alerts),
             }
 
             if include_recommendations:
-                recommendations = []
-
-                for alert in alerts:
-                    if alert["type"] in ["low_stock", "out_of_stock"]:
-                        try:
-                            inventory = InventoryRecord.objects.get(
-                                product__id=alert["product_id"]
-                            )
-                            recommendations.append(
-                                {
-                                    "product_id": alert["product_id"],
-                                    "product_name": alert["product_name"],
-                                    "recommended_quantity": inventory.reorder_quantity,
-                                    "estimated_cost": float(
-                                        inventory.product.cost
-                                        * inventory.reorder_quantity
-                                    ),
-                                    "priority": (
-                                        "high"
-                                        if alert["type"] == "out_of_stock"
-                                        else "medium"
-                                    ),
-                                }
-                            )
-
-                        except InventoryRecord.DoesNotExist:
-                            continue
-
                 result["recommendations"] = recommendations
 
             return result
@@ -383,78 +444,104 @@ class EcommerceMCPTools:
         analysis_type = args.get("analysis_type", "behavior")
         time_period = args.get("time_period", "90days")
 
-        return await sync_to_async(EcommerceMCPTools._get_customer_data)(
-            segment, analysis_type, time_period
+        return await run_db_task(
+            EcommerceMCPTools._get_customer_data, segment, analysis_type, time_period
         )
 
     @staticmethod
     def _get_customer_data(segment, analysis_type, time_period) -> Dict[str, Any]:
-        """Get customer data (sync method)"""
-        end_date = timezone.now()
-        if time_period == "30days":
-            start_date = end_date - timedelta(days=30)
-        elif time_period == "90days":
-            start_date = end_date - timedelta(days=90)
-        elif time_period == "1year":
-            start_date = end_date - timedelta(days=365)
-        else:
-            start_date = None
-
-        customers_qs = CustomUser.objects.filter(is_active=True)
-
-        customer_stats = customers_qs.annotate(
-            total_orders=Count("orders"),
-            total_spent=Sum("orders__total_amount"),
-            avg_order_value=Avg("orders__total_amount"),
-        ).filter(total_orders__gt=0)
-
-        if start_date:
-            customer_stats = customer_stats.filter(orders__created_at__gte=start_date)
+        """Get customer data (sync method). Reads the precomputed CustomerStats table; segments and the
+        time period are range lookups on its indexed columns. Totals are lifetime values, the time period
+        selects customers who ordered within it. At-risk customers are defined by not having ordered
+        recently, so the period is not applied to that segment
+        """
+        try:
+            now = timezone.now()
+            period_days = {"30days": 30, "90days": 90, "1year": 365}.get(time_period)
+            thresholds = segment_thresholds()
 
-        if segment == "high_value":
-            customer_stats = customer_stats.filter(total_spent__gte=1000)
+            customer_stats = CustomerStats.objects.filter(user__is_active=True)
 
-        elif segment == "frequent_buyers":
-            customer_stats = customer_stats.filter(total_orders__gte=5)
-        elif segment == "new_customers":
-            customer_stats = customer_stats.filter(
-                date_joined__gte=timezone.now - timedelta(days=30)
-            )
+            if period_days and segment != "at_risk":
+                customer_stats = customer_stats.filter(
+                    last_order_at__gte=now - timedelta(days=period_days)
+                )
 
-        result = {
-            "segment": segment,
-            "analysis_type": analysis_type,
-            "time_period": time_period,
-            "total_customers": customer_stats.count(),
-        }
+            if segment == "high_value":
+                customer_stats = customer_stats.filter(
+                    total_spent__gte=thresholds["high_value_spend"]
+                )
+            elif segment == "frequent_buyers":
+                customer_stats = customer_stats.filter(
+                    total_orders__gte=thresholds["frequent_orders"]
+                )
+            elif segment == "new_customers":
+                customer_stats = customer_stats.filter(
+                    first_order_at__gte=now
+                    - timedelta(days=thresholds["new_customer_days"])
+                )
+            elif segment == "at_risk":
+                customer_stats = customer_stats.filter(
+                    last_order_at__lt=now - timedelta(days=thresholds["at_risk_days"])
+                )
 
-        if analysis_type == "ltv":
             ltv_stats = customer_stats.aggregate(
-                avg__ltv=Avg("total_spent"),
+                total_customers=Count("id"),
+                avg_ltv=Avg("total_spent"),
                 total_ltv=Sum("total_spent"),
                 avg_orders=Avg("total_orders"),
             )
 
-            result["lifetime_value"] = {
-                "average": float(ltv_stats.get("avg_ltv", 0) or 0),
-                "total": float(ltv_stats.get("total_ltv", 0) or 0),
-                "average_orders": float(ltv_stats.get("avg_orders", 0) or 0),
+            result = {
+                "segment": segment,
+                "analysis_type": analysis_type,
+                "time_period": time_period,
+                "total_customers": ltv_stats["total_customers"],
             }
 
-        if analysis_type == "behavior":
-            top_customers = customer_stats.order_by("-total_spent")[:10]
-            result["top_customers"] = [
-                {
-                    "id": c.id,
-                    "username": c.username,
-                    "total_orders": c.total_orders,
-                    "total_spent": float(c.total_spent or 0),
-                    "avg_order_value": float(c.avg_order_value or 0),
+            if analysis_type == "ltv":
+                result["lifetime_value"] = {
+                    "average": float(ltv_stats.get("avg_ltv", 0) or 0),
+                    "total": float(ltv_stats.get("total_ltv", 0) or 0),
+                    "average_orders": float(ltv_stats.get("avg_orders", 0) or 0),
                 }
-                for c in top_customers
-            ]
 
-        return result
+            if analysis_type == "behavior":
+                top_customers = customer_stats.select_related("user").order_by(
+                    "-total_spent"
+                )[:10]
+                result["top_customers"] = [
+                    {
+                        "id": c.user_id,
+                        "username": c.user.username,
+                        "total_orders": c.total_orders,
+                        "total_spent": float(c.total_spent),
+                        "avg_order_value": float(c.avg_order_value),
+                        "last_order_at": (
+                            c.last_order_at.isoformat() if c.last_order_at else None
+                        ),
+                        "segment": c.segment,
+                        "rfm": f"{c.recency_score}{c.frequency_score}{c.monetary_score}",
+                    }
+                    for c in top_customers
+                ]
+                result["segment_distribution"] = {
+                    row["segment"]: row["count"]
+                    for row in customer_stats.values("segment")
+                    .annotate(count=Count("id"))
+                    .order_by()
+                }
+
+            return result
+        except Exception as e:
+            logger.error(f"Error in _get_customer_data: {str(e)}")
+            return {
+                "error": str(e),
+                "segment": segment,
+                "analysis_type": analysis_type,
+                "time_period": time_period,
+                "total_customers": 0,
+            }
 
     @staticmethod
     def get_order_management_tool() -> MCPTool:
@@ -504,17 +591,19 @@ class EcommerceMCPTools:
         customer_id = args.get("customer_id")
         analytics = args.get("analytics", False)
 
-        return await sync_to_async(EcommerceMCPTools._get_order_data)(
-            status, date_range, customer_id, analytics
+        return await run_db_task(
+            EcommerceMCPTools._get_order_data,
+            status,
+            date_range,
+            customer_id,
+            analytics,
         )
 
     @staticmethod
     def _get_order_data(status, date_range, customer_id, analytics) -> Dict[str, Any]:
         """Get order data with proper status handling"""
         try:
-            orders_qs = Order.objects.select_related("user").prefetch_related(
-                "items__product"
-            )
+            orders_qs = Order.objects.all()
 
             status_mapping = {
                 "pending": "processing",
@@ -539,8 +628,9 @@ class EcommerceMCPTools:
             if customer_id:
                 orders_qs = orders_qs.filter(user_id=customer_id)
 
+            order_metrics = get_order_metrics(orders_qs)
             result = {
-                "total_orders": orders_qs.count(),
+                "total_orders": order_metrics["total"],
                 "filters": {
                     "status": status,
                     "date_range": date_range,
@@ -549,26 +639,25 @@ class EcommerceMCPTools:
             }
 
             if analytics:
-                status_dist = (
-                    orders_qs.values("status")
-                    .annotate(count=Count("id"))
-                    .order_by("-count")
-                )
-                result["status_distribution"] = list(status_dist)
-
-                revenue_stats = orders_qs.aggregate(
-                    total_revenue=Sum("total_amount"),
-                    avg_order_value=Avg("total_amount"),
+                result["status_distribution"] = sorted(
+                    (
+                        {"status": order_status, "count": count}
+                        for order_status, count in order_metrics["by_status"].items()
+                        if count
+                    ),
+                    key=lambda item: item["count"],
+                    reverse=True,
                 )
-
                 result["revenue_analytics"] = {
-                    "total": float(revenue_stats.get("total_revenue", 0) or 0),
-                    "average_order_value": float(
-                        revenue_stats.get("avg_order_value", 0) or 0
-                    ),
+                    "total": order_metrics["revenue"],
+                    "average_order_value": order_metrics["average_order_value"],
                 }
 
-            recent_orders = orders_qs.order_by("-created_at")[:10]
+            recent_orders = (
+                orders_qs.select_related("user")
+                .annotate(items_count=Count("items"))
+                .order_by("-created_at")[:10]
+            )
             result["recent_orders"] = [
                 {
                     "id": str(order.id),
@@ -576,7 +665,7 @@ class EcommerceMCPTools:
                     "status": order.status,
                     "total_amount": float(order.total_amount),
                     "created_at": order.created_at.isoformat(),
-                    "items_count": order.items.count(),
+                    "items_count": order.items_count,
                 }
                 for order in recent_orders
             ]
@@ -608,8 +697,8 @@ class EcommerceMCPTools:
                         "description": "Customer ID to generate recommendations for",
                     },
                     "product_id": {
-                        "type": "integer",
-                        "description": "Product ID to finel similar products for",
+                        "type": "string",
+                        "description": "Product ID to find similar products for",
                     },
                     "category": {
                         "type": "string",
@@ -644,76 +733,157 @@ class EcommerceMCPTools:
         limit = args.get("limit", 10)
         recommendation_type = args.get("recommendation_type", "personal")
 
-        return await sync_to_async(EcommerceMCPTools._get_product_recommendations)(
-            customer_id, product_id, category, limit, recommendation_type
+        return await run_db_task(
+            EcommerceMCPTools._get_product_recommendations,
+            customer_id,
+            product_id,
+            category,
+            limit,
+            recommendation_type,
         )
 
     @staticmethod
     def _get_product_recommendations(
         customer_id, product_id, category, limit, recommendation_type
     ) -> Dict[str, any]:
-        """Get product recommendations (sync method)"""
+        """Get product recommendations (sync method). Personal recommendations rank products by the
+        customer's precomputed category affinities in UserPreferences; similar recommendations are indexed
+        reads of the co-purchase neighbours in SimilarProducts. Both fall back to order history when the
+        precomputed tables have nothing for the customer or product yet"""
         recommendations = []
 
         if recommendation_type == "personal" and customer_id:
-            # Get customer's purchase history
-            customer_orders = Order.objects.filter(
-                user_id=customer_id, status="completed"
-            ).prefetch_related("items__product")
-
-            # Find products frequently bought together
-            purchased_products = set()
-            for order in customer_orders:
-                for item in order.items.all():
-                    purchased_products.add(item.product.id)
-
-            # Get similar products based on category and price range
-            if purchased_products:
-                similar_products = Product.objects.filter(
-                    category__in=Product.objects.filter(
-                        id__in=purchased_products
-                    ).values_list("category_id", flat=True)
-                ).exclude(id__in=purchased_products)[:limit]
+            purchased = OrderItem.objects.filter(
+                order__user_id=customer_id, order__status="completed"
+            ).values("product_id")
+            candidates = (
+                Product.objects.filter(
+                    is_active=True, category__userpreferences__user_id=customer_id
+                )
+                .exclude(id__in=purchased)
+                .annotate(preference=F("category__userpreferences__weight"))
+                .values("id", "name", "price", "category__name", "preference")
+                .order_by("-preference", "-rating", "-reviews_count")[:limit]
+            )
+            recommendations = [
+                {
+                    "product_id": row["id"],
+                    "name": row["name"],
+                    "price": float(row["price"]),
+                    "category": row["category__name"],
+                    "preference_score": round(row["preference"], 4),
+                    "reason": f"Matches your interest in {row['category__name']}",
+                }
+                for row in candidates
+            ]
+
+        if recommendation_type == "personal" and customer_id and not recommendations:
+            purchased_products = set(
+                OrderItem.objects.filter(
+                    order__user_id=customer_id, order__status="completed"
+                )
+                .values_list("product_id", flat=True)
+                .distinct()
+            )
 
+            if purchased_products:
+                neighbours = (
+                    SimilarProducts.objects.filter(product_id__in=purchased_products)
+                    .exclude(similar_product_id__in=purchased_products)
+                    .values(
+                        "similar_product_id",
+                        "similar_product__name",
+                        "similar_product__price",
+                        "similar_product__category__name",
+                    )
+                    .annotate(score=Sum("similarity_score"))
+                    .order_by("-score")[:limit]
+                )
                 recommendations = [
                     {
-                        "product_id": p.id,
-                        "name": p.name,
-                        "price": float(p.price),
-                        "category": p.category.name if p.category else None,
-                        "reason": "Based on your purchase history",
+                        "product_id": row["similar_product_id"],
+                        "name": row["similar_product__name"],
+                        "price": float(row["similar_product__price"]),
+                        "category": row["similar_product__category__name"],
+                        "similarity_score": round(row["score"], 4),
+                        "reason": "Frequently bought with your past purchases",
                     }
-                    for p in similar_products
+                    for row in neighbours
                 ]
 
-            elif recommendation_type == "trending":
-                # Get trending products based on recent sales
-                trending = (
-                    OrderItem.objects.filter(
-                        order__created_at__gte=timezone.now() - timedelta(days=30)
+                if not recommendations:
+                    similar_products = (
+                        Product.objects.filter(
+                            category__in=Product.objects.filter(
+                                id__in=purchased_products
+                            ).values("category_id")
+                        )
+                        .exclude(id__in=purchased_products)
+                        .select_related("category")[:limit]
                     )
-                    .values("product__id", "product__name", "product__price")
-                    .annotate(total_sold=Sum("quantity"))
-                    .order_by("-total_sold")[:limit]
+                    recommendations = [
+                        {
+                            "product_id": p.id,
+                            "name": p.name,
+                            "price": float(p.price),
+                            "category": p.category.name if p.category else None,
+                            "reason": "Based on your purchase history",
+                        }
+                        for p in similar_products
+                    ]
+
+        elif recommendation_type == "trending":
+            # Get trending products based on recent sales
+            trending = (
+                OrderItem.objects.filter(
+                    order__created_at__gte=timezone.now() - timedelta(days=30)
                 )
+                .values("product__id", "product__name", "product__price")
+                .annotate(total_sold=Sum("quantity"))
+                .order_by("-total_sold")[:limit]
+            )
 
-                recommendations = [
-                    {
-                        "product_id": item["product__id"],
-                        "name": item["product__name"],
-                        "price": float(item["product__price"]),
-                        "total_sold": item["total_sold"],
-                        "reason": "Trending product",
-                    }
-                    for item in trending
-                ]
+            recommendations = [
+                {
+                    "product_id": item["product__id"],
+                    "name": item["product__name"],
+                    "price": float(item["product__price"]),
+                    "total_sold": item["total_sold"],
+                    "reason": "Trending product",
+                }
+                for item in trending
+            ]
 
-            elif recommendation_type == "similar" and product_id:
+        elif recommendation_type == "similar" and product_id:
+            neighbours = (
+                SimilarProducts.objects.filter(product_id=product_id)
+                .select_related("similar_product__category")
+                .order_by("-similarity_score")[:limit]
+            )
+            recommendations = [
+                {
+                    "product_id": n.similar_product_id,
+                    "name": n.similar_product.name,
+                    "price": float(n.similar_product.price),
+                    "category": (
+                        n.similar_product.category.name
+                        if n.similar_product.category
+                        else None
+                    ),
+                    "similarity_score": round(n.similarity_score, 4),
+                    "reason": "Frequently bought together",
+                }
+                for n in neighbours
+            ]
+
+            if not recommendations:
                 try:
                     base_product = Product.objects.get(id=product_id)
-                    similar_products = Product.objects.filter(
-                        category=base_product.category
-                    ).exclude(id=product_id)[:limit]
+                    similar_products = (
+                        Product.objects.filter(category=base_product.category)
+                        .exclude(id=product_id)
+                        .select_related("category")[:limit]
+                    )
 
                     recommendations = [
                         {
@@ -729,11 +899,11 @@ class EcommerceMCPTools:
                 except Product.DoesNotExist:
                     pass
 
-            return {
-                "recommendation_type": recommendation_type,
-                "total_recommendations": len(recommendations),
-                "recommendations": recommendations,
-            }
+        return {
+            "recommendation_type": recommendation_type,
+            "total_recommendations": len(recommendations),
+            "recommendations": recommendations,
+        }
 
     @staticmethod
     def get_inventory_forecast_tool() -> MCPTool:
@@ -745,7 +915,7 @@ class EcommerceMCPTools:
                 "type": "object",
                 "properties": {
                     "product_id": {
-                        "type": "integer",
+                        "type": "string",
                         "description": "Specific product ID to forecast",
                     },
                     "category": {
@@ -767,6 +937,11 @@ class EcommerceMCPTools:
                         "default": True,
                         "description": "Whether to include seasonal patterns",
                     },
+                    "limit": {
+                        "type": "integer",
+                        "default": 50,
+                        "description": "Maximum number of products returned, most urgent first",
+                    },
                 },
             },
         )
@@ -779,73 +954,87 @@ class EcommerceMCPTools:
         forecast_days = args.get("forecast_days", 30)
         historical_days = args.get("historical_days", 90)
         include_seasonality = args.get("include_seasonality", True)
-
-        return await sync_to_async(EcommerceMCPTools._get_inventory_forecast)(
-            product_id, category, forecast_days, historical_days, include_seasonality
+        limit = args.get("limit", 50)
+
+        return await run_db_task(
+            EcommerceMCPTools._get_inventory_forecast,
+            product_id,
+            category,
+            forecast_days,
+            historical_days,
+            include_seasonality,
+            limit,
         )
 
     @staticmethod
     def _get_inventory_forecast(
-        product_id, category, forecast_days, historical_days, include_seasonality
+        product_id,
+        category,
+        forecast_days,
+        historical_days,
+        include_seasonality,
+        limit=50,
     ) -> Dict[str, Any]:
-        """Get inventory forecast (sync method)"""
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=historical_days)
-
+        """Get inventory forecast (sync method). Forecasts every matching product in one batch and
+        returns the `limit` products closest to a stockout"""
         if product_id:
             products_qs = Product.objects.filter(id=product_id)
         elif category:
-            products_qs = Product.objects.filter(category__name__icontains=category)
-        else:
-            products_qs = Product.objects.all()[:10]
-
-        forecasts = []
-
-        for product in products_qs:
-            historical_sales = (
-                OrderItem.objects.filter(
-                    product=product,
-                    order__created_at__gte=start_date,
-                    order__created_at__lte=end_date,
-                )
-                .values("order__created_at__date")
-                .annotate(daily_quantity=Sum("quantity"))
-                .order_by("order__created_at__date")
+            products_qs = Product.objects.filter(
+                category__name__icontains=category, is_active=True
             )
+        else:
+            products_qs = Product.objects.filter(is_active=True)
 
-            total_sold = sum(item["daily_quantity"] for item in historical_sales)
-            avg_daily_demand = (
-                total_sold / historical_days if historical_days > 0 else 0
-            )
+        # Whole days of history ending yesterday, so a partial today does not skew the averages
+        history_end = timezone.localdate() - timedelta(days=1)
+        history_start = history_end - timedelta(days=max(historical_days, 1) - 1)
 
-            forecast_demand = avg_daily_demand * forecast_days
+        forecaster = BatchDemandForecaster()
+        products = forecaster.load_products(products_qs)
+        product_ids = [product["id"] for product in products]
+        current_stock = np.array(
+            [product["current_stock"] or 0 for product in products], dtype=np.float64
+        )
+        demand = forecaster.load_demand_matrix(
+            products_qs, product_ids, history_start, history_end
+        )
+        result = forecaster.forecast(
+            demand, current_stock, history_start, forecast_days, include_seasonality
+        )
 
-            current_stock = getattr(product.inventory, "current_stock", 0)
-            days_until_stockout = (
-                current_stock / avg_daily_demand
-                if avg_daily_demand > 0
-                else float("inf")
-            )
+        days_until_stockout = np.minimum(result["days_until_stockout"], 365)
+        recommended_reorder = np.maximum(0, result["forecast_demand"] - current_stock)
+        risk_levels = np.where(
+            days_until_stockout < 7,
+            "high",
+            np.where(days_until_stockout < 30, "medium", "low"),
+        )
 
-            forecasts.append(
-                {
-                    "product_id": product.id,
-                    "product_name": product.name,
-                    "current_stock": current_stock,
-                    "avg_daily_demand": round(avg_daily_demand, 2),
-                    "forecast_demand": round(forecast_demand, 2),
-                    "days_until_stockout": min(days_until_stockout, 365),
-                    "recommended_reorder": max(0, forecast_demand - current_stock),
-                    "risk_level": (
-                        "high"
-                        if days_until_stockout < 7
-                        else "medium" if days_until_stockout < 30 else "low"
-                    ),
-                }
-            )
+        order = np.argsort(days_until_stockout, kind="stable")[:limit]
+        forecasts = [
+            {
+                "product_id": str(products[i]["id"]),
+                "product_name": products[i]["name"],
+                "current_stock": int(current_stock[i]),
+                "avg_daily_demand": round(float(result["avg_daily_demand"][i]), 2),
+                "moving_average_7d": round(float(result["moving_average_short"][i]), 2),
+                "moving_average_28d": round(float(result["moving_average_long"][i]), 2),
+                "forecast_demand": round(float(result["forecast_demand"][i]), 2),
+                "days_until_stockout": round(float(days_until_stockout[i]), 1),
+                "recommended_reorder": round(float(recommended_reorder[i]), 2),
+                "risk_level": str(risk_levels[i]),
+            }
+            for i in order
+        ]
 
+        risk_labels, risk_counts = np.unique(risk_levels, return_counts=True)
         return {
             "forecast_period": f"{forecast_days} days",
             "historical_period": f"{historical_days} days",
+            "products_forecasted": len(products),
+            "risk_summary": {
+                str(label): int(count) for label, count in zip(risk_labels, risk_counts)
+            },
             "forecasts": forecasts,
         }
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.partitioning import partition_table, unpartition_table
+
+
+def partition_chat_messages(apps, schema_editor):
+    table = apps.get_model("ai_agents", "ChatMessage")._meta.db_table
+    partition_table(schema_editor, table, "created_at")
+
+
+def unpartition_chat_messages(apps, schema_editor):
+    table = apps.get_model("ai_agents", "ChatMessage")._meta.db_table
+    unpartition_table(schema_editor, table, "created_at")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai_agents", "0004_rename_metadat_chatmessage_metadata"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="chatfeedback",
+            name="message",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="feedback",
+                to="ai_agents.chatmessage",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="chatmessage",
+            name="parent_message",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="replies",
+                to="ai_agents.chatmessage",
+            ),
+        ),
+        migrations.RunPython(partition_chat_messages, unpartition_chat_messages),
+    ]
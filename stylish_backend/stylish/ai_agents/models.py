@@ -177,8 +177,15 @@ class ChatMessage(models.Model):
     )
 
     # Message threading
+    # ChatMessage is range partitioned by created_at, so its id alone cannot back a database-level foreign
+    # key; the cascade is enforced by Django
     parent_message = models.ForeignKey(
-        "self", on_delete=models.CASCADE, null=True, blank=True, related_name="replies"
+        "self",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="replies",
+        db_constraint=False,
     )
     execution_time = models.FloatField(
         default=0.0, help_text="Query processing time in seconds"
@@ -257,7 +264,10 @@ class ChatFeedback(models.Model):
     ]
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     message = models.ForeignKey(
-        ChatMessage, on_delete=models.CASCADE, related_name="feedback"
+        ChatMessage,
+        on_delete=models.CASCADE,
+        related_name="feedback",
+        db_constraint=False,
     )
     user = models.ForeignKey(
         "authentication.CustomUser",
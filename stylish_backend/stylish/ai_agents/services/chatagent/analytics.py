@@ -1,6 +1,10 @@
 import logging
 from django.utils import timezone
+from analytics.uniques import CHAT_USERS, add_to_pipeline, day_key
+from ai_agents.services.chat_agent import QueryIntent
+from .latency import latency_histogram
 from .redis_manager import redis_manager
+from .retention import analytics_retention
 
 logger = logging.getLogger(__name__)
 
@@ -33,30 +37,41 @@ class AnalyticsTracker:
             pipe = redis_client.pipeline(transaction=True)
             
             try:
+                total_key = f"chat_analytics:queries:total:{date_str}"
+                intent_key = f"chat_analytics:queries:intent:{intent.value}:{date_str}"
+                hourly_key = f"chat_analytics:queries:hourly:{hour_str}"
+                user_key = f"chat_analytics:user_queries:{context.user_id}:{date_str}"
+                
                 # Daily metrics
-                pipe.incr(f"chat_analytics:queries:total:{date_str}")
-                pipe.incr(f"chat_analytics:queries:intent:{intent.value}:{date_str}")
-                pipe.incr(f"chat_analytics:users:active:{date_str}")
+                pipe.incr(total_key)
+                pipe.incr(intent_key)
+                
+                # Distinct active users (HyperLogLog); a counter here would count queries, not users
+                add_to_pipeline(pipe, CHAT_USERS, [context.user_id])
                 
                 # Hourly metrics
-                pipe.incr(f"chat_analytics:queries:hourly:{hour_str}")
+                pipe.incr(hourly_key)
                 
-                # Execution time tracking
-                pipe.lpush("chat_analytics:execution_times", execution_time)
-                pipe.ltrim("chat_analytics:execution_times", 0, 999)
+                # Execution time histograms (per minute, per hour and per intent)
+                latency_keys = latency_histogram.record(pipe, intent.value, execution_time)
                 
                 # user-specific metrics
-                pipe.incr(f"chat_analytics:user_queries:{context.user_id}:{date_str}")
+                pipe.incr(user_key)
                 
                 
                 # set expiration for daily keys (30 days)
                 
-                pipe.expire(f"chat_analytics:queries:total:{date_str}", 30*24*3600)
-                pipe.expire(f"chat_analytics:queries:intent:{intent.value}:{date_str}", 30*24*3600)
-                pipe.expire(f"chat_analytics:queries:hourly:{hour_str}",7 * 24 *3600) 
-                pipe.expire(f"chat_analytics:users:active:{date_str}", 30*24*3600)
+                pipe.expire(total_key, 30*24*3600)
+                pipe.expire(intent_key, 30*24*3600)
+                pipe.expire(hourly_key, 7 * 24 *3600) 
+                
+                pipe.expire(user_key, 30*24*3600)
                 
-                pipe.expire(f"chat_analytics:user_queries:{context.user_id}:{date_str}", 30*24*3600)
+                # Record the dated keys in the day's index so cleanup never has to scan the keyspace
+                analytics_retention.track(
+                    pipe, date_str,
+                    [total_key, intent_key, hourly_key, user_key, day_key(CHAT_USERS, timezone.localdate())] + latency_keys
+                )
                 
                 
                 # Execute all operations
@@ -87,17 +102,21 @@ class AnalyticsTracker:
                 summary = {}
                 
                 dates = []
+                user_keys = []
                 
                 for i in range(days):
-                    date = (timezone.now() - timezone.timedelta(days = i)).strftime('%Y-%m-%d')
-                    dates.append(date)
+                    day = timezone.now() - timezone.timedelta(days = i)
+                    dates.append(day.strftime('%Y-%m-%d'))
+                    user_keys.append(day_key(CHAT_USERS, timezone.localdate(day)))
                     
                 pipe = redis_client.pipeline()
                 
                 for date in dates:
                     pipe.get(f"chat_analytics:queries:total:{date}")
-                    
-                pipe.lrange("chat_analytics:execution_times", 0, 99) 
+                for key in user_keys:
+                    pipe.pfcount(key)
+                # Multi-key PFCOUNT counts the union, so users active on several days are counted once
+                pipe.pfcount(*user_keys)
                 
                 results = await pipe.execute()
                 
@@ -106,17 +125,20 @@ class AnalyticsTracker:
                 daily_queries = []
                 for i, date in enumerate(dates):
                     count = int(results[i] or 0)
-                    daily_queries.append({'date': date, 'queries': count})
+                    active_users = int(results[days + i] or 0)
+                    daily_queries.append({'date': date, 'queries': count, 'active_users': active_users})
                     
-                execution_times = [float(e) for t in results[-1] if t]
-                avg_execution_time = sum(execution_times)/ len(execution_times) if execution_times else 0
+                latency = await latency_histogram.report(
+                    hours = days * 24, intents = [intent.value for intent in QueryIntent], redis_client = redis_client
+                )
                 
                 summary = {
                     'period_days': days, 
                     'daily_queries': daily_queries,
                     'total_queries': sum(day['queries'] for day in daily_queries), 
-                    'avg_execution_time': round(avg_execution_time, 3), 
-                    'execution_times_sample': execution_times[:10]
+                    'unique_users': int(results[2 * days] or 0), 
+                    'avg_execution_time': round(latency['overall']['mean'], 3), 
+                    'latency': latency
                 } 
                 
                 return summary
@@ -128,27 +150,14 @@ class AnalyticsTracker:
                 'period_days': days
             }       
             
-    async def cleanup_old_data(self, days_to_keep : int = 30):
-        """Clean up old analytics data"""
+    async def cleanup_old_data(self, days_to_keep : int = 30, sweep_unindexed: bool = False):
+        """Clean up analytics data dated before the retention cutoff via the per-day key indexes"""
         
         try:
-            async with self.redis_manager.get_connection() as redis_client:
-                cutoff_date = (timezone.now()-timezone.timedelta(days=days_to_keep)).strftime('%Y-%m-%d')
-                
-                pattern = 'chat_analytics:*'
-                keys = await redis_client.keys(pattern)
-                
-                deleted_count = 0
-                for key in keys:
-                    key_str = key.decode() if isinstance(key, bytes) else key
-                    if any(old_date in key_str for old_date in [cutoff_date]):
-                        await redis_client.delete(key)
-                        deleted_count += 1
-                        
-                logger.info(f"Cleaned up {deleted_count} old analytics keys")
-                return deleted_count
+            stats = await analytics_retention.cleanup(days_to_keep, sweep_unindexed=sweep_unindexed)
+            logger.info(f"Cleaned up {stats['keys_removed'] + stats['unindexed_removed']} old analytics keys")
+            return stats['keys_removed'] + stats['unindexed_removed']
         
         except Exception as e:
             logger.error(f"Analytics cleanup failed: {str(e)}")
             return 0
-        
\ No newline at end of file
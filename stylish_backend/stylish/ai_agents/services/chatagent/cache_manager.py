@@ -10,7 +10,7 @@ from ai_agents.services.chat_agent import ChatResponse
 logger = logging.getLogger(__name__)
 
 class CacheManager:
-    """Handles all caching logic for chat responses"""
+    """Handles all caching logic for chat responses. The Redis cache client is thread-safe, so calls skip the thread-sensitive executor"""
     def __init__(self):
         self.cache_ttl = getattr(settings, 'CHAT_CACHE_TTL', 300)
         
@@ -22,10 +22,10 @@ class CacheManager:
     async def get(self, cache_key: str)-> Optional[ChatResponse]:
         """Asynchronously gets a response from the cache"""
         try:
-            cached_data = await sync_to_async(cache.get)(cache_key)
+            cached_data = await sync_to_async(cache.get, thread_sensitive=False)(cache_key)
             if cached_data:
                 logger.info(f"Cache HIT for key: {cache_key}")
-                return ChatResponse(**cached_data)
+                return ChatResponse.from_dict(cached_data)
             logger.info(f"Cache MISS for key: {cache_key}")
             return None
         except Exception as e:
@@ -35,19 +35,7 @@ class CacheManager:
     async def set(self, cache_key: str, response: ChatResponse):
         """Asynchronously sets a response in the cache."""
         try:
-            cache_data = {
-                'query': response.query, 
-                'intent': response.intent, 
-                'response': response.response, 
-                'data': response.data, 
-                'timestamp': response.timestamp, 
-                'execution_time': response.execution_time, 
-                'confidence_score': response.confidence_score, 
-                'session_id': response.session_id, 
-                'error': response.error
-            }
-            
-            await sync_to_async(cache.set)(cache_key, cache_data, self.cache_ttl)
+            await sync_to_async(cache.set, thread_sensitive=False)(cache_key, response.to_dict(), self.cache_ttl)
             logger.info(f"Cached response for key: {cache_key}")
             
         except Exception as e:
@@ -57,7 +45,7 @@ class CacheManager:
     async def delete(self, cache_key:str):
         """Asynchronously deletes a cache entry."""
         try:
-            await sync_to_async(cache.delete)(cache_key)
+            await sync_to_async(cache.delete, thread_sensitive=False)(cache_key)
             logger.info(f"Deleted cache key: {cache_key}")
         except Exception as e:
             logger.error(f"Cache deletion error for key {cache_key}: {str(e)}")
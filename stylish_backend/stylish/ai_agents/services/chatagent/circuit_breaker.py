@@ -21,29 +21,33 @@ class CircuitBreaker:
         
         
     async def call(self, func: Callable, *args, **kwargs) -> Any:
-        if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                self.state = CircuitState.HALF_OPEN
-            else:
-                raise Exception("Circuit breaker is OPEN")
+        self.before_call()
             
         try:
             result = await func(*args, **kwargs)
-            self._on_success()
+            self.record_success()
             return result
         except Exception as e:
-            self._on_failure()
+            self.record_failure()
             raise e
+        
+    def before_call(self):
+        """Raise if the circuit is open. Streaming calls that cannot be wrapped in call() use this with record_success/record_failure"""
+        if self.state == CircuitState.OPEN:
+            if self._should_attempt_reset():
+                self.state = CircuitState.HALF_OPEN
+            else:
+                raise Exception("Circuit breaker is OPEN")
                 
     
     def _should_attempt_reset(self)-> bool:
         return (time.time()- self.last_failure_time) >= self.recovery_timeout
     
-    def _on_success(self):
+    def record_success(self):
         self.failure_count = 0
         self.state = CircuitState.CLOSED
         
-    def _on_failure(self):
+    def record_failure(self):
         self.failure_count+=1
         self.last_failure_time = time.time()
         
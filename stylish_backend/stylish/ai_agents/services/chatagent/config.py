@@ -19,6 +19,17 @@ class ChatAgentConfig:
     api_max_retries : int = 3
     api_model: str = 'deepseek/deepseek-r1-0528:free'
     
+    # Local intent classification
+    local_intent_enabled: bool = True
+    local_intent_confidence_threshold: float = 0.6
+    
+    # Data fetching
+    tool_call_timeout: float = 20.0
+    
+    # Post-processing
+    post_process_timeout: float = 2.0
+    post_process_concurrency: int = 3
+    
     # Circuit breaker 
     circuit_breaker_failure_threshold : int = 5
     circuit_breaker_recovery_timeout : int = 60
@@ -62,6 +73,11 @@ def get_chat_config()-> ChatAgentConfig:
         api_timeout= getattr(settings, 'OPENAI_TIMEOUT', 30.0), 
         api_max_retries=getattr(settings, 'OPENAI_MAX_RETRIES', 3), 
         api_model= getattr(settings, 'DEEPSEEK_MODEL', 'deepseek/deepseek-r1-0528:free'), 
+        local_intent_enabled=getattr(settings, 'CHAT_LOCAL_INTENT_ENABLED', True), 
+        local_intent_confidence_threshold=getattr(settings, 'CHAT_LOCAL_INTENT_THRESHOLD', 0.6), 
+        tool_call_timeout=getattr(settings, 'CHAT_TOOL_CALL_TIMEOUT', 20.0), 
+        post_process_timeout=getattr(settings, 'CHAT_POST_PROCESS_TIMEOUT', 2.0), 
+        post_process_concurrency=getattr(settings, 'CHAT_POST_PROCESS_CONCURRENCY', 3), 
         circuit_breaker_failure_threshold=getattr(settings, 'CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5), 
         circuit_breaker_recovery_timeout=getattr(settings, 'CIRCUIT_BREAKER_RECOVERY_TIMEOUT', 60), 
         redis_max_connections=getattr(settings, 'REDIS_MAX_CONNECTIONS', 20), 
@@ -6,9 +6,10 @@ import uuid
 
 from django.conf import settings
 from django.utils import timezone
-from asgiref.sync import sync_to_async
 
 from ai_agents.utils.encoders import CustomJSONEncoder
+from core.metrics import CHAT_QUERIES, chat_stage
+from core.tracing import tracer
 
 from .validators import ChatValidator
 from ai_agents.services.chatagent.rate_limiter import RateLimiter
@@ -16,9 +17,10 @@ from .data_fetcher import DataFetcher
 from .response_generator import ResponseGenerator
 from .cache_manager import CacheManager
 from .analytics import AnalyticsTracker
+from .message_writer import message_writer
+from .post_processor import PostProcessor
 from .exceptions import ChatValidationError, RateLimitExceededError, DataFetchingError
 
-from ai_agents.models import ChatMessage as ChatMessageModel, ChatSession
 from ai_agents.services.base_agent import BaseAgent
 from ai_agents.services.chat_agent import (QueryIntent, ChatContext, ChatResponse)
 from openai import AsyncOpenAI
@@ -46,6 +48,10 @@ class ProductionChatAssistantAgent(BaseAgent):
             timeout=chat_config.api_timeout, 
             max_retries=chat_config.api_max_retries
         )
+        self.post_processor = PostProcessor(
+            timeout=chat_config.post_process_timeout, 
+            max_concurrency=chat_config.post_process_concurrency
+        )
         self.response_generator = ResponseGenerator(
             client= self.async_client, 
             model = chat_config.api_model, 
@@ -59,18 +65,34 @@ class ProductionChatAssistantAgent(BaseAgent):
         async def yield_event(event_type: str, data: Any):
             """Helper to yield structured event."""
             yield {"event": event_type, "data": data}
+        
+        # Root span of the query; stages, MCP calls, queries and Redis round trips become its children
+        trace_root, trace_token = tracer.begin_trace(
+            'chat.query', **{'chat.user_id': str(context.user_id), 'chat.session_id': str(context.session_id)}
+        )
         try:
             # 1. Validation and Sanitization
-            sanitized_query = await self.validator.validate_and_sanitize(query, context)
+            with chat_stage('validate'):
+                sanitized_query = await self.validator.validate_and_sanitize(query, context)
             
             # 2. Rate Limiting
-            await self.rate_limiter.check_limits(context)
+            with chat_stage('rate_limit'):
+                await self.rate_limiter.check_limits(context)
             
             # 3. Cache Check (no streaming for cached responses, return immediately)
-            cache_key = self.cache_manager.generate_key(sanitized_query, context)
-            if cached_response_data:= await self.cache_manager.get(cache_key=cache_key):
-                async for event in yield_event("final_response", cached_response_data.to_dict()):
+            with chat_stage('cache'):
+                cache_key = self.cache_manager.generate_key(sanitized_query, context)
+                cached_response = await self.cache_manager.get(cache_key=cache_key)
+            if cached_response:
+                chat_response = self._build_cached_response(cached_response, query, context, time.time() - start_time)
+                async for event in yield_event("final_response", chat_response.to_dict()):
                     yield event
+                
+                # Keep the original classification's source; a 'cache' label would end up as training data
+                context.set_metadata('intent_source', cached_response.metadata.get('intent_source', 'llm'))
+                self._attach_timings(trace_root, context)
+                message_writer.enqueue(chat_response, context, cache_hit=True)
+                CHAT_QUERIES.labels(chat_response.intent.value, 'cache_hit').inc()
                 return 
             
             async for event in yield_event ("status_update", {"message": "Classifying query..."}):
@@ -78,7 +100,8 @@ class ProductionChatAssistantAgent(BaseAgent):
                 
             
             # 4. Intent Classification
-            intent = await self.response_generator.classify_intent(sanitized_query)
+            with chat_stage('classify'):
+                intent = await self.response_generator.classify_intent(sanitized_query, context)
             async for event in yield_event("intent_classified", {"intent": intent.value}):
                 yield event
                 
@@ -86,7 +109,8 @@ class ProductionChatAssistantAgent(BaseAgent):
                 yield event
                 
             # 5. Data fetching
-            data = await self.data_fetcher.fetch_data(intent, sanitized_query, context)
+            with chat_stage('fetch'):
+                data = await self.data_fetcher.fetch_data(intent, sanitized_query, context)
             data_summary = f"{len(json.dumps(data, cls=CustomJSONEncoder))} bytes of data received"
             async for event in yield_event("data_fetched", {"data_summary": data_summary}):
                 yield event
@@ -94,10 +118,17 @@ class ProductionChatAssistantAgent(BaseAgent):
             async for event in yield_event("status_update", {"message": "Generating insights..."}):
                 yield event
                 
-            # 6. Response Generation
-            response_json_str = await self.response_generator.generate_response(sanitized_query, intent, data, context)
-            
-            response_dict = json.loads(response_json_str)
+            # 6. Response Generation (narrative tokens are forwarded as they arrive)
+            response_json_str = None
+            with chat_stage('generate'):
+                async for chunk in self.response_generator.generate_response_stream(sanitized_query, intent, data, context):
+                    if chunk["type"] == "narrative_delta":
+                        async for event in yield_event("narrative_delta", {"delta": chunk["delta"]}):
+                            yield event
+                    else:
+                        response_json_str = chunk["response"]
+                
+                response_dict = json.loads(response_json_str)
             
             execution_time = time.time() - start_time
             
@@ -112,28 +143,44 @@ class ProductionChatAssistantAgent(BaseAgent):
                 execution_time=execution_time, 
                 confidence_score=self._calculate_confidence(data), 
                 session_id=context.session_id, 
-                message_id=message_id
+                message_id=message_id, 
+                metadata={'intent_source': context.get_metadata('intent_source', 'llm')}
             )
             
             # Yield the final, complete response object
             async for event in yield_event("final_response", chat_response.to_dict()):
                 yield event
                 
-            # 7. Post-processing 
-            await self._store_message_async(chat_response, context)
-            
-            await self.cache_manager.set(cache_key, chat_response.to_dict())
-            await self.analytics.track_query(context, intent, execution_time)
+            # 7. Post-processing: each step targets a different backend, so they run concurrently with per-step
+            # timeouts, in the background so the stream closes as soon as the response is out
+            CHAT_QUERIES.labels(intent.value, 'ok').inc()
+            if trace_root:
+                trace_root.set_attribute('chat.intent', intent.value)
+            self._attach_timings(trace_root, context)
+            self.post_processor.schedule({
+                'persist': lambda: message_writer.enqueue(chat_response, context), 
+                'cache': lambda: self.cache_manager.set(cache_key, chat_response), 
+                'analytics': lambda: self.analytics.track_query(context, intent, execution_time),
+            })
             
         except (ChatValidationError, RateLimitExceededError, DataFetchingError) as e:
             logger.warning(f"User-facing error for user {context.user_id}: {str(e)}")
+            CHAT_QUERIES.labels('unknown', type(e).__name__).inc()
+            if trace_root:
+                trace_root.record_error(e)
             async for event in yield_event ("error", {"message": str(e)}):
                 yield event
                 
         except Exception as e:
             logger.error(f"Critical error in chat pipeline for user {context.user_id}:{str(e)}", exc_info=True)
+            CHAT_QUERIES.labels('unknown', 'error').inc()
+            if trace_root:
+                trace_root.record_error(e)
             async for event in yield_event("error", {"message": "An unexpected server error occurred"}):
                 yield event
+        
+        finally:
+            tracer.end_trace(trace_root, trace_token)
             
     async def process_query_async(self, query: str, context: ChatContext)-> ChatResponse:
         final_response_data = None
@@ -165,6 +212,12 @@ class ProductionChatAssistantAgent(BaseAgent):
             message_id=str(uuid.uuid4())
         )   
             
+    def _attach_timings(self, trace_root, context: ChatContext):
+        """Store the span breakdown so far with the message; post-processing runs after the trace and is timed by
+        the stylish_chat_postprocess_duration_seconds histogram"""
+        if trace_root:
+            context.set_metadata('timings', trace_root.trace.timings())
+            
     def _calculate_confidence(self, data:dict)-> float:
         if not data  or 'error' in data:
             return 0.1
@@ -172,24 +225,20 @@ class ProductionChatAssistantAgent(BaseAgent):
         return min(1.0, round(score, 2))
     
 
-    async def _store_message_async(self, response: ChatResponse, context: ChatContext):
-        """Stores the chat interaction in the database using async operations"""
-        try:
-            session, _ = await sync_to_async(ChatSession.objects.get_or_create)(session_id = context.session_id, defaults={'user_id': context.user_id})
-            
-            await sync_to_async(ChatMessageModel.objects.create)(
-                id = response.message_id, 
-                session = session, 
-                query = response.query, 
-                response = response.response, 
-                metadata  = {'structured_response': response.data, 'user_permissions': context.user_permissions}, 
-                intent= response.intent.value, 
-                execution_time = response.execution_time, 
-                confidence_score = response.confidence_score
-            )
-            
-        except Exception as e:
-            logger.error(f"Failed to store chat message for session {context.session_id}: {str(e)}")
+    def _build_cached_response(self, cached: ChatResponse, query: str, context: ChatContext, execution_time: float)-> ChatResponse:
+        """Re-issue a cached response as a new message in the caller's session"""
+        return ChatResponse(
+            query=query, 
+            intent=cached.intent, 
+            response=cached.response, 
+            data=cached.data, 
+            timestamp=timezone.now(), 
+            execution_time=execution_time, 
+            confidence_score=cached.confidence_score, 
+            session_id=context.session_id, 
+            message_id=str(uuid.uuid4()), 
+            metadata={**cached.metadata, 'cache_hit': True, 'cached_message_id': cached.message_id}
+        )
             
     def analyze(self, data: Dict[str, Any])-> Dict[str, Any]:
         logger.info("Analyze method called but not implemented here")
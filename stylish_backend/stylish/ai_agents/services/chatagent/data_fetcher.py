@@ -2,7 +2,9 @@ import logging
 from typing import Dict, Any
 
 from ai_agents.services.chat_agent import QueryIntent, ChatContext
+from .config import get_chat_config
 from .exceptions import DataFetchingError
+from .fetch_planner import FetchPlanner, ToolCall
 from ai_agents.mcp_server.tools import EcommerceMCPTools
 
 logger = logging.getLogger(__name__)
@@ -13,6 +15,7 @@ class DataFetcher:
 
     def __init__(self):
         self.mcp_tools = EcommerceMCPTools()
+        self.planner = FetchPlanner(timeout=get_chat_config().tool_call_timeout)
 
         # Map intents to MCP tool handers
         self.intent_handlers = {
@@ -23,6 +26,7 @@ class DataFetcher:
             QueryIntent.CUSTOMER_INSIGHTS: self._handle_customer_insights,
             QueryIntent.REVENUE_ANALYSIS: self._handle_revenue_analysis,
             QueryIntent.GENERAL_STATS: self._handle_general_stats,
+            QueryIntent.TOP_PRODUCTS: self._handle_top_products,
         }
 
     async def fetch_data(
@@ -99,14 +103,25 @@ class DataFetcher:
     async def _handle_general_stats(
         self, query: str, context: ChatContext
     ) -> Dict[str, Any]:
-        """Handle general statistics queries"""
+        """Handle general statistics queries. Inventory and sales are independent, so they are fetched concurrently"""
         try:
-            inventory_data = await self.mcp_tools.handle_inventory_status(
-                {"alert_level": "all"}
-            )
-            sales_data = await self.mcp_tools.handle_sales_analytics(
-                {"period": "30days", "metrics": ["revenue", "orders"]}
+            results = await self.planner.execute(
+                [
+                    ToolCall(
+                        "inventory",
+                        self.mcp_tools.handle_inventory_status,
+                        {"alert_level": "all"},
+                    ),
+                    ToolCall(
+                        "sales",
+                        self.mcp_tools.handle_sales_analytics,
+                        {"period": "30days", "metrics": ["revenue", "orders"]},
+                    ),
+                ]
             )
+            inventory_data, sales_data = results["inventory"], results["sales"]
+            if "error" in inventory_data and "error" in sales_data:
+                raise DataFetchingError(inventory_data["error"])
 
             return {
                 "message": "Here's your business overview",
@@ -136,6 +151,69 @@ class DataFetcher:
                 ],
             }
 
+    async def _handle_top_products(
+        self, query: str, context: ChatContext
+    ) -> Dict[str, Any]:
+        """Handle top product queries. Composite intent: best sellers joined with their stock alerts. The
+        inventory call is sequenced after the sales call and scoped to the best sellers' ids; the global alert
+        list is truncated to the worst-stocked products and would miss a best seller outside it
+        """
+        period = self._extract_period_from_query(query)
+        sales_data = (
+            await self.planner.execute(
+                [
+                    ToolCall(
+                        "sales",
+                        self.mcp_tools.handle_sales_analytics,
+                        {"period": period, "metrics": ["top_products"]},
+                    )
+                ]
+            )
+        )["sales"]
+        if "error" in sales_data:
+            return sales_data
+
+        product_ids = [
+            str(product["id"]) for product in sales_data.get("top_products", [])
+        ]
+        inventory_data = {}
+        if product_ids:
+            inventory_data = (
+                await self.planner.execute(
+                    [
+                        ToolCall(
+                            "inventory",
+                            self.mcp_tools.handle_inventory_status,
+                            {
+                                "alert_level": "all",
+                                "product_ids": product_ids,
+                                "limit": len(product_ids),
+                            },
+                        )
+                    ]
+                )
+            )["inventory"]
+
+        alerts_by_product = {
+            alert["product_id"]: alert for alert in inventory_data.get("alerts", [])
+        }
+        top_products = [
+            {
+                **product,
+                "stock_alert": alerts_by_product.get(str(product["id"]), {}).get(
+                    "type"
+                ),
+            }
+            for product in sales_data.get("top_products", [])
+        ]
+
+        return {
+            "period": sales_data.get("period"),
+            "top_products": top_products,
+            # Stock summary of the listed best sellers
+            "inventory_summary": inventory_data.get("summary", {}),
+        }
+
     def _extract_period_from_query(self, query: str) -> str:
         """Extract time period from query string"""
         query_lower = query.lower()
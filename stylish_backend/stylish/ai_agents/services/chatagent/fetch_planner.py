@@ -0,0 +1,47 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolCall:
+    """A single MCP tool invocation within a fetch plan"""
+
+    key: str
+    handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class FetchPlanner:
+    """Executes the independent tool calls of a fetch plan concurrently. The MCP handlers run their queries on a dedicated DB thread pool, so the plan is bounded by the slowest tool rather than the sum"""
+
+    def __init__(self, timeout: float = 20.0):
+        self.timeout = timeout
+
+    async def execute(self, calls: List[ToolCall]) -> Dict[str, Dict[str, Any]]:
+        """Run all calls concurrently. A failed or timed out call yields an error payload under its key instead of failing the plan"""
+        results = await asyncio.gather(*(self._run_call(call) for call in calls))
+        return dict(results)
+
+    async def _run_call(self, call: ToolCall):
+        start_time = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                call.handler(call.args), timeout=self.timeout
+            )
+            logger.debug(
+                f"Tool call '{call.key}' completed in {time.perf_counter() - start_time:.3f}s"
+            )
+            return call.key, result
+
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool call '{call.key}' timed out after {self.timeout}s")
+            return call.key, {"error": f"{call.key} timed out"}
+
+        except Exception as e:
+            logger.error(f"Tool call '{call.key}' failed: {str(e)}", exc_info=True)
+            return call.key, {"error": str(e)}
@@ -0,0 +1,273 @@
+import math
+import re
+import time
+import threading
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from ai_agents.services.chat_agent import QueryIntent, QueryClassification
+
+logger = logging.getLogger(__name__)
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class LocalIntentClassifier:
+    """Fast local intent classifier that runs ahead of the LLM. Combines weighted keyword rules with a multinomial naive Bayes model trained from stored ChatMessage intents."""
+
+    # Keyword rules: (phrase, weight). Multi-word phrases are matched against the normalized query text.
+    KEYWORD_RULES: Dict[QueryIntent, List[Tuple[str, float]]] = {
+        QueryIntent.INVENTORY_STATUS: [
+            ("stock", 1.0), ("inventory", 1.0), ("restock", 1.0), ("out of stock", 1.5),
+            ("low stock", 1.5), ("reorder", 1.0), ("warehouse", 0.75), ("units left", 1.0),
+        ],
+        QueryIntent.SALES_DATA: [
+            ("sales", 1.0), ("sold", 0.75), ("selling", 0.5), ("sell", 0.5),
+            ("total sales", 1.5), ("sales trend", 1.0),
+        ],
+        QueryIntent.PRODUCT_PERFORMANCE: [
+            ("product performance", 1.5), ("worst performing", 1.0), ("performing", 0.75),
+            ("underperforming", 1.0), ("slow moving", 1.0),
+        ],
+        QueryIntent.TOP_PRODUCTS: [
+            ("best selling", 1.5), ("top products", 1.5), ("top selling", 1.5), ("best sellers", 1.5),
+            ("bestsellers", 1.5), ("bestselling", 1.5), ("most popular", 1.0), ("top sellers", 1.5),
+        ],
+        QueryIntent.ORDER_STATUS: [
+            ("order", 0.75), ("orders", 0.75), ("shipped", 1.0), ("pending", 0.75),
+            ("in transit", 1.0), ("delivered", 1.0), ("fulfillment", 1.0), ("tracking", 1.0),
+        ],
+        QueryIntent.CUSTOMER_INSIGHTS: [
+            ("customer", 1.0), ("customers", 1.0), ("buyers", 0.75), ("churn", 1.0),
+            ("lifetime value", 1.5), ("ltv", 1.5), ("segment", 0.75), ("loyal", 0.75),
+        ],
+        QueryIntent.REVENUE_ANALYSIS: [
+            ("revenue", 1.0), ("profit", 1.0), ("margin", 1.0), ("earnings", 1.0),
+            ("income", 0.75), ("financial", 0.75),
+        ],
+        QueryIntent.GENERAL_STATS: [
+            ("overview", 1.0), ("summary", 0.75), ("dashboard", 0.75), ("how is business", 1.5),
+            ("general", 0.5), ("everything", 0.5),
+        ],
+    }
+
+    def __init__(
+        self,
+        rule_weight: float = 0.5,
+        smoothing: float = 1.0,
+        min_training_samples: int = 50,
+        history_limit: int = 5000,
+        retrain_interval: int = 3600,
+    ):
+        self.rule_weight = rule_weight
+        self.smoothing = smoothing
+        self.min_training_samples = min_training_samples
+        self.history_limit = history_limit
+        self.retrain_interval = retrain_interval
+
+        # Naive Bayes parameters
+        self._class_log_priors: Dict[QueryIntent, float] = {}
+        self._token_log_probs: Dict[QueryIntent, Dict[str, float]] = {}
+        self._unknown_log_probs: Dict[QueryIntent, float] = {}
+        self._vocabulary: set = set()
+        self._trained_samples = 0
+        self._last_trained: Optional[float] = None
+        self._training_in_progress = False
+        self._training_lock = threading.Lock()
+
+    @property
+    def is_trained(self) -> bool:
+        return bool(self._class_log_priors)
+
+    @property
+    def needs_training(self) -> bool:
+        if self._training_in_progress:
+            return False
+        if self._last_trained is None:
+            return True
+        return (time.time() - self._last_trained) >= self.retrain_interval
+
+    def _tokenize(self, text: str) -> List[str]:
+        return TOKEN_PATTERN.findall(text.lower())
+
+    def classify(self, query: str) -> QueryClassification:
+        """Classify a query locally. Returns a QueryClassification whose confidence decides whether the LLM is needed"""
+        tokens = self._tokenize(query)
+        normalized = " ".join(tokens)
+
+        rule_probs, rule_strength = self._rule_scores(normalized)
+        model_probs = self._model_scores(tokens) if self.is_trained else {}
+
+        if rule_probs and model_probs:
+            combined = {
+                intent: self.rule_weight * rule_probs.get(intent, 0.0)
+                + (1 - self.rule_weight) * model_probs.get(intent, 0.0)
+                for intent in set(rule_probs) | set(model_probs)
+            }
+        elif model_probs:
+            combined = model_probs
+        elif rule_probs:
+            # Without a trained model, a lone weak keyword should not be trusted as much as several hits
+            combined = {intent: prob * rule_strength for intent, prob in rule_probs.items()}
+        else:
+            return QueryClassification(intent=QueryIntent.GENERAL_STATS, confidence=0.0)
+
+        ranked = sorted(combined.items(), key=lambda item: item[1], reverse=True)
+        best_intent, best_score = ranked[0]
+
+        return QueryClassification(
+            intent=best_intent,
+            confidence=best_score,
+            alternative_intents=[(intent, score) for intent, score in ranked[1:3]],
+        )
+
+    def _rule_scores(self, normalized: str) -> Tuple[Dict[QueryIntent, float], float]:
+        """Score keyword rule hits. Returns normalized probabilities and a strength factor based on the best score"""
+        padded = f" {normalized} "
+        scores = defaultdict(float)
+
+        for intent, rules in self.KEYWORD_RULES.items():
+            for phrase, weight in rules:
+                if f" {phrase} " in padded:
+                    scores[intent] += weight
+
+        if not scores:
+            return {}, 0.0
+
+        total = sum(scores.values())
+        strength = min(1.0, 0.5 + 0.25 * max(scores.values()))
+        return {intent: score / total for intent, score in scores.items()}, strength
+
+    def _model_scores(self, tokens: List[str]) -> Dict[QueryIntent, float]:
+        """Posterior probabilities from the naive Bayes model"""
+        known_tokens = [token for token in tokens if token in self._vocabulary]
+        if not known_tokens:
+            return {}
+
+        log_scores = {}
+        for intent, log_prior in self._class_log_priors.items():
+            token_log_probs = self._token_log_probs[intent]
+            unknown = self._unknown_log_probs[intent]
+            log_scores[intent] = log_prior + sum(
+                token_log_probs.get(token, unknown) for token in known_tokens
+            )
+
+        # Softmax with max-shift for numerical stability
+        max_log = max(log_scores.values())
+        exp_scores = {intent: math.exp(score - max_log) for intent, score in log_scores.items()}
+        total = sum(exp_scores.values())
+        return {intent: score / total for intent, score in exp_scores.items()}
+
+    def fit(self, samples: Iterable[Tuple[str, str]]) -> int:
+        """Train the naive Bayes model from (query, intent_value) pairs. Unknown intent values are skipped"""
+        class_counts = Counter()
+        token_counts: Dict[QueryIntent, Counter] = defaultdict(Counter)
+        vocabulary = set()
+
+        for query, intent_value in samples:
+            try:
+                intent = QueryIntent(intent_value)
+            except ValueError:
+                continue
+
+            tokens = self._tokenize(query)
+            if not tokens:
+                continue
+
+            class_counts[intent] += 1
+            token_counts[intent].update(tokens)
+            vocabulary.update(tokens)
+
+        total_samples = sum(class_counts.values())
+        self._last_trained = time.time()
+
+        if total_samples < self.min_training_samples:
+            logger.info(
+                f"Local intent model not trained: {total_samples} samples (minimum {self.min_training_samples})"
+            )
+            return total_samples
+
+        vocab_size = len(vocabulary)
+        class_log_priors = {}
+        token_log_probs = {}
+        unknown_log_probs = {}
+
+        for intent, count in class_counts.items():
+            class_log_priors[intent] = math.log(count / total_samples)
+            total_tokens = sum(token_counts[intent].values())
+            denominator = total_tokens + self.smoothing * vocab_size
+            token_log_probs[intent] = {
+                token: math.log((token_count + self.smoothing) / denominator)
+                for token, token_count in token_counts[intent].items()
+            }
+            unknown_log_probs[intent] = math.log(self.smoothing / denominator)
+
+        # Swap in the new parameters together so concurrent classify() calls never see a partial model
+        self._class_log_priors = class_log_priors
+        self._token_log_probs = token_log_probs
+        self._unknown_log_probs = unknown_log_probs
+        self._vocabulary = vocabulary
+        self._trained_samples = total_samples
+
+        logger.info(
+            f"Local intent model trained on {total_samples} samples, {vocab_size} tokens, {len(class_counts)} intents"
+        )
+        return total_samples
+
+    def load_training_samples(self, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Load (query, intent) pairs from stored chat history (sync method). Messages classified locally are excluded so the model only learns from LLM labels, and cache hits are excluded because they repeat an earlier message's label"""
+        from ai_agents.models import ChatMessage
+
+        queryset = (
+            ChatMessage.objects.filter(is_deleted=False, error_details={})
+            .exclude(intent="")
+            .exclude(metadata__intent_source="local")
+            .exclude(metadata__cache_hit=True)
+            .order_by("-created_at")
+            .values_list("query", "intent")
+        )
+        return list(queryset[: limit or self.history_limit])
+
+    def claim_training(self) -> bool:
+        """Reserve the next training run. Returns False if the model is fresh or another caller is already training it"""
+        with self._training_lock:
+            if not self.needs_training:
+                return False
+            self._training_in_progress = True
+            return True
+
+    def release_training(self):
+        """Give back a claim whose training run never started, e.g. because its task was cancelled"""
+        with self._training_lock:
+            self._training_in_progress = False
+
+    def train_from_history(self) -> int:
+        """Retrain the model from stored ChatMessage history (sync method)"""
+        self._training_in_progress = True
+        try:
+            return self.fit(self.load_training_samples())
+        except Exception as e:
+            self._last_trained = time.time()
+            logger.error(f"Failed to train local intent classifier: {str(e)}")
+            return 0
+        finally:
+            self._training_in_progress = False
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "is_trained": self.is_trained,
+            "trained_samples": self._trained_samples,
+            "vocabulary_size": len(self._vocabulary),
+            "intents": [intent.value for intent in self._class_log_priors],
+            "last_trained": self._last_trained,
+        }
+
+
+# Global instance shared by all chat agents in the process, so the trained model outlives individual requests
+local_intent_classifier = LocalIntentClassifier(
+    retrain_interval=getattr(settings, 'CHAT_LOCAL_INTENT_RETRAIN_INTERVAL', 3600)
+)
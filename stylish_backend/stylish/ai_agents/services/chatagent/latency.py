@@ -0,0 +1,150 @@
+import bisect
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.utils import timezone
+
+from .redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "chat_analytics:latency"
+
+# Upper bounds (seconds) of fixed log-scale buckets: 5ms growing by 2^(1/4) per bucket up to ~5 minutes, so
+# any percentile read from a bucket is within ~10% of the true value. Anything slower lands in the overflow
+MIN_BOUND = 0.005
+GROWTH = 2 ** 0.25
+BUCKET_BOUNDS = [round(MIN_BOUND * GROWTH ** i, 6) for i in range(64)]
+OVERFLOW = len(BUCKET_BOUNDS)
+
+COUNT_FIELD = "count"
+SUM_FIELD = "sum"
+
+MINUTE_TTL = 2 * 24 * 3600
+HOUR_TTL = 30 * 24 * 3600
+
+
+def bucket_index(seconds: float) -> int:
+    return bisect.bisect_left(BUCKET_BOUNDS, max(seconds, 0.0))
+
+
+def minute_key(when: datetime, intent: Optional[str] = None) -> str:
+    scope = f"intent:{intent}:" if intent else ""
+    return f"{KEY_PREFIX}:{scope}m:{when:%Y-%m-%d-%H-%M}"
+
+
+def hour_key(when: datetime, intent: Optional[str] = None) -> str:
+    scope = f"intent:{intent}:" if intent else ""
+    return f"{KEY_PREFIX}:{scope}h:{when:%Y-%m-%d-%H}"
+
+
+def quantile(buckets: Dict[int, int], total: int, q: float) -> float:
+    """Estimate a quantile by linear interpolation inside the bucket that holds it"""
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for index in sorted(buckets):
+        count = buckets[index]
+        if cumulative + count >= rank:
+            lower = BUCKET_BOUNDS[index - 1] if index > 0 else 0.0
+            if index >= OVERFLOW:
+                return BUCKET_BOUNDS[-1]
+            upper = BUCKET_BOUNDS[index]
+            return lower + (upper - lower) * ((rank - cumulative) / count)
+        cumulative += count
+    return BUCKET_BOUNDS[-1]
+
+
+def summarize(hashes: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge histogram hashes (bucket counts are additive) and report count, mean and tail percentiles"""
+    buckets: Dict[int, int] = {}
+    total = 0
+    total_seconds = 0.0
+    for fields in hashes:
+        for field, value in (fields or {}).items():
+            if field == COUNT_FIELD:
+                total += int(value)
+            elif field == SUM_FIELD:
+                total_seconds += float(value)
+            else:
+                buckets[int(field)] = buckets.get(int(field), 0) + int(value)
+    return {
+        "count": total,
+        "mean": round(total_seconds / total, 4) if total else 0.0,
+        "p50": round(quantile(buckets, total, 0.50), 4),
+        "p95": round(quantile(buckets, total, 0.95), 4),
+        "p99": round(quantile(buckets, total, 0.99), 4),
+    }
+
+
+class LatencyHistogram:
+    """Chat execution-time histograms kept as Redis hashes of bucket -> count, one per minute and per hour,
+    plus one per intent and hour. Storage is bounded by the number of buckets rather than the number of
+    requests, and windows of any length are summed bucket by bucket before percentiles are read"""
+
+    def __init__(self):
+        self.redis_manager = redis_manager
+
+    def keys_for(self, intent: Optional[str], when: datetime) -> List[str]:
+        keys = [minute_key(when), hour_key(when)]
+        if intent:
+            keys.append(hour_key(when, intent))
+        return keys
+
+    def record(self, pipe, intent: Optional[str], seconds: float, when: Optional[datetime] = None) -> List[str]:
+        """Queue one observation on an existing pipeline. Returns the keys written"""
+        when = when or timezone.now()
+        bucket = str(bucket_index(seconds))
+        keys = self.keys_for(intent, when)
+        for key in keys:
+            pipe.hincrby(key, bucket, 1)
+            pipe.hincrby(key, COUNT_FIELD, 1)
+            pipe.hincrbyfloat(key, SUM_FIELD, seconds)
+            pipe.expire(key, MINUTE_TTL if key == keys[0] else HOUR_TTL)
+        return keys
+
+    async def _read(self, redis_client, keys: List[str]) -> Dict[str, Any]:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        return summarize(await pipe.execute())
+
+    async def recent(self, minutes: int = 60, redis_client=None) -> Dict[str, Any]:
+        """Percentiles over the last `minutes` minutes"""
+        now = timezone.now()
+        keys = [minute_key(now - timedelta(minutes=offset)) for offset in range(minutes)]
+        if redis_client is not None:
+            return await self._read(redis_client, keys)
+        async with self.redis_manager.get_connection() as redis_client:
+            return await self._read(redis_client, keys)
+
+    async def _report(self, redis_client, hours: int, intents: Iterable[str], minutes: int) -> Dict[str, Any]:
+        now = timezone.now()
+        hours_back = [now - timedelta(hours=offset) for offset in range(hours)]
+        result = {
+            "window_minutes": minutes,
+            "window_hours": hours,
+            "recent": await self.recent(minutes, redis_client),
+            "overall": await self._read(redis_client, [hour_key(when) for when in hours_back]),
+            "by_intent": {},
+        }
+        for intent in intents:
+            stats = await self._read(redis_client, [hour_key(when, intent) for when in hours_back])
+            if stats["count"]:
+                result["by_intent"][intent] = stats
+        return result
+
+    async def report(
+        self, hours: int = 24, intents: Iterable[str] = (), minutes: int = 60, redis_client=None
+    ) -> Dict[str, Any]:
+        """Percentiles for the last `minutes` minutes, the last `hours` hours overall and per intent"""
+        if redis_client is not None:
+            return await self._report(redis_client, hours, intents, minutes)
+        async with self.redis_manager.get_connection() as redis_client:
+            return await self._report(redis_client, hours, intents, minutes)
+
+
+# Global instance
+latency_histogram = LatencyHistogram()
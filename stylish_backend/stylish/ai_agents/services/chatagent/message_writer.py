@@ -0,0 +1,190 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from ai_agents.services.chat_agent import ChatContext, ChatResponse
+
+logger = logging.getLogger(__name__)
+
+
+class ChatMessageWriter:
+    """Write-behind persistence for chat interactions. Messages are queued in-process and batch inserted by a background worker, so the response path never waits on the database"""
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized') or not self._initialized:
+            self.batch_size = getattr(settings, 'CHAT_PERSIST_BATCH_SIZE', 100)
+            self.flush_interval = getattr(settings, 'CHAT_PERSIST_FLUSH_INTERVAL', 1.0)
+            self.max_queue_size = getattr(settings, 'CHAT_PERSIST_QUEUE_SIZE', 10000)
+
+            self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue_size)
+            self._worker: threading.Thread = None
+            self._worker_lock = threading.Lock()
+            self._stop_event = threading.Event()
+
+            self._stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+            self._initialized = True
+
+            atexit.register(self.shutdown)
+
+    def enqueue(self, response: ChatResponse, context: ChatContext, cache_hit: bool = False) -> bool:
+        """Queue a chat interaction for persistence. Never blocks; returns False if the queue is full"""
+        record = {
+            'id': response.message_id,
+            'session_id': context.session_id,
+            'user_id': context.user_id,
+            'query': response.query,
+            'response': response.response,
+            'metadata': {
+                'structured_response': response.data,
+                'user_permissions': context.user_permissions,
+                'intent_source': context.get_metadata('intent_source', 'llm'),
+                'cache_hit': cache_hit,
+                'timings': context.get_metadata('timings', {}),
+            },
+            'intent': response.intent.value,
+            'execution_time': response.execution_time,
+            'confidence_score': response.confidence_score,
+        }
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+            self._stats['enqueued'] += 1
+            return True
+        except queue.Full:
+            self._stats['dropped'] += 1
+            logger.warning(f"Chat persistence queue full, dropping message {response.message_id} for session {context.session_id}")
+            return False
+
+    def _ensure_worker(self):
+        if self._worker and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._stop_event.clear()
+            self._worker = threading.Thread(target=self._run, name='chat-message-writer', daemon=True)
+            self._worker.start()
+            logger.info("Chat message writer started")
+
+    def _run(self):
+        while not self._stop_event.is_set() or not self._queue.empty():
+            batch = self._drain_batch()
+            if batch:
+                self._flush(batch)
+
+    def _drain_batch(self) -> List[Dict[str, Any]]:
+        """Wait up to flush_interval for the first record, then take whatever else is already queued"""
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        from ai_agents.models import ChatMessage
+
+        close_old_connections()
+        try:
+            sessions = self._get_or_create_sessions(batch)
+            messages = [self._build_message(record, sessions) for record in batch if record['session_id'] in sessions]
+            ChatMessage.objects.bulk_create(messages, batch_size=self.batch_size, ignore_conflicts=True)
+            self._stats['written'] += len(messages)
+            if len(messages) < len(batch):
+                self._stats['failed'] += len(batch) - len(messages)
+                logger.warning(f"Skipped {len(batch) - len(messages)} chat messages whose session could not be created")
+            self._stats['batches'] += 1
+        except Exception as e:
+            logger.error(f"Batch insert of {len(batch)} chat messages failed, retrying individually: {str(e)}")
+            self._flush_individually(batch)
+
+    def _flush_individually(self, batch: List[Dict[str, Any]]):
+        from ai_agents.models import ChatMessage
+
+        for record in batch:
+            try:
+                sessions = self._get_or_create_sessions([record])
+                ChatMessage.objects.bulk_create([self._build_message(record, sessions)], ignore_conflicts=True)
+                self._stats['written'] += 1
+            except Exception as e:
+                self._stats['failed'] += 1
+                logger.error(f"Failed to store chat message for session {record['session_id']}: {str(e)}")
+
+    def _get_or_create_sessions(self, batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Resolve session ids to primary keys, creating any missing sessions in one insert"""
+        from ai_agents.models import ChatSession
+
+        owners = {record['session_id']: record['user_id'] for record in batch}
+        sessions = dict(
+            ChatSession.objects.filter(session_id__in=owners).values_list('session_id', 'id')
+        )
+
+        missing = [session_id for session_id in owners if session_id not in sessions]
+        if missing:
+            ChatSession.objects.bulk_create(
+                [ChatSession(session_id=session_id, user_id=owners[session_id]) for session_id in missing],
+                ignore_conflicts=True,
+            )
+            sessions.update(
+                ChatSession.objects.filter(session_id__in=missing).values_list('session_id', 'id')
+            )
+        return sessions
+
+    def _build_message(self, record: Dict[str, Any], sessions: Dict[str, Any]):
+        from ai_agents.models import ChatMessage
+
+        return ChatMessage(
+            id=record['id'],
+            session_id=sessions[record['session_id']],
+            query=record['query'],
+            response=record['response'],
+            metadata=record['metadata'],
+            intent=record['intent'],
+            execution_time=record['execution_time'],
+            confidence_score=record['confidence_score'],
+        )
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the worker after draining the queue"""
+        self._stop_event.set()
+        if self._worker and self._worker.is_alive():
+            self._worker.join(timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'queue_size': self._queue.qsize(),
+            'max_queue_size': self.max_queue_size,
+            'worker_alive': bool(self._worker and self._worker.is_alive()),
+        }
+
+
+# Global instance
+message_writer = ChatMessageWriter()
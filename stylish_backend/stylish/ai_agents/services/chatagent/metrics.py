@@ -1,38 +1,51 @@
-import time
 from typing import Dict, Any
-from dataclasses import dataclass, field
-from collections import defaultdict, deque
 
-@dataclass
+from core.metrics import ENDPOINT_ERRORS, ENDPOINT_LATENCY, ENDPOINT_REQUESTS, samples
+
+
 class MetricsCollector:
-    request_counts: Dict[str, int] = field(default_factory=lambda:defaultdict(int))
-    response_times:Dict[str, deque] = field(default_factory=lambda:defaultdict(lambda: deque(maxlen=100)))
-    error_counts : Dict[str, int] = field(default_factory=lambda:defaultdict(int))
-    
+    """Records endpoint calls into the process-wide metrics registry (core.metrics), so the numbers reported
+    here and on /metrics/ cover every worker process rather than only the one serving the request"""
+
     def record_request(self, endpoint:str):
-        self.request_counts[endpoint] +=1
-        
+        ENDPOINT_REQUESTS.labels(endpoint).inc()
+
     def record_response_time(self, endpoint:str, duration: float):
-        self.response_times[endpoint].append(duration)
-        
+        ENDPOINT_LATENCY.labels(endpoint).observe(duration)
+
     def record_error(self, endpoint:str):
-        self.error_counts[endpoint] += 1
+        ENDPOINT_ERRORS.labels(endpoint).inc()
+
     def get_metrics(self) -> Dict[str, Any]:
+        found = samples(['stylish_endpoint_requests', 'stylish_endpoint_errors', 'stylish_endpoint_duration_seconds'])
+
+        totals = {}
+        for name, family in (('requests', 'stylish_endpoint_requests'), ('errors', 'stylish_endpoint_errors')):
+            for sample_name, labels, value in found[family]:
+                if sample_name.endswith('_total'):
+                    entry = totals.setdefault(labels['endpoint'], {})
+                    entry[name] = entry.get(name, 0) + value
+
+        durations = {}
+        for sample_name, labels, value in found['stylish_endpoint_duration_seconds']:
+            suffix = sample_name.rsplit('_', 1)[-1]
+            if suffix in ('sum', 'count'):
+                durations.setdefault(labels['endpoint'], {})[suffix] = value
+
         metrics = {}
-        
-        for endpoint in self.request_counts:
-            response_times = list(self.response_times[endpoint])
-            avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-            
+        for endpoint, counts in totals.items():
+            requests = int(counts.get('requests', 0))
+            errors = int(counts.get('errors', 0))
+            timing = durations.get(endpoint, {})
+
             metrics[endpoint] = {
-                'total_requests': self.request_counts[endpoint], 
-                'total_errors': self.error_counts[endpoint], 
-                'avg_response_time': avg_response_time, 
-                'error_rate': self.error_counts[endpoint]/ self.request_counts[endpoint] if self.request_counts[endpoint] > 0 else 0
+                'total_requests': requests,
+                'total_errors': errors,
+                'avg_response_time': timing['sum'] / timing['count'] if timing.get('count') else 0,
+                'error_rate': errors / requests if requests > 0 else 0
             }
-            
+
         return metrics
-    
+
 # Global metrics collector
 metrics_collector = MetricsCollector()
-    
\ No newline at end of file
@@ -0,0 +1,80 @@
+import time
+import asyncio
+import inspect
+import logging
+import contextvars
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Set
+
+from core.metrics import CHAT_POSTPROCESS_LATENCY, chat_stage
+
+logger = logging.getLogger(__name__)
+
+# The event loop only keeps weak references to tasks, so scheduled runs are held here until they finish
+_background_tasks: Set[asyncio.Task] = set()
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str
+    duration: float
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'status': self.status, 'duration': round(self.duration, 4), 'error': self.error}
+
+
+class PostProcessor:
+    """Runs independent post-response steps concurrently with per-step timeouts and failure isolation"""
+
+    def __init__(self, timeout: float = 2.0, max_concurrency: int = 3):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+
+    def schedule(self, steps: Dict[str, Callable[[], Any]]) -> asyncio.Task:
+        """Run the steps in the background so the caller can finish its response without waiting for them"""
+        # A fresh context keeps the steps out of the request's trace, which is exported when the request ends
+        task = asyncio.create_task(self._run_detached(steps), context=contextvars.Context())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        return task
+
+    async def _run_detached(self, steps: Dict[str, Callable[[], Any]]) -> Dict[str, StageResult]:
+        try:
+            with chat_stage('post_process'):
+                return await self.run(steps)
+        except Exception as e:
+            logger.error(f"Post-processing failed: {str(e)}", exc_info=True)
+            return {}
+
+    async def run(self, steps: Dict[str, Callable[[], Any]]) -> Dict[str, StageResult]:
+        """Run every step concurrently. A slow or failing step never affects the others"""
+        # Created per run so the semaphore is always bound to the current event loop
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        results = await asyncio.gather(
+            *(self._run_step(name, step, semaphore) for name, step in steps.items())
+        )
+
+        for result in results:
+            CHAT_POSTPROCESS_LATENCY.labels(result.name, result.status).observe(result.duration)
+
+        return {result.name: result for result in results}
+
+    async def _run_step(self, name: str, step: Callable[[], Any], semaphore: asyncio.Semaphore) -> StageResult:
+        async with semaphore:
+            start_time = time.perf_counter()
+            try:
+                result = step()
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, timeout=self.timeout)
+                return StageResult(name=name, status='ok', duration=time.perf_counter() - start_time)
+
+            except asyncio.TimeoutError:
+                logger.warning(f"Post-processing step '{name}' timed out after {self.timeout}s")
+                return StageResult(name=name, status='timeout', duration=time.perf_counter() - start_time, error='timeout')
+
+            except Exception as e:
+                logger.error(f"Post-processing step '{name}' failed: {str(e)}")
+                return StageResult(name=name, status='error', duration=time.perf_counter() - start_time, error=str(e))
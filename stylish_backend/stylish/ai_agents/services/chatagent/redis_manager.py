@@ -1,4 +1,5 @@
 import redis.asyncio as aioredis
+from redis.asyncio.client import Pipeline
 from django.conf import settings
 import logging
 import asyncio
@@ -7,9 +8,30 @@ from typing import Optional, Dict, Any
 import threading
 from datetime import datetime 
 
+from core.tracing import KIND_CLIENT, tracer
+
 logger = logging.getLogger(__name__)
 
 
+class TracedPipeline(Pipeline):
+    """Pipeline recording one tracing span per round trip"""
+    
+    async def execute(self, raise_on_error: bool = True):
+        with tracer.span('redis.pipeline', KIND_CLIENT, **{'db.system': 'redis', 'redis.commands': len(self.command_stack)}):
+            return await super().execute(raise_on_error)
+
+
+class TracedRedis(aioredis.Redis):
+    """Redis client recording a tracing span per command and per pipeline execution"""
+    
+    async def execute_command(self, *args, **options):
+        with tracer.span(f"redis.{str(args[0]).lower()}", KIND_CLIENT, **{'db.system': 'redis'}):
+            return await super().execute_command(*args, **options)
+        
+    def pipeline(self, transaction: bool = True, shard_hint = None) -> TracedPipeline:
+        return TracedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
 class RedisManager:
     """Redis connection manager """
     _instance = None
@@ -89,7 +111,7 @@ class RedisManager:
         if loop_id not in self._clients:
             try:
                 pool = await self._ensure_pool_for_loop(loop_id)
-                client = aioredis.Redis(connection_pool=pool)
+                client = TracedRedis(connection_pool=pool)
                 
                 await client.ping()
                 self._clients[loop_id] = client
@@ -1,14 +1,26 @@
 from ai_agents.utils.encoders import CustomJSONEncoder
 from .circuit_breaker import CircuitBreaker
 from .config import get_chat_config
+from .intent_classifier import local_intent_classifier
+from .stream_parser import NarrativeStreamParser
 from django.conf import settings
 from openai import AsyncOpenAI
+from ai_agents.mcp_server.executor import run_db_task
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from ai_agents.services.chat_agent import QueryIntent, ChatContext
+import asyncio
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+# Guards the LLM fallback of intent classification. Agents are built per request, so a breaker owned by the
+# ResponseGenerator would never see more than one failure; like the local classifier it is shared by the process
+intent_circuit_breaker = CircuitBreaker(
+    failure_threshold=getattr(settings, 'CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5),
+    recovery_timeout=getattr(settings, 'CIRCUIT_BREAKER_RECOVERY_TIMEOUT', 60)
+)
+
 class ResponseGenerator:
     def __init__(self, client: AsyncOpenAI, model: str, config: dict):
         self.client = client
@@ -23,15 +35,49 @@ class ResponseGenerator:
             failure_threshold=self.config.circuit_breaker_failure_threshold,
             recovery_timeout= self.config.circuit_breaker_recovery_timeout
         )
+        self.local_classifier = local_intent_classifier
+        self.intent_circuit_breaker = intent_circuit_breaker
+        self._training_task: Optional[asyncio.Task] = None
         
-    async def classify_intent(self, query:str) -> QueryIntent:
-        """Classify intent using a JSON mode. This forces the LLM to return a scructured response"""
+    async def classify_intent(self, query:str, context: Optional[ChatContext] = None) -> QueryIntent:
+        """Classify intent locally when confident, otherwise fall back to the LLM in JSON mode. This forces the LLM to return a scructured response"""
+        if self.config.local_intent_enabled:
+            self._schedule_local_training()
+            classification = self.local_classifier.classify(query)
+            
+            if classification.confidence >= self.config.local_intent_confidence_threshold:
+                logger.debug(f"Local intent classification: {classification.intent.value} ({classification.confidence:.2f})")
+                if context:
+                    context.set_metadata('intent_source', 'local')
+                    context.set_metadata('intent_confidence', round(classification.confidence, 3))
+                return classification.intent
+            
+        if context:
+            context.set_metadata('intent_source', 'llm')
         try:
-            return await self.circuit_breaker.call(self._classify_intent_internal, query)
+            return await self.intent_circuit_breaker.call(self._classify_intent_internal, query)
         except Exception as e:
             logger.error(f"Intent classification failed catastrophically: {str(e)}")
             return QueryIntent.GENERAL_STATS
         
+    def _schedule_local_training(self):
+        """Retrain the local model from chat history in the background so classification never waits on the database"""
+        if self._training_task is not None and not self._training_task.done():
+            return
+        if not self.local_classifier.claim_training():
+            return
+        # The event loop only keeps a weak reference to tasks, so hold one until training finishes
+        self._training_task = asyncio.create_task(run_db_task(self.local_classifier.train_from_history))
+        self._training_task.add_done_callback(self._training_done)
+
+    def _training_done(self, task: asyncio.Task):
+        if self._training_task is task:
+            self._training_task = None
+        if task.cancelled():
+            self.local_classifier.release_training()
+        elif task.exception() is not None:
+            logger.error(f"Background intent classifier training failed: {str(task.exception())}")
+        
     async def _classify_intent_internal(self, query: str)-> QueryIntent:
         intent_description = {
             intent.value: intent.value.replace('_', ' ').title() for intent in QueryIntent
@@ -101,27 +147,76 @@ class ResponseGenerator:
             return json.dumps(response_json, cls = CustomJSONEncoder)
         except Exception as e:
             logger.error(f"Response generation failed: {str(e)}")
-            error_response = {
-                "narrative": "I apologize , but I'm having trouble generating a response right now. Please try again.", 
-                "data": None, 
-                "ui_components": []
-            }
-            return json.dumps(error_response, cls=CustomJSONEncoder)
+            return json.dumps(self._generation_error_response(), cls=CustomJSONEncoder)
         
-    async def _generate_response_internal(self, query: str, intent: QueryIntent, data: dict, context: ChatContext)->dict:
+    async def generate_response_stream(self, query: str, intent: QueryIntent, data: dict, context: ChatContext)-> AsyncGenerator[Dict[str, Any], None]:
+        """Stream the structured JSON response. Yields 'narrative_delta' chunks as tokens arrive, then a single 'complete' chunk with the full JSON string"""
         if 'error' in data:
-            return {
-                "narrative": f"I encountered an issue retrieving the data: {data['error']}. Please try rephrasing your question", 
-                "data": data, 
-                "ui_components": []
-            }
+            yield {"type": "complete", "response": json.dumps(self._data_error_response(data), cls=CustomJSONEncoder)}
+            return
+        
+        try:
+            self.circuit_breaker.before_call()
+        except Exception as e:
+            logger.error(f"Response generation failed: {str(e)}")
+            yield {"type": "complete", "response": json.dumps(self._generation_error_response(), cls=CustomJSONEncoder)}
+            return
+        
+        parser = NarrativeStreamParser()
+        try:
+            stream = await self.client.chat.completions.create(
+                model= self.model, 
+                response_format={"type": "json_object"}, 
+                messages= self._build_response_messages(query, intent, data), 
+                temperature= 0.3, 
+                max_tokens=1500, 
+                extra_headers=self.api_headers, 
+                stream=True
+            )
+            
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                
+                delta = parser.feed(token)
+                if delta:
+                    yield {"type": "narrative_delta", "delta": delta}
+                    
+            self.circuit_breaker.record_success()
+            response_json = self._parse_response_content(parser.text)
             
+        except Exception as e:
+            self.circuit_breaker.record_failure()
+            logger.error(f"Streaming response generation failed: {str(e)}")
+            response_json = self._generation_error_response()
+            
+        yield {"type": "complete", "response": json.dumps(response_json, cls=CustomJSONEncoder)}
+        
+    async def _generate_response_internal(self, query: str, intent: QueryIntent, data: dict, context: ChatContext)->dict:
+        if 'error' in data:
+            return self._data_error_response(data)
+        
+        response = await self.client.chat.completions.create(
+            model= self.model, 
+            response_format={"type": "json_object"}, 
+            messages= self._build_response_messages(query, intent, data), 
+            temperature= 0.3, 
+            max_tokens=1500, 
+            extra_headers=self.api_headers
+        )
+        
+        return self._parse_response_content(response.choices[0].message.content)
+    
+    def _build_response_messages(self, query: str, intent: QueryIntent, data: dict)-> List[Dict[str, str]]:
         data_summary = self._format_data_for_prompt(data)
         
         system_prompt = """
         You are a world-class e-commerce analytics assistant. Your role is to transform raw data into clear, actionable, and structured JSON response for a business intelligence dashboard. 
         
-        You must respond with a JSON object with three keys: "narrative", "data", and "ui_components". 
+        You must respond with a JSON object with three keys: "narrative", "data", and "ui_components". Always output the "narrative" key first.
         1. 'narrative': A concise (2-4 sentences) summary of the key insights from the data. Be conversational but professional. 
         2. 'data': The raw or processed data used for the narrative. This should be a JSON object or arrary. 
         3. 'ui_components': An array of suggested UI components to visualize the data. Valid types are "table", "bar_chart", "line_chart", "kpi".
@@ -145,27 +240,35 @@ class ResponseGenerator:
         Generate the JSON response according to the system instructions
         """ 
         
-        response = await self.client.chat.completions.create(
-            model= self.model, 
-            response_format={"type": "json_object"}, 
-            messages= [
-                {"role": "system", "content": system_prompt}, 
-                {"role": "user", "content": user_prompt}
-            ], 
-            temperature= 0.3, 
-            max_tokens=1500, 
-            extra_headers=self.api_headers
-        )
+        return [
+            {"role": "system", "content": system_prompt}, 
+            {"role": "user", "content": user_prompt}
+        ]
         
+    def _parse_response_content(self, content: str)-> dict:
         try:
-            return json.loads(response.choices[0].message.content)
-        except json.JSONDecodeError:
+            return json.loads(content)
+        except (json.JSONDecodeError, TypeError):
             logger.error("Failed to parse JSON from response generateion LLM.")
             return {
                 "narrative": "I generated a response , but it was formatted incorrectly. This may indicate a problem with the data provided.", 
-                "data": {"raw_response": response.choices[0].message.content}, 
+                "data": {"raw_response": content}, 
                 "ui_components": []
             }
+            
+    def _data_error_response(self, data: dict)-> dict:
+        return {
+            "narrative": f"I encountered an issue retrieving the data: {data['error']}. Please try rephrasing your question", 
+            "data": data, 
+            "ui_components": []
+        }
+        
+    def _generation_error_response(self)-> dict:
+        return {
+            "narrative": "I apologize , but I'm having trouble generating a response right now. Please try again.", 
+            "data": None, 
+            "ui_components": []
+        }
         
         
     def _format_data_for_prompt(self, data: dict)-> str:
@@ -0,0 +1,158 @@
+import logging
+import re
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "chat_analytics:"
+INDEX_PREFIX = "chat_analytics:index:"
+DATE_IN_KEY = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+# Days an index set outlives the keys it lists, so cleanup can still find keys whose own TTL is longer
+INDEX_GRACE_DAYS = 7
+MEMORY_SAMPLE_SIZE = 20
+
+
+class AnalyticsRetentionManager:
+    """Retention for the dated chat analytics keys. Every key is written with a TTL, and also recorded in a
+    per-day index set in the same pipeline, so expiring a day means reading one set instead of walking the
+    keyspace with KEYS. Keys are removed with UNLINK, which frees memory off the main Redis thread, in
+    pipelined batches"""
+
+    def __init__(self):
+        self.redis_manager = redis_manager
+        self.retention_days = getattr(settings, 'CHAT_ANALYTICS_RETENTION_DAYS', 30)
+        self.batch_size = getattr(settings, 'CHAT_ANALYTICS_CLEANUP_BATCH', 500)
+
+    def index_key(self, date_str: str) -> str:
+        return f"{INDEX_PREFIX}{date_str}"
+
+    def track(self, pipe, date_str: str, keys: Iterable[str]):
+        """Queue the index update for keys written on `date_str` on the writer's pipeline"""
+        keys = list(keys)
+        if not keys:
+            return
+        index = self.index_key(date_str)
+        pipe.sadd(index, *keys)
+        pipe.expire(index, (self.retention_days + INDEX_GRACE_DAYS) * 86400)
+
+    def _cutoff(self, days_to_keep: Optional[int]) -> date:
+        return timezone.localdate() - timedelta(days=days_to_keep if days_to_keep is not None else self.retention_days)
+
+    async def _unlink(self, redis_client, keys: List[str]) -> int:
+        removed = 0
+        for start in range(0, len(keys), self.batch_size):
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.unlink(*keys[start:start + self.batch_size])
+            removed += sum(await pipe.execute())
+        return removed
+
+    async def _indexed_days(self, redis_client) -> List[str]:
+        days = []
+        async for index in redis_client.scan_iter(match=f"{INDEX_PREFIX}*", count=1000):
+            days.append(index[len(INDEX_PREFIX):])
+        return sorted(days)
+
+    async def _expire_day(self, redis_client, date_str: str) -> int:
+        """Unlink every key listed in a day's index, then the index itself"""
+        index = self.index_key(date_str)
+        removed = 0
+        batch = []
+        async for key in redis_client.sscan_iter(index, count=self.batch_size):
+            batch.append(key)
+            if len(batch) >= self.batch_size:
+                removed += await self._unlink(redis_client, batch)
+                batch = []
+        if batch:
+            removed += await self._unlink(redis_client, batch)
+        await redis_client.unlink(index)
+        return removed
+
+    async def _sweep_unindexed(self, redis_client, cutoff: date) -> int:
+        """Incremental SCAN for dated keys written before the indexes existed"""
+        removed = 0
+        batch = []
+        async for key in redis_client.scan_iter(match=f"{KEY_PREFIX}*", count=1000):
+            if key.startswith(INDEX_PREFIX):
+                continue
+            match = DATE_IN_KEY.search(key)
+            if not match or date.fromisoformat(match.group(1)) >= cutoff:
+                continue
+            batch.append(key)
+            if len(batch) >= self.batch_size:
+                removed += await self._unlink(redis_client, batch)
+                batch = []
+        if batch:
+            removed += await self._unlink(redis_client, batch)
+        return removed
+
+    async def cleanup(self, days_to_keep: Optional[int] = None, sweep_unindexed: bool = False) -> Dict[str, Any]:
+        """Remove analytics keys dated before the retention cutoff"""
+        started = time.perf_counter()
+        cutoff = self._cutoff(days_to_keep)
+        stats = {"cutoff": cutoff.isoformat(), "days_expired": 0, "keys_removed": 0, "unindexed_removed": 0}
+
+        async with self.redis_manager.get_connection() as redis_client:
+            for date_str in await self._indexed_days(redis_client):
+                if date.fromisoformat(date_str) >= cutoff:
+                    continue
+                stats["keys_removed"] += await self._expire_day(redis_client, date_str)
+                stats["days_expired"] += 1
+            if sweep_unindexed:
+                stats["unindexed_removed"] = await self._sweep_unindexed(redis_client, cutoff)
+
+        stats["duration"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Chat analytics cleanup: {stats}")
+        return stats
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Key counts per indexed day, with memory estimated from a sample of each day's keys, plus Redis-wide
+        memory figures"""
+        async with self.redis_manager.get_connection() as redis_client:
+            days = await self._indexed_days(redis_client)
+
+            pipe = redis_client.pipeline(transaction=False)
+            for date_str in days:
+                pipe.scard(self.index_key(date_str))
+                pipe.srandmember(self.index_key(date_str), MEMORY_SAMPLE_SIZE)
+            results = await pipe.execute()
+
+            pipe = redis_client.pipeline(transaction=False)
+            samples = []
+            for position in range(len(days)):
+                sample = results[2 * position + 1] or []
+                samples.append(len(sample))
+                for key in sample:
+                    pipe.memory_usage(key)
+            usages = await pipe.execute() if any(samples) else []
+
+            per_day = {}
+            offset = 0
+            for position, date_str in enumerate(days):
+                key_count = results[2 * position] or 0
+                sample_usage = [usage for usage in usages[offset:offset + samples[position]] if usage]
+                offset += samples[position]
+                average = sum(sample_usage) / len(sample_usage) if sample_usage else 0
+                per_day[date_str] = {"keys": key_count, "estimated_bytes": int(average * key_count)}
+
+            memory = await redis_client.info("memory")
+            return {
+                "retention_days": self.retention_days,
+                "tracked_keys": sum(day["keys"] for day in per_day.values()),
+                "estimated_bytes": sum(day["estimated_bytes"] for day in per_day.values()),
+                "days": per_day,
+                "redis_keys": await redis_client.dbsize(),
+                "redis_used_memory": memory.get("used_memory"),
+                "redis_used_memory_human": memory.get("used_memory_human"),
+            }
+
+
+# Global instance
+analytics_retention = AnalyticsRetentionManager()
@@ -0,0 +1,106 @@
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NarrativeStreamParser:
+    """Incrementally extracts the 'narrative' string value from a streamed JSON completion. Tokens are fed as they arrive and the decoded narrative text is returned as soon as it is complete enough to emit"""
+
+    KEY_PATTERN = re.compile(r'"narrative"\s*:\s*"')
+    SIMPLE_ESCAPES = {
+        '"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t',
+    }
+
+    def __init__(self):
+        self._chunks = []
+        self._buffer = ""
+        self._state = "seek"
+        self.narrative = ""
+
+    @property
+    def text(self) -> str:
+        """The full raw completion received so far"""
+        return "".join(self._chunks)
+
+    @property
+    def is_narrative_complete(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, token: str) -> str:
+        """Feed the next streamed token. Returns the newly decoded narrative text (may be empty)"""
+        self._chunks.append(token)
+        if self._state == "done":
+            return ""
+
+        self._buffer += token
+
+        if self._state == "seek":
+            match = self.KEY_PATTERN.search(self._buffer)
+            if not match:
+                # Keep only a short tail so a key split across tokens can still be matched
+                self._buffer = self._buffer[-32:]
+                return ""
+            self._buffer = self._buffer[match.end():]
+            self._state = "in_value"
+
+        return self._consume_value()
+
+    def _consume_value(self) -> str:
+        decoded = []
+        buffer = self._buffer
+        pos = 0
+
+        while pos < len(buffer):
+            char = buffer[pos]
+
+            if char == '"':
+                self._state = "done"
+                pos += 1
+                break
+
+            if char != '\\':
+                decoded.append(char)
+                pos += 1
+                continue
+
+            # Escape sequence: wait for more tokens if it is incomplete
+            if pos + 1 >= len(buffer):
+                break
+            escape = buffer[pos + 1]
+
+            if escape in self.SIMPLE_ESCAPES:
+                decoded.append(self.SIMPLE_ESCAPES[escape])
+                pos += 2
+                continue
+
+            if escape == 'u':
+                sequence_length = 6
+                if pos + 6 <= len(buffer):
+                    code_point = int(buffer[pos + 2:pos + 6], 16) if self._is_hex(buffer[pos + 2:pos + 6]) else None
+                    # High surrogates must be decoded together with the following low surrogate
+                    if code_point is not None and 0xD800 <= code_point < 0xDC00:
+                        sequence_length = 12
+                if pos + sequence_length > len(buffer):
+                    break
+                try:
+                    decoded.append(json.loads(f'"{buffer[pos:pos + sequence_length]}"'))
+                except json.JSONDecodeError:
+                    logger.debug(f"Skipping invalid unicode escape in narrative stream: {buffer[pos:pos + sequence_length]}")
+                pos += sequence_length
+                continue
+
+            # Unknown escape, keep it literally
+            decoded.append(escape)
+            pos += 2
+
+        # Drop consumed characters so the buffer only holds an incomplete escape (if any)
+        self._buffer = buffer[pos:]
+        new_text = "".join(decoded)
+        self.narrative += new_text
+        return new_text
+
+    @staticmethod
+    def _is_hex(value: str) -> bool:
+        return len(value) == 4 and all(c in "0123456789abcdefABCDEF" for c in value)
@@ -1,9 +1,11 @@
+from asgiref.sync import async_to_sync
 from celery import shared_task
 from django.utils import timezone
 import logging
 from .models import Agent
 from .services.sales_agent import SalesAnalysisAgent
 from .services.inventory_agent import InventoryManagementAgent
+from .services.chatagent.retention import analytics_retention
 
 logger = logging.getLogger(__name__)
 
@@ -57,3 +59,10 @@ def run_all_agents():
         
     logger.info(f"Queued {agents.count()} agents for execution")
     return f"Queued {agents.count()} agents for analysis "
+
+
+@shared_task(name = "ai_agents.cleanup_chat_analytics")
+def cleanup_chat_analytics(sweep_unindexed: bool = False):
+    """Unlink chat analytics keys dated before the retention cutoff using the per-day key indexes"""
+    stats = async_to_sync(analytics_retention.cleanup)(sweep_unindexed = sweep_unindexed)
+    return f"Removed {stats['keys_removed'] + stats['unindexed_removed']} keys from {stats['days_expired']} days"
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import (AnalyticsEvent, RevenueMetrics, AnalyticsSummary, UserSession, AnalyticsDashboard, UserBehavior)
+from .models import (AnalyticsEvent, RevenueMetrics, ProductSalesDaily, CustomerStats, AnalyticsSummary, UserSession, AnalyticsDashboard, UserBehavior)
 
 @admin.register(AnalyticsEvent)
 class AnalyticsEventAdmin(admin.ModelAdmin):
@@ -8,9 +8,20 @@ class AnalyticsEventAdmin(admin.ModelAdmin):
     
 @admin.register(RevenueMetrics)
 class RevenueMetricsAdmin(admin.ModelAdmin):
-    list_display = ('date', 'total_revenue', 'order_count')
+    list_display = ('date', 'total_revenue', 'order_count', 'units_sold')
     list_filter = ('date',)
     
+@admin.register(ProductSalesDaily)
+class ProductSalesDailyAdmin(admin.ModelAdmin):
+    list_display = ('date', 'product', 'units_sold', 'revenue', 'order_count')
+    list_filter = ('date',)
+    
+@admin.register(CustomerStats)
+class CustomerStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_orders', 'total_spent', 'last_order_at', 'segment')
+    list_filter = ('segment',)
+    search_fields = ('user__email',)
+    
 @admin.register(AnalyticsSummary)
 class AnalyticsSummaryAdmin(admin.ModelAdmin):
     list_display = ('date', 'total_views', 'conversion_rate')
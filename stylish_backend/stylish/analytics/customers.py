@@ -0,0 +1,139 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from ecommerce.models import Order
+from .models import CustomerStats
+
+logger = logging.getLogger(__name__)
+
+# Rejected orders never turned into revenue, so they do not count towards lifetime value
+EXCLUDED_ORDER_STATUSES = ['rejected']
+
+STATS_FIELDS = ["total_orders", "total_spent", "avg_order_value", "first_order_at", "last_order_at", "segment", "updated_at"]
+RFM_FIELDS = ["recency_score", "frequency_score", "monetary_score"]
+
+
+def segment_thresholds() -> Dict[str, Any]:
+    return {
+        "high_value_spend": Decimal(str(getattr(settings, 'CUSTOMER_HIGH_VALUE_SPEND', 1000))),
+        "frequent_orders": getattr(settings, 'CUSTOMER_FREQUENT_ORDERS', 5),
+        "at_risk_days": getattr(settings, 'CUSTOMER_AT_RISK_DAYS', 90),
+        "new_customer_days": getattr(settings, 'CUSTOMER_NEW_DAYS', 30),
+    }
+
+
+def classify_segment(total_orders, total_spent, first_order_at, last_order_at, now=None, thresholds=None) -> str:
+    """Primary segment label for a customer. At-risk wins so lapsed high spenders surface for win-back"""
+    now = now or timezone.now()
+    thresholds = thresholds or segment_thresholds()
+
+    if last_order_at and last_order_at < now - timedelta(days=thresholds["at_risk_days"]):
+        return "at_risk"
+    if total_spent >= thresholds["high_value_spend"]:
+        return "high_value"
+    if total_orders >= thresholds["frequent_orders"]:
+        return "frequent_buyers"
+    if first_order_at and first_order_at >= now - timedelta(days=thresholds["new_customer_days"]):
+        return "new_customers"
+    return "regular"
+
+
+def _order_aggregates(user_ids: Optional[Iterable] = None):
+    orders = Order.objects.exclude(status__in=EXCLUDED_ORDER_STATUSES)
+    if user_ids is not None:
+        orders = orders.filter(user_id__in=user_ids)
+    return (
+        orders.values("user_id")
+        .annotate(
+            total_orders=Count("id"),
+            total_spent=Sum("total_amount"),
+            first_order_at=Min("created_at"),
+            last_order_at=Max("created_at"),
+        )
+        .order_by()
+    )
+
+
+def _build_stats(row: Dict[str, Any], now, thresholds) -> CustomerStats:
+    total_spent = row["total_spent"] or Decimal("0.00")
+    total_orders = row["total_orders"]
+    return CustomerStats(
+        user_id=row["user_id"],
+        total_orders=total_orders,
+        total_spent=total_spent,
+        avg_order_value=(total_spent / total_orders).quantize(Decimal("0.01")) if total_orders else Decimal("0.00"),
+        first_order_at=row["first_order_at"],
+        last_order_at=row["last_order_at"],
+        segment=classify_segment(
+            total_orders, total_spent, row["first_order_at"], row["last_order_at"], now, thresholds
+        ),
+        updated_at=now,
+    )
+
+
+def refresh_customer_stats(user_ids: List[Any]) -> int:
+    """Recompute stats for specific customers from their orders (indexed by user). RFM scores are left to
+    the nightly reconciliation, which needs the whole population. Returns the number of rows written"""
+    now = timezone.now()
+    thresholds = segment_thresholds()
+    stats = [_build_stats(row, now, thresholds) for row in _order_aggregates(user_ids)]
+
+    with transaction.atomic():
+        CustomerStats.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=["user"], update_fields=STATS_FIELDS
+        )
+        # Customers whose only orders were deleted or rejected drop out of the table
+        CustomerStats.objects.filter(user_id__in=user_ids).exclude(
+            user_id__in=[row.user_id for row in stats]
+        ).delete()
+    return len(stats)
+
+
+def _quintile_scores(values: np.ndarray, reverse: bool = False) -> np.ndarray:
+    """Map values to 1-5 by population quintile; reverse gives the lowest values the highest score"""
+    if values.size == 0:
+        return values.astype(np.int16)
+    edges = np.quantile(values, [0.2, 0.4, 0.6, 0.8])
+    scores = np.searchsorted(edges, values, side="right") + 1
+    return (6 - scores if reverse else scores).astype(np.int16)
+
+
+def reconcile_customer_stats(batch_size: int = 2000) -> int:
+    """Recompute every customer's stats and RFM scores from orders in one grouped scan, then upsert in
+    batches. Returns the number of customers written"""
+    now = timezone.now()
+    thresholds = segment_thresholds()
+    stats = [_build_stats(row, now, thresholds) for row in _order_aggregates().iterator(chunk_size=batch_size)]
+
+    if stats:
+        recency_days = np.array([(now - row.last_order_at).total_seconds() / 86400 for row in stats])
+        frequency = np.array([row.total_orders for row in stats], dtype=np.float64)
+        monetary = np.array([float(row.total_spent) for row in stats])
+
+        recency_scores = _quintile_scores(recency_days, reverse=True)
+        frequency_scores = _quintile_scores(frequency)
+        monetary_scores = _quintile_scores(monetary)
+        for i, row in enumerate(stats):
+            row.recency_score = int(recency_scores[i])
+            row.frequency_score = int(frequency_scores[i])
+            row.monetary_score = int(monetary_scores[i])
+
+    for start in range(0, len(stats), batch_size):
+        CustomerStats.objects.bulk_create(
+            stats[start:start + batch_size],
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=STATS_FIELDS + RFM_FIELDS,
+        )
+
+    stale = CustomerStats.objects.filter(updated_at__lt=now).delete()[0]
+    logger.info(f"Reconciled stats for {len(stats)} customers, removed {stale} stale rows")
+    return len(stats)
@@ -0,0 +1,379 @@
+import csv
+import io
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_redis import get_redis_connection
+
+from authentication.models import CustomUser
+from ecommerce.models import Product
+from .models import AnalyticsEvent
+from .uniques import VISITORS, add_to_pipeline
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "analytics:events:stream"
+CONSUMER_GROUP = "analytics-writers"
+STATS_KEY = "analytics:events:ingest:stats"
+DEAD_LETTER_KEY = "analytics:events:dead"
+
+EVENT_TYPES = {value for value, _ in AnalyticsEvent.EVENT_TYPES}
+COPY_COLUMNS = ["id", "user_id", "event_type", "product_id", "search_query", "metadata", "created_at"]
+
+
+class IngestionBackpressure(Exception):
+    """Raised when the event stream backlog is over its limit and producers should retry later"""
+
+    def __init__(self, backlog: int, limit: int):
+        self.backlog = backlog
+        self.limit = limit
+        super().__init__(f"Analytics event backlog {backlog} exceeds limit {limit}")
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def _stream_id_ms(entry_id) -> int:
+    entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+    return int(entry_id.split("-", 1)[0])
+
+
+def build_event(
+    user_id: Any,
+    event_type: str,
+    product_id: Any = None,
+    search_query: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    created_at=None,
+) -> Dict[str, Any]:
+    """Validate and serialise one event for the stream. The primary key is assigned here so a batch that is
+    redelivered after a consumer crash is recognised instead of inserted twice"""
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type '{event_type}'")
+    if product_id is not None:
+        product_id = str(uuid.UUID(str(product_id)))
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": int(user_id),
+        "event_type": event_type,
+        "product_id": product_id,
+        "search_query": (search_query or None) and str(search_query)[:255],
+        "metadata": metadata or {},
+        "created_at": (created_at or timezone.now()).isoformat(),
+    }
+
+
+def track_events(events: List[Dict[str, Any]]) -> int:
+    """Append prepared events to the ingestion stream in one pipelined round trip. Raises
+    IngestionBackpressure instead of growing the stream past ANALYTICS_INGEST_MAX_BACKLOG"""
+    if not events:
+        return 0
+    client = _redis()
+    limit = getattr(settings, 'ANALYTICS_INGEST_MAX_BACKLOG', 1000000)
+    backlog = client.xlen(STREAM_KEY)
+    if backlog + len(events) > limit:
+        raise IngestionBackpressure(backlog, limit)
+
+    pipe = client.pipeline(transaction=False)
+    visitors_by_day: Dict[Any, set] = {}
+    for event in events:
+        pipe.xadd(STREAM_KEY, {"e": json.dumps(event, separators=(",", ":"))})
+        day = timezone.localdate(parse_datetime(event["created_at"]))
+        visitors_by_day.setdefault(day, set()).add(event["user_id"])
+    # Distinct visitors are counted here rather than with COUNT(DISTINCT) over the event table later
+    for day, user_ids in visitors_by_day.items():
+        add_to_pipeline(pipe, VISITORS, user_ids, day)
+    pipe.execute()
+    return len(events)
+
+
+def track_event(user_id: Any, event_type: str, **fields) -> int:
+    """Record a single analytics event from server-side code"""
+    return track_events([build_event(user_id, event_type, **fields)])
+
+
+class AnalyticsEventConsumer:
+    """Drains the event stream into AnalyticsEvent. Entries are read through a consumer group in large
+    batches and written with one COPY per batch; entries are acknowledged and deleted only after the COPY
+    commits, so a crashed worker's batch is reclaimed and retried by another worker"""
+
+    def __init__(
+        self,
+        consumer_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        block_ms: Optional[int] = None,
+        claim_idle_ms: int = 60000,
+    ):
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size or getattr(settings, 'ANALYTICS_INGEST_BATCH_SIZE', 5000)
+        self.block_ms = block_ms or getattr(settings, 'ANALYTICS_INGEST_BLOCK_MS', 1000)
+        self.claim_idle_ms = claim_idle_ms
+        self.client = _redis()
+        self.max_deliveries = getattr(settings, 'ANALYTICS_INGEST_MAX_DELIVERIES', 5)
+        self.stats = {"batches": 0, "written": 0, "dropped": 0, "duplicates": 0, "failed": 0, "dead_lettered": 0}
+
+    def ensure_group(self):
+        try:
+            self.client.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _claim_abandoned(self) -> List[Tuple[Any, Dict]]:
+        """Take over entries another consumer read but never acknowledged"""
+        result = self.client.xautoclaim(
+            STREAM_KEY, CONSUMER_GROUP, self.consumer_name, self.claim_idle_ms, start_id="0-0", count=self.batch_size
+        )
+        return result[1] if result else []
+
+    def _read(self) -> List[Tuple[Any, Dict]]:
+        response = self.client.xreadgroup(
+            CONSUMER_GROUP, self.consumer_name, {STREAM_KEY: ">"}, count=self.batch_size, block=self.block_ms
+        )
+        if not response:
+            return []
+        return response[0][1]
+
+    def _decode(self, entries: Iterable[Tuple[Any, Dict]]) -> List[Dict[str, Any]]:
+        events = []
+        for _, fields in entries:
+            raw = fields.get(b"e") or fields.get("e")
+            if raw is None:
+                continue
+            try:
+                events.append(json.loads(raw))
+            except ValueError:
+                self.stats["dropped"] += 1
+        return events
+
+    def _filter_valid(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop events whose user or product was deleted after the event was queued; one query each"""
+        user_ids = {event["user_id"] for event in events}
+        product_ids = {event["product_id"] for event in events if event["product_id"]}
+        valid_users = set(CustomUser.objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+        valid_products = {
+            str(pk) for pk in Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True)
+        }
+        valid = [
+            event for event in events
+            if event["user_id"] in valid_users and (not event["product_id"] or event["product_id"] in valid_products)
+        ]
+        self.stats["dropped"] += len(events) - len(valid)
+        return valid
+
+    def _rows(self, events: List[Dict[str, Any]]):
+        for event in events:
+            yield (
+                event["id"],
+                event["user_id"],
+                event["event_type"],
+                event["product_id"],
+                event["search_query"],
+                json.dumps(event["metadata"]),
+                event["created_at"],
+            )
+
+    def _copy(self, events: List[Dict[str, Any]]):
+        """COPY the batch into the events table, using whichever psycopg driver Django is running on. The COPY
+        runs on the driver's cursor, so its errors are wrapped by hand to surface as django.db exceptions"""
+        table = connection.ops.quote_name(AnalyticsEvent._meta.db_table)
+        columns = ", ".join(COPY_COLUMNS)
+        with transaction.atomic(), connection.cursor() as cursor, connection.wrap_database_errors:
+            raw = cursor.cursor
+            if hasattr(raw, "copy"):
+                with raw.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                    for row in self._rows(events):
+                        copy.write_row(row)
+            else:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(self._rows(events))
+                buffer.seek(0)
+                raw.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def _insert(self, events: List[Dict[str, Any]]):
+        """Multi-row INSERT skipping ids already present. Used off PostgreSQL and to finish a redelivered
+        batch; bulk_create is avoided because auto_now_add would overwrite the event timestamps"""
+        meta = AnalyticsEvent._meta
+        fields = [meta.get_field(column[:-3] if column.endswith("_id") else column) for column in COPY_COLUMNS]
+        table = connection.ops.quote_name(meta.db_table)
+        placeholders = "(" + ", ".join(["%s"] * len(COPY_COLUMNS)) + ")"
+
+        params = []
+        for row in self._rows(events):
+            values = list(row)
+            values[0] = uuid.UUID(values[0])
+            values[3] = uuid.UUID(values[3]) if values[3] else None
+            values[6] = parse_datetime(values[6])
+            params.extend(
+                value if field.name == "metadata" else field.get_db_prep_value(value, connection)
+                for field, value in zip(fields, values)
+            )
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(events), 500):
+                chunk = params[start * len(COPY_COLUMNS):(start + 500) * len(COPY_COLUMNS)]
+                rows = len(chunk) // len(COPY_COLUMNS)
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(COPY_COLUMNS)}) VALUES {', '.join([placeholders] * rows)} "
+                    # No conflict target: the partitioned table's key is (id, created_at), not id alone
+                    "ON CONFLICT DO NOTHING",
+                    chunk,
+                )
+
+    def write(self, events: List[Dict[str, Any]]):
+        events = self._filter_valid(events)
+        if not events:
+            return
+        try:
+            if connection.vendor == "postgresql":
+                self._copy(events)
+            else:
+                self._insert(events)
+        except IntegrityError:
+            # A redelivered batch that was partly written before a crash; skip the rows already present
+            self.stats["duplicates"] += 1
+            self._insert(events)
+        self.stats["written"] += len(events)
+
+    def process(self, entries: List[Tuple[Any, Dict]]) -> int:
+        if not entries:
+            return 0
+        started = time.perf_counter()
+        self.write(self._decode(entries))
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xack(STREAM_KEY, CONSUMER_GROUP, *entry_ids)
+        pipe.xdel(STREAM_KEY, *entry_ids)
+        pipe.execute()
+
+        elapsed = time.perf_counter() - started
+        self.stats["batches"] += 1
+        self._report(len(entries), elapsed, _stream_id_ms(entry_ids[-1]))
+        return len(entries)
+
+    def _report(self, batch_size: int, elapsed: float, last_entry_ms: int):
+        """Publish throughput and lag of the last batch for get_ingestion_stats"""
+        lag_seconds = max(time.time() * 1000 - last_entry_ms, 0) / 1000
+        try:
+            self.client.hset(STATS_KEY, mapping={
+                "last_batch_size": batch_size,
+                "last_batch_seconds": round(elapsed, 4),
+                "events_per_second": round(batch_size / elapsed, 1) if elapsed else 0,
+                "last_batch_lag_seconds": round(lag_seconds, 3),
+                "last_batch_at": int(time.time()),
+            })
+            self.client.hincrby(STATS_KEY, "total_written", batch_size)
+        except Exception as e:
+            logger.warning(f"Could not publish ingestion stats: {str(e)}")
+
+    def _dead_letter(self, entries: List[Tuple[Any, Dict]]) -> int:
+        """Move entries that have failed max_deliveries times to the dead-letter stream, so one bad batch
+        cannot block the consumers forever. Returns the number moved"""
+        if not entries:
+            return 0
+        entry_ids = [entry_id for entry_id, _ in entries]
+        try:
+            pending = self.client.xpending_range(
+                STREAM_KEY, CONSUMER_GROUP, min=entry_ids[0], max=entry_ids[-1], count=len(entry_ids)
+            )
+        except Exception as e:
+            logger.warning(f"Could not read delivery counts of failed analytics batch: {str(e)}")
+            return 0
+        exhausted = {
+            item["message_id"] for item in pending if item["times_delivered"] >= self.max_deliveries
+        }
+        dead = [(entry_id, fields) for entry_id, fields in entries if entry_id in exhausted]
+        if not dead:
+            return 0
+
+        pipe = self.client.pipeline(transaction=True)
+        for _, fields in dead:
+            pipe.xadd(DEAD_LETTER_KEY, fields)
+        dead_ids = [entry_id for entry_id, _ in dead]
+        pipe.xack(STREAM_KEY, CONSUMER_GROUP, *dead_ids)
+        pipe.xdel(STREAM_KEY, *dead_ids)
+        pipe.execute()
+        self.stats["dead_lettered"] += len(dead)
+        return len(dead)
+
+    def run_once(self) -> int:
+        """Process abandoned entries first, then one batch of new entries. A batch that fails stays pending
+        and is reclaimed after claim_idle_ms; once its entries have been delivered max_deliveries times they
+        are dead-lettered"""
+        entries = self._claim_abandoned()
+        if not entries:
+            entries = self._read()
+        try:
+            return self.process(entries)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Failed to write analytics batch of {len(entries)} events: {str(e)}")
+            # Drop a connection the failure left unusable so the next batch reconnects
+            close_old_connections()
+            moved = self._dead_letter(entries)
+            if moved:
+                logger.error(f"Moved {moved} analytics events to {DEAD_LETTER_KEY} after {self.max_deliveries} attempts")
+            return 0
+
+    def run(self, max_batches: Optional[int] = None, stop_when_idle: bool = False):
+        self.ensure_group()
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            processed = self.run_once()
+            if processed:
+                batches += 1
+            elif stop_when_idle:
+                break
+        return self.stats
+
+
+def oldest_unwritten_event_at():
+    """Timestamp of the oldest event still in the stream, unread or pending, or None if it is empty. Written
+    entries are deleted from the stream, so nothing older than this can still arrive in AnalyticsEvent
+    except events whose created_at was set in the past; the oldest entry's own created_at covers those"""
+    oldest = _redis().xrange(STREAM_KEY, count=1)
+    if not oldest:
+        return None
+    entry_id, fields = oldest[0]
+    queued_at = datetime.fromtimestamp(_stream_id_ms(entry_id) / 1000, tz=dt_timezone.utc)
+    try:
+        created_at = parse_datetime(json.loads(fields.get(b"e") or fields.get("e"))["created_at"])
+    except (TypeError, ValueError, KeyError):
+        created_at = None
+    return min(queued_at, created_at) if created_at else queued_at
+
+
+def get_ingestion_stats() -> Dict[str, Any]:
+    """Backlog, pending entries and lag of the event stream plus the consumers' last reported batch"""
+    client = _redis()
+    backlog = client.xlen(STREAM_KEY)
+    oldest = client.xrange(STREAM_KEY, count=1)
+    lag_seconds = max(time.time() * 1000 - _stream_id_ms(oldest[0][0]), 0) / 1000 if oldest else 0.0
+    try:
+        pending = client.xpending(STREAM_KEY, CONSUMER_GROUP)["pending"]
+    except Exception:
+        pending = 0
+    consumer_stats = {
+        (key.decode() if isinstance(key, bytes) else key): float(value)
+        for key, value in client.hgetall(STATS_KEY).items()
+    }
+    return {
+        "backlog": backlog,
+        "pending": pending,
+        "lag_seconds": round(lag_seconds, 3),
+        "max_backlog": getattr(settings, 'ANALYTICS_INGEST_MAX_BACKLOG', 1000000),
+        "dead_lettered": client.xlen(DEAD_LETTER_KEY),
+        "consumers": consumer_stats,
+    }
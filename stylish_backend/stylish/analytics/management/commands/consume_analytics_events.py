@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from analytics.ingestion import AnalyticsEventConsumer
+
+
+class Command(BaseCommand):
+    help = 'Run a worker that drains the analytics event stream into AnalyticsEvent with batched COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', help='Consumer name within the group (defaults to host-pid)')
+        parser.add_argument('--batch-size', type=int, help='Events read and written per batch')
+        parser.add_argument('--block-ms', type=int, help='How long to wait for new events before polling again')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+        parser.add_argument('--drain', action='store_true', help='Exit once the stream is empty')
+
+    def handle(self, *args, **options):
+        consumer = AnalyticsEventConsumer(
+            consumer_name=options['consumer'],
+            batch_size=options['batch_size'],
+            block_ms=options['block_ms'],
+        )
+        self.stdout.write(f"Consuming analytics events as {consumer.consumer_name}")
+        try:
+            stats = consumer.run(max_batches=options['max_batches'], stop_when_idle=options['drain'])
+        except KeyboardInterrupt:
+            stats = consumer.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {stats['written']} events in {stats['batches']} batches, dropped {stats['dropped']}"
+        ))
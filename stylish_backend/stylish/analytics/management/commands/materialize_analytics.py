@@ -0,0 +1,25 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.materialize import materialize_analytics
+
+
+class Command(BaseCommand):
+    help = 'Materialize AnalyticsSummary and AnalyticsDashboard rows for a date range (idempotent backfill)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First day to materialize (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day to materialize, defaults to yesterday')
+        parser.add_argument('--days', type=int, default=30, help='Number of days ending at --end when --start is not given')
+        parser.add_argument('--chunk-days', type=int, help='Days computed per transaction')
+
+    def handle(self, *args, **options):
+        end_day = options['end'] or timezone.localdate() - timedelta(days=1)
+        start_day = options['start'] or end_day - timedelta(days=options['days'] - 1)
+        if start_day > end_day:
+            raise CommandError('--start must not be after --end')
+
+        written = materialize_analytics(start_day, end_day, chunk_days=options['chunk_days'])
+        self.stdout.write(self.style.SUCCESS(f'Materialized analytics for {written} days ({start_day} to {end_day})'))
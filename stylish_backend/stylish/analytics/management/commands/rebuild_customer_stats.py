@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from analytics.customers import reconcile_customer_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-customer lifetime stats and RFM scores from orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows upserted per batch')
+
+    def handle(self, *args, **options):
+        written = reconcile_customer_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {written} customers'))
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from analytics.rollups import refresh_sales_rollups
+from ecommerce.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Backfill the daily and per-product sales rollups from orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=400, help='Number of days to rebuild, ending today')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days recomputed per transaction')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebuild from the first order onwards, e.g. to mark rows written before rolled_up_at existed',
+        )
+
+    def handle(self, *args, **options):
+        end_day = timezone.localdate()
+        start_day = end_day - timedelta(days=options['days'] - 1)
+        if options['all']:
+            first_order = Order.objects.aggregate(first=Min('created_at'))['first']
+            start_day = min(start_day, timezone.localdate(first_order)) if first_order else start_day
+        chunk = timedelta(days=options['chunk_days'])
+
+        written = 0
+        chunk_start = start_day
+        while chunk_start <= end_day:
+            chunk_end = min(chunk_start + chunk - timedelta(days=1), end_day)
+            written += refresh_sales_rollups(chunk_start, chunk_end)
+            self.stdout.write(f'Rolled up {chunk_start} to {chunk_end}')
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups for {written} days'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+
+from analytics.sessionizer import sessionize_events
+
+
+class Command(BaseCommand):
+    help = 'Build UserSession and UserBehavior rows from analytics events since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=parse_datetime, help='Process events after this ISO timestamp instead of the stored watermark')
+        parser.add_argument('--rebuild', action='store_true', help='Replace sessions overlapping --since instead of extending them')
+
+    def handle(self, *args, **options):
+        stats = sessionize_events(since=options['since'], rebuild=options['rebuild'])
+        if 'skipped' in stats:
+            self.stdout.write(self.style.WARNING(stats['skipped']))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Sessionized {stats['events']} events for {stats['users']} users: {stats['sessions_written']} sessions "
+            f"written, {stats['sessions_resumed']} resumed, {stats['events_per_second']} events/s"
+        ))
@@ -0,0 +1,218 @@
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, DurationField, Exists, ExpressionWrapper, F, OuterRef, Q
+from django.db.models.functions import Coalesce, TruncDate
+
+from authentication.models import CustomUser
+from ecommerce.models import Order
+from .models import AnalyticsDashboard, AnalyticsEvent, AnalyticsSummary, ProductSalesDaily, RevenueMetrics, UserSession
+from .rollups import day_bounds, refresh_sales_rollups
+from .uniques import visitor_counter
+
+logger = logging.getLogger(__name__)
+
+TOP_PRODUCTS_PER_DAY = 10
+
+SUMMARY_FIELDS = ["total_views", "unique_visitors", "conversion_rate", "bounce_rate", "avg_session_duration"]
+DASHBOARD_FIELDS = [
+    "total_revenue", "total_orders", "average_order_value", "total_users", "new_users", "return_users",
+    "top_selling_products", "category_distribution", "cart_abandonment_rate", "items_per_cart",
+    "conversion_rate", "bounce_rate",
+]
+
+
+def _percentage(part, whole) -> float:
+    return round(part / whole * 100, 2) if whole else 0.0
+
+
+def _event_metrics(start, end) -> Dict[date, Dict[str, Any]]:
+    """Views, active users and cart behaviour per day in one grouped scan of the events. A cart is abandoned
+    when the user placed no order later the same day"""
+    ordered_after = Order.objects.filter(
+        user_id=OuterRef("user_id"),
+        created_at__gte=OuterRef("created_at"),
+        created_at__date=OuterRef("day"),
+    )
+    rows = (
+        AnalyticsEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate("created_at"))
+        .alias(ordered_after=Exists(ordered_after))
+        .values("day")
+        .annotate(
+            total_views=Count("id", filter=Q(event_type="view")),
+            active_users=Count("user_id", distinct=True),
+            returning_users=Count("user_id", distinct=True, filter=Q(user__created_at__date__lt=F("day"))),
+            cart_users=Count("user_id", distinct=True, filter=Q(event_type="cart_add")),
+            abandoned_cart_users=Count("user_id", distinct=True, filter=Q(event_type="cart_add", ordered_after=False)),
+        )
+        .order_by()
+    )
+    return {row["day"]: row for row in rows}
+
+
+def _session_metrics(start, end) -> Dict[date, Dict[str, Any]]:
+    """Sessions, bounces, visitors and average duration per day"""
+    rows = (
+        UserSession.objects.filter(start_time__gte=start, start_time__lt=end)
+        .annotate(day=TruncDate("start_time"))
+        .values("day")
+        .annotate(
+            sessions=Count("id"),
+            bounced=Count("id", filter=Q(pages_viewed__lte=1)),
+            known_visitors=Count("user_id", distinct=True),
+            anonymous_sessions=Count("id", filter=Q(user__isnull=True)),
+            avg_duration=Avg(
+                ExpressionWrapper(F("end_time") - F("start_time"), output_field=DurationField()),
+                filter=Q(end_time__isnull=False),
+            ),
+        )
+        .order_by()
+    )
+    return {row["day"]: row for row in rows}
+
+
+def _hll_visitors(start_day: date, end_day: date) -> Dict[date, int]:
+    """Distinct visitors per day from the ingestion HyperLogLogs. Empty when Redis is unavailable or the days
+    are older than the counters' retention, in which case the SQL counts are used"""
+    days = [start_day + timedelta(days=offset) for offset in range((end_day - start_day).days + 1)]
+    try:
+        return {day: count for day, count in visitor_counter.count_days(days).items() if count}
+    except Exception as e:
+        logger.warning(f"Visitor HyperLogLogs unavailable, counting visitors in SQL: {str(e)}")
+        return {}
+
+
+def _daily_counts(queryset, field: str, start, end, **aggregates) -> Dict[date, Dict[str, Any]]:
+    rows = (
+        queryset.filter(**{f"{field}__gte": start, f"{field}__lt": end})
+        .annotate(day=TruncDate(field))
+        .values("day")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    return {row["day"]: row for row in rows}
+
+
+def _product_metrics(start_day: date, end_day: date):
+    """Top sellers and top-level category revenue shares per day from the per-product rollups"""
+    rows = (
+        ProductSalesDaily.objects.filter(date__gte=start_day, date__lte=end_day)
+        .annotate(top_category=Coalesce("product__category__parent__name", "product__category__name"))
+        .values("date", "product_id", "product__name", "top_category", "units_sold", "revenue")
+        .order_by("date", "-units_sold", "-revenue")
+    )
+    top_products: Dict[date, List[Dict[str, Any]]] = {}
+    categories: Dict[date, Dict[str, Dict[str, Any]]] = {}
+    for row in rows.iterator(chunk_size=5000):
+        day = row["date"]
+        products = top_products.setdefault(day, [])
+        if len(products) < TOP_PRODUCTS_PER_DAY:
+            products.append({
+                "id": str(row["product_id"]),
+                "name": row["product__name"],
+                "category": row["top_category"] or "Uncategorized",
+                "units_sold": row["units_sold"],
+                "revenue": float(row["revenue"]),
+            })
+        category = categories.setdefault(day, {}).setdefault(
+            row["top_category"] or "Uncategorized", {"revenue": 0.0, "units_sold": 0, "products_sold": 0}
+        )
+        category["revenue"] += float(row["revenue"])
+        category["units_sold"] += row["units_sold"]
+        category["products_sold"] += 1
+
+    for day_categories in categories.values():
+        total = sum(category["revenue"] for category in day_categories.values())
+        for category in day_categories.values():
+            category["revenue"] = round(category["revenue"], 2)
+            category["sales_percentage"] = _percentage(category["revenue"], total)
+    return top_products, categories
+
+
+def materialize_analytics_range(start_day: date, end_day: date, refresh_rollups: bool = True) -> int:
+    """Compute AnalyticsSummary and AnalyticsDashboard rows for every day in [start_day, end_day] with a
+    fixed number of grouped queries regardless of the range length, then upsert them by date. Safe to re-run:
+    each day's rows are fully recomputed. Returns the number of days written"""
+    if end_day < start_day:
+        return 0
+    if refresh_rollups:
+        refresh_sales_rollups(start_day, end_day)
+    start, end = day_bounds(start_day, end_day)
+
+    revenue = {row.date: row for row in RevenueMetrics.objects.filter(date__gte=start_day, date__lte=end_day)}
+    events = _event_metrics(start, end)
+    sessions = _session_metrics(start, end)
+    buyers = _daily_counts(
+        Order.objects.exclude(status="rejected"), "created_at", start, end, buyers=Count("user_id", distinct=True)
+    )
+    signups = _daily_counts(CustomUser.objects.all(), "created_at", start, end, new_users=Count("id"))
+    top_products, categories = _product_metrics(start_day, end_day)
+    hll_visitors = _hll_visitors(start_day, end_day)
+
+    summaries, dashboards = [], []
+    day = start_day
+    while day <= end_day:
+        event_row = events.get(day, {})
+        session_row = sessions.get(day, {})
+        metrics = revenue.get(day)
+
+        # Visitors come from the ingestion HyperLogLogs while they are retained, then from sessions, and
+        # finally from the distinct users in the events
+        visitors = session_row.get("known_visitors", 0) + session_row.get("anonymous_sessions", 0)
+        visitors = hll_visitors.get(day) or visitors or event_row.get("active_users", 0)
+        conversion_rate = _percentage(buyers.get(day, {}).get("buyers", 0), visitors)
+        bounce_rate = _percentage(session_row.get("bounced", 0), session_row.get("sessions", 0))
+        order_count = metrics.order_count if metrics else 0
+
+        summaries.append(AnalyticsSummary(
+            date=day,
+            total_views=event_row.get("total_views", 0),
+            unique_visitors=visitors,
+            conversion_rate=conversion_rate,
+            bounce_rate=bounce_rate,
+            avg_session_duration=session_row.get("avg_duration"),
+        ))
+        dashboards.append(AnalyticsDashboard(
+            date=day,
+            total_revenue=metrics.total_revenue if metrics else Decimal("0.00"),
+            total_orders=order_count,
+            average_order_value=metrics.average_order_value if metrics else Decimal("0.00"),
+            total_users=event_row.get("active_users", 0),
+            new_users=signups.get(day, {}).get("new_users", 0),
+            return_users=event_row.get("returning_users", 0),
+            top_selling_products=top_products.get(day, []),
+            category_distribution=categories.get(day, {}),
+            cart_abandonment_rate=_percentage(event_row.get("abandoned_cart_users", 0), event_row.get("cart_users", 0)),
+            items_per_cart=round(metrics.units_sold / order_count, 2) if order_count else 0.0,
+            conversion_rate=conversion_rate,
+            bounce_rate=bounce_rate,
+        ))
+        day += timedelta(days=1)
+
+    with transaction.atomic():
+        AnalyticsSummary.objects.bulk_create(
+            summaries, batch_size=500, update_conflicts=True, unique_fields=["date"], update_fields=SUMMARY_FIELDS
+        )
+        AnalyticsDashboard.objects.bulk_create(
+            dashboards, batch_size=500, update_conflicts=True, unique_fields=["date"], update_fields=DASHBOARD_FIELDS
+        )
+
+    logger.info(f"Materialized analytics for {start_day} to {end_day} ({len(dashboards)} days)")
+    return len(dashboards)
+
+
+def materialize_analytics(start_day: date, end_day: date, chunk_days: int = None) -> int:
+    """Backfill a date range in chunks so long ranges keep each transaction and result set bounded"""
+    chunk_days = chunk_days or getattr(settings, 'ANALYTICS_MATERIALIZE_CHUNK_DAYS', 31)
+    written = 0
+    chunk_start = start_day
+    while chunk_start <= end_day:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_day)
+        written += materialize_analytics_range(chunk_start, chunk_end)
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
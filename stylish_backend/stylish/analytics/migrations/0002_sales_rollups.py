@@ -0,0 +1,70 @@
+# Generated by Django 5.1.6 on 2026-10-19 03:48
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+        ("ecommerce", "0002_flashsale_is_public"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="revenuemetrics",
+            name="status_counts",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="revenuemetrics",
+            name="units_sold",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="revenuemetrics",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name="ProductSalesDaily",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("units_sold", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("order_count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales",
+                        to="ecommerce.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["product", "date"],
+                        name="analytics_p_product_7e5827_idx",
+                    )
+                ],
+                "unique_together": {("date", "product")},
+            },
+        ),
+    ]
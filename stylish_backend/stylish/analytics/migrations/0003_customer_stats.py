@@ -0,0 +1,88 @@
+# Generated by Django 5.1.6 on 2026-10-19 03:53
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_sales_rollups"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerStats",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("total_orders", models.IntegerField(default=0)),
+                (
+                    "total_spent",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "avg_order_value",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("first_order_at", models.DateTimeField(null=True)),
+                ("last_order_at", models.DateTimeField(null=True)),
+                ("recency_score", models.SmallIntegerField(default=0)),
+                ("frequency_score", models.SmallIntegerField(default=0)),
+                ("monetary_score", models.SmallIntegerField(default=0)),
+                (
+                    "segment",
+                    models.CharField(
+                        choices=[
+                            ("at_risk", "At Risk"),
+                            ("high_value", "High Value"),
+                            ("frequent_buyers", "Frequent Buyers"),
+                            ("new_customers", "New Customers"),
+                            ("regular", "Regular"),
+                        ],
+                        default="regular",
+                        max_length=20,
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="customer_stats",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["segment", "-total_spent"],
+                        name="analytics_c_segment_347054_idx",
+                    ),
+                    models.Index(
+                        fields=["-total_spent"], name="analytics_c_total_s_bad83c_idx"
+                    ),
+                    models.Index(
+                        fields=["total_orders"], name="analytics_c_total_o_9269ce_idx"
+                    ),
+                    models.Index(
+                        fields=["last_order_at"], name="analytics_c_last_or_8744d2_idx"
+                    ),
+                    models.Index(
+                        fields=["first_order_at"], name="analytics_c_first_o_5fd575_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
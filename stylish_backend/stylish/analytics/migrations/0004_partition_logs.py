@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:03
+
+from django.db import migrations
+
+from core.partitioning import partition_table, unpartition_table
+
+
+PARTITIONED = [
+    ("AnalyticsEvent", "created_at"),
+]
+
+
+def partition_logs(apps, schema_editor):
+    for model, column in PARTITIONED:
+        partition_table(schema_editor, apps.get_model("analytics", model)._meta.db_table, column)
+
+
+def unpartition_logs(apps, schema_editor):
+    for model, column in PARTITIONED:
+        unpartition_table(schema_editor, apps.get_model("analytics", model)._meta.db_table, column)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0003_customer_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_logs, unpartition_logs),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:07
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0004_partition_logs"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="usersession",
+            name="session_id",
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="usersession",
+            name="start_time",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="usersession",
+            index=models.Index(
+                fields=["user", "end_time"], name="analytics_u_user_id_eaa655_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usersession",
+            index=models.Index(
+                fields=["start_time"], name="analytics_u_start_t_bb7164_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usersession",
+            index=models.Index(
+                fields=["end_time"], name="analytics_u_end_tim_16c1a2_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:41
+
+from django.db import migrations, models
+
+
+# Existing rows stay unmarked, so readers aggregate orders for them until they are rolled up again; run
+# `manage.py rebuild_sales_rollups --all` after deploying to bring them back onto the rollups
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0005_session_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="revenuemetrics",
+            name="rolled_up_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
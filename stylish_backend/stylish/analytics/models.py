@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from datetime import timedelta
 import uuid
 
@@ -31,7 +32,12 @@ class RevenueMetrics(models.Model):
     total_revenue = models.DecimalField(max_digits=10, decimal_places=2)
     order_count = models.IntegerField()
     average_order_value = models.DecimalField(max_digits=10, decimal_places=2)
+    units_sold = models.IntegerField(default = 0)
+    status_counts = models.JSONField(default = dict)
+    # Set only by analytics.rollups; rows without it were written elsewhere and are not trusted as rollups
+    rolled_up_at = models.DateTimeField(null = True, blank = True)
     created_at = models.DateTimeField(auto_now_add  = True)
+    updated_at = models.DateTimeField(auto_now = True)
     
     class Meta:
         ordering = ['-date']
@@ -46,6 +52,63 @@ class RevenueMetrics(models.Model):
     def __str__(self):
         return f"Revenue for {self.date}: ${self.total_revenue}"
     
+    
+class ProductSalesDaily(models.Model):
+    """Per-product daily sales rollup, maintained by analytics.rollups"""
+    id = models.UUIDField(primary_key = True, default = uuid.uuid4, editable = False)
+    date = models.DateField()
+    product = models.ForeignKey('ecommerce.Product', on_delete = models.CASCADE, related_name = 'daily_sales')
+    units_sold = models.IntegerField(default = 0)
+    revenue = models.DecimalField(max_digits = 12, decimal_places = 2, default = 0)
+    order_count = models.IntegerField(default = 0)
+    updated_at = models.DateTimeField(auto_now = True)
+    
+    class Meta:
+        unique_together = ('date', 'product')
+        indexes = [
+            models.Index(fields = ['product', 'date']), 
+        ]
+        
+    def __str__(self):
+        return f"{self.product_id} on {self.date}: {self.units_sold} units"
+    
+
+class CustomerStats(models.Model):
+    """Per-customer lifetime stats and RFM scores, maintained by analytics.customers"""
+    SEGMENT_CHOICES = [
+        ('at_risk', 'At Risk'), 
+        ('high_value', 'High Value'), 
+        ('frequent_buyers', 'Frequent Buyers'), 
+        ('new_customers', 'New Customers'), 
+        ('regular', 'Regular'), 
+    ]
+    id = models.UUIDField(primary_key = True, default = uuid.uuid4, editable = False)
+    user = models.OneToOneField('authentication.CustomUser', on_delete = models.CASCADE, related_name = 'customer_stats')
+    total_orders = models.IntegerField(default = 0)
+    total_spent = models.DecimalField(max_digits = 12, decimal_places = 2, default = 0)
+    avg_order_value = models.DecimalField(max_digits = 10, decimal_places = 2, default = 0)
+    first_order_at = models.DateTimeField(null = True)
+    last_order_at = models.DateTimeField(null = True)
+    
+    # RFM quintile scores (1-5), recomputed by the nightly reconciliation
+    recency_score = models.SmallIntegerField(default = 0)
+    frequency_score = models.SmallIntegerField(default = 0)
+    monetary_score = models.SmallIntegerField(default = 0)
+    segment = models.CharField(max_length = 20, choices = SEGMENT_CHOICES, default = 'regular')
+    updated_at = models.DateTimeField(auto_now = True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields = ['segment', '-total_spent']), 
+            models.Index(fields = ['-total_spent']), 
+            models.Index(fields = ['total_orders']), 
+            models.Index(fields = ['last_order_at']), 
+            models.Index(fields = ['first_order_at']), 
+        ]
+        
+    def __str__(self):
+        return f"{self.user_id}: {self.total_orders} orders, ${self.total_spent}"
+    
 
 class AnalyticsSummary(models.Model):
     id = models.UUIDField(primary_key = True, default = uuid.uuid4, editable=False)
@@ -60,12 +123,19 @@ class AnalyticsSummary(models.Model):
 class UserSession(models.Model):
     id = models.UUIDField(primary_key = True, default = uuid.uuid4, editable = False)
     user = models.ForeignKey('authentication.CustomUser', on_delete = models.CASCADE, null = True)
-    session_id = models.CharField(max_length=100)
-    start_time = models.DateTimeField(auto_now_add = True)
+    session_id = models.CharField(max_length=100, unique = True)
+    start_time = models.DateTimeField(default = timezone.now)
     end_time = models.DateTimeField(null = True)
     pages_viewed = models.IntegerField(default = 0)
     created_at = models.DateTimeField(auto_now_add = True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields = ['user', 'end_time']), 
+            models.Index(fields = ['start_time']), 
+            models.Index(fields = ['end_time']), 
+        ]
+    
 class AnalyticsDashboard(models.Model):
     id = models.UUIDField(primary_key = True, default = uuid.uuid4, editable = False)
     date = models.DateField(unique = True)
@@ -0,0 +1,265 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from ecommerce.models import Order, OrderItem
+from .models import ProductSalesDaily, RevenueMetrics
+
+logger = logging.getLogger(__name__)
+
+DIRTY_DAYS_KEY = "analytics:sales_rollup:dirty"
+ORDER_STATUSES = [value for value, _ in Order.STATUS_CHOICES]
+
+
+def _redis():
+    return get_redis_connection("default")
+
+
+def day_bounds(start_day: date, end_day: date):
+    """Timezone-aware [start, end) datetimes covering whole days from start_day to end_day inclusive"""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def mark_sales_day_dirty(day: date):
+    """Flag a day whose orders changed so the next rollup refresh recomputes it. Never raises"""
+    try:
+        _redis().sadd(DIRTY_DAYS_KEY, day.isoformat())
+    except Exception as e:
+        logger.warning(f"Could not mark sales day {day} dirty: {str(e)}")
+
+
+def refresh_dirty_sales_days() -> int:
+    """Recompute every day flagged by the order hooks. Returns the number of days refreshed"""
+    client = _redis()
+    batch_size = getattr(settings, 'SALES_ROLLUP_DIRTY_BATCH', 100)
+    refreshed = 0
+
+    while True:
+        raw_days = client.spop(DIRTY_DAYS_KEY, batch_size)
+        if not raw_days:
+            break
+        days = sorted(
+            date.fromisoformat(raw.decode() if isinstance(raw, bytes) else raw)
+            for raw in raw_days
+        )
+        try:
+            for day in days:
+                refresh_sales_rollups(day, day)
+        except Exception:
+            # Put the batch back so a failed refresh is retried on the next run
+            client.sadd(DIRTY_DAYS_KEY, *[day.isoformat() for day in days])
+            raise
+        refreshed += len(days)
+
+    return refreshed
+
+
+def refresh_sales_rollups(start_day: date, end_day: date) -> int:
+    """Recompute the daily and per-product rollups for [start_day, end_day] with set-based queries.
+    Every day in the range gets a RevenueMetrics row, including days without orders, so readers can
+    tell a covered range from a missing one. Returns the number of days written"""
+    start, end = day_bounds(start_day, end_day)
+
+    status_aggregates = {
+        f"status_{status}": Count("id", filter=Q(status=status)) for status in ORDER_STATUSES
+    }
+    daily_orders = {
+        row["day"]: row
+        for row in Order.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(
+            total_revenue=Sum("total_amount"),
+            order_count=Count("id"),
+            **status_aggregates,
+        )
+        .order_by()
+    }
+
+    item_rows = list(
+        OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end)
+        .annotate(day=TruncDate("order__created_at"))
+        .values("day", "product_id")
+        .annotate(
+            units_sold=Sum("quantity"),
+            revenue=Sum(F("quantity") * F("price")),
+            order_count=Count("order_id", distinct=True),
+        )
+        .order_by()
+    )
+
+    daily_units: Dict[date, int] = {}
+    for row in item_rows:
+        daily_units[row["day"]] = daily_units.get(row["day"], 0) + (row["units_sold"] or 0)
+
+    days = [start_day + timedelta(days=offset) for offset in range((end_day - start_day).days + 1)]
+
+    now = timezone.now()
+    daily_metrics = []
+    for day in days:
+        row = daily_orders.get(day, {})
+        total_revenue = row.get("total_revenue") or Decimal("0.00")
+        order_count = row.get("order_count", 0)
+        daily_metrics.append(
+            RevenueMetrics(
+                date=day,
+                total_revenue=total_revenue,
+                order_count=order_count,
+                average_order_value=(
+                    (total_revenue / order_count).quantize(Decimal("0.01")) if order_count else Decimal("0.00")
+                ),
+                units_sold=daily_units.get(day, 0),
+                status_counts={status: row.get(f"status_{status}", 0) for status in ORDER_STATUSES},
+                rolled_up_at=now,
+                updated_at=now,
+            )
+        )
+
+    # Upserts keep concurrent refreshes of the same day from failing on the unique keys
+    with transaction.atomic():
+        RevenueMetrics.objects.bulk_create(
+            daily_metrics,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["date"],
+            update_fields=[
+                "total_revenue", "order_count", "average_order_value", "units_sold", "status_counts",
+                "rolled_up_at", "updated_at",
+            ],
+        )
+
+        ProductSalesDaily.objects.filter(date__in=days).delete()
+        ProductSalesDaily.objects.bulk_create(
+            [
+                ProductSalesDaily(
+                    date=row["day"],
+                    product_id=row["product_id"],
+                    units_sold=row["units_sold"] or 0,
+                    revenue=row["revenue"] or Decimal("0.00"),
+                    order_count=row["order_count"],
+                )
+                for row in item_rows
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["date", "product"],
+            update_fields=["units_sold", "revenue", "order_count", "updated_at"],
+        )
+
+    logger.info(f"Refreshed sales rollups for {start_day} to {end_day} ({len(days)} days, {len(item_rows)} product rows)")
+    return len(days)
+
+
+def rollups_cover(start_day: date, end_day: date) -> bool:
+    """True if every day in [start_day, end_day] has been rolled up by refresh_sales_rollups. Rows written
+    any other way (seed data, older imports) have no rolled_up_at and do not count"""
+    if end_day < start_day:
+        return True
+    expected = (end_day - start_day).days + 1
+    return RevenueMetrics.objects.filter(
+        date__gte=start_day, date__lte=end_day, rolled_up_at__isnull=False
+    ).count() == expected
+
+
+def product_rollups_cover(start_day: date, end_day: date) -> bool:
+    """True if every day in [start_day, end_day] has been rolled up and the per-product rows account for
+    every unit in the daily rows. Both are written in one transaction, so a mismatch means the per-product
+    table was cleared or never filled and readers should aggregate orders instead"""
+    if end_day < start_day:
+        return True
+    expected = (end_day - start_day).days + 1
+    daily = RevenueMetrics.objects.filter(
+        date__gte=start_day, date__lte=end_day, rolled_up_at__isnull=False
+    ).aggregate(days=Count("id"), units=Sum("units_sold"))
+    if daily["days"] != expected:
+        return False
+    product_units = ProductSalesDaily.objects.filter(date__gte=start_day, date__lte=end_day).aggregate(
+        units=Sum("units_sold")
+    )["units"]
+    return (product_units or 0) == (daily["units"] or 0)
+
+
+def get_sales_summary(start_day: date, end_day: date) -> Dict[str, Any]:
+    """Order totals, revenue, units and per-status counts summed from the daily rollups"""
+    rows = RevenueMetrics.objects.filter(date__gte=start_day, date__lte=end_day).values_list(
+        "total_revenue", "order_count", "units_sold", "status_counts"
+    )
+    revenue, total, units = Decimal("0.00"), 0, 0
+    by_status = {status: 0 for status in ORDER_STATUSES}
+
+    for total_revenue, order_count, units_sold, status_counts in rows:
+        revenue += total_revenue
+        total += order_count
+        units += units_sold
+        for status, count in (status_counts or {}).items():
+            by_status[status] = by_status.get(status, 0) + count
+
+    return {
+        "total": total,
+        "revenue": float(revenue),
+        "units": units,
+        "by_status": by_status,
+    }
+
+
+def get_sales_timeline(
+    start_day: date, end_day: date, group_by: str = "day", live: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Revenue, orders and units per day, week or month from the daily rollups. `live` adds one
+    not-yet-rolled-up day (normally today) given as {"day", "revenue", "orders", "units"}"""
+    rows = [
+        (day, float(total_revenue), order_count, units_sold)
+        for day, total_revenue, order_count, units_sold in RevenueMetrics.objects.filter(
+            date__gte=start_day, date__lte=end_day
+        )
+        .order_by("date")
+        .values_list("date", "total_revenue", "order_count", "units_sold")
+    ]
+    if live:
+        rows.append((live["day"], float(live["revenue"]), live["orders"], live["units"]))
+
+    buckets: Dict[date, Dict[str, Any]] = {}
+    for day, revenue, order_count, units_sold in rows:
+        if group_by == "week":
+            bucket = day - timedelta(days=day.weekday())
+        elif group_by == "month":
+            bucket = day.replace(day=1)
+        else:
+            bucket = day
+        entry = buckets.setdefault(bucket, {"period": bucket.isoformat(), "revenue": 0.0, "orders": 0, "units": 0})
+        entry["revenue"] += revenue
+        entry["orders"] += order_count
+        entry["units"] += units_sold
+
+    return list(buckets.values())
+
+
+def get_product_sales(
+    start_day: date, end_day: date, product_ids: Optional[Iterable] = None
+) -> Dict[Any, Dict[str, Any]]:
+    """Units, revenue and order count per product summed from the per-product rollups"""
+    queryset = ProductSalesDaily.objects.filter(date__gte=start_day, date__lte=end_day)
+    if product_ids is not None:
+        queryset = queryset.filter(product_id__in=product_ids)
+
+    return {
+        row["product_id"]: {
+            "units": row["units"] or 0,
+            "revenue": float(row["revenue"] or 0),
+            "orders": row["orders"] or 0,
+        }
+        for row in queryset.values("product_id")
+        .annotate(units=Sum("units_sold"), revenue=Sum("revenue"), orders=Sum("order_count"))
+        .order_by()
+    }
@@ -0,0 +1,295 @@
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .ingestion import oldest_unwritten_event_at
+from .models import AnalyticsEvent, UserBehavior, UserSession
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_KEY = "analytics:sessionizer:watermark"
+STATS_KEY = "analytics:sessionizer:stats"
+LOCK_KEY = "analytics:sessionizer:lock"
+
+# Caps on the per-session lists so one very long session cannot grow a user's state without bound
+MAX_SEARCH_QUERIES = 20
+MAX_FILTER_KEYS = 20
+
+PAGE_EVENTS = ('view', 'search')
+SESSION_NAMESPACE = uuid.UUID('6f1d3c1e-5b7a-4f43-9a9e-3f0d2b1c8e77')
+
+
+def session_key(user_id: Any, started_at: datetime) -> str:
+    """Deterministic session id, so re-running the sessionizer over the same events updates rather than
+    duplicates sessions"""
+    return str(uuid.uuid5(SESSION_NAMESPACE, f"{user_id}:{started_at.isoformat()}"))
+
+
+def event_page(event_type: str, product_id: Any, search_query: Optional[str], metadata: Dict[str, Any]) -> str:
+    if metadata.get('page'):
+        return str(metadata['page'])[:255]
+    if event_type == 'search':
+        return f"/search?q={search_query or ''}"[:255]
+    if product_id:
+        return f"/product/{product_id}"
+    return f"/{event_type}"
+
+
+class OpenSession:
+    """Running state of one user's current session. Only a handful of counters and capped lists are kept"""
+
+    __slots__ = (
+        'session_id', 'user_id', 'start', 'end', 'page_views', 'entry_page', 'exit_page',
+        'search_queries', 'filter_usage', 'cart_additions', 'cart_removals', 'purchased', 'events',
+    )
+
+    def __init__(self, user_id, start: datetime, entry_page: str):
+        self.session_id = session_key(user_id, start)
+        self.user_id = user_id
+        self.start = start
+        self.end = start
+        self.page_views = 0
+        self.entry_page = entry_page
+        self.exit_page = entry_page
+        self.search_queries: List[str] = []
+        self.filter_usage: Dict[str, int] = {}
+        self.cart_additions = 0
+        self.cart_removals = 0
+        self.purchased = False
+        self.events = 0
+
+    @classmethod
+    def resume(cls, session: UserSession, behavior: Optional[UserBehavior]) -> 'OpenSession':
+        state = cls(session.user_id, session.start_time, behavior.entry_page if behavior else '/')
+        state.session_id = session.session_id
+        state.end = session.end_time or session.start_time
+        state.page_views = session.pages_viewed
+        if behavior:
+            state.exit_page = behavior.exit_page or state.entry_page
+            state.search_queries = list(behavior.search_queries or [])[-MAX_SEARCH_QUERIES:]
+            state.filter_usage = dict(behavior.filter_usage or {})
+            state.cart_additions = behavior.cart_additions
+            state.cart_removals = behavior.cart_removals
+            state.purchased = behavior.cart_additions > 0 and not behavior.cart_abandonment
+        return state
+
+    def add(self, event_type: str, created_at: datetime, page: str, search_query, metadata: Dict[str, Any]):
+        self.end = max(self.end, created_at)
+        self.events += 1
+        if event_type in PAGE_EVENTS:
+            self.page_views += 1
+            self.exit_page = page
+        if event_type == 'search':
+            if search_query:
+                self.search_queries = (self.search_queries + [search_query])[-MAX_SEARCH_QUERIES:]
+            for key in ('sorted_by', 'filter_applied'):
+                if metadata.get(key) and (key in self.filter_usage or len(self.filter_usage) < MAX_FILTER_KEYS):
+                    self.filter_usage[key] = self.filter_usage.get(key, 0) + 1
+        elif event_type == 'cart_add':
+            self.cart_additions += 1
+        elif event_type == 'cart_remove':
+            self.cart_removals += 1
+        elif event_type == 'purchase':
+            self.purchased = True
+
+    def rows(self):
+        session = UserSession(
+            user_id=self.user_id,
+            session_id=self.session_id,
+            start_time=self.start,
+            end_time=self.end,
+            pages_viewed=self.page_views,
+        )
+        behavior = UserBehavior(
+            user_id=self.user_id,
+            session_id=self.session_id,
+            page_views=self.page_views,
+            time_spent=self.end - self.start,
+            entry_page=self.entry_page,
+            exit_page=self.exit_page,
+            search_queries=self.search_queries,
+            filter_usage=self.filter_usage,
+            cart_additions=self.cart_additions,
+            cart_removals=self.cart_removals,
+            cart_abandonment=self.cart_additions > 0 and not self.purchased,
+        )
+        return session, behavior
+
+
+class Sessionizer:
+    """Turns the event log into UserSession and UserBehavior rows. Events are streamed per group of users in
+    (user, time) order, so only the session of the user currently being read is held in memory; a gap of
+    more than `gap` between two events of a user closes the session. Sessions still open at the end of a run
+    are written as they stand and resumed by the next run"""
+
+    def __init__(self, gap_minutes: Optional[int] = None, batch_size: Optional[int] = None, user_chunk: int = 500):
+        self.gap = timedelta(minutes=gap_minutes or getattr(settings, 'ANALYTICS_SESSION_GAP_MINUTES', 30))
+        self.batch_size = batch_size or getattr(settings, 'ANALYTICS_SESSIONIZE_BATCH_SIZE', 2000)
+        self.user_chunk = user_chunk
+        self.pending: List[OpenSession] = []
+        self.stats = {"events": 0, "users": 0, "sessions_written": 0, "sessions_resumed": 0}
+
+    def _resumable(self, user_ids: List[Any], since: datetime) -> Dict[Any, OpenSession]:
+        """The latest session of each user that ended within one gap of `since` and can still be extended"""
+        sessions = {}
+        for session in UserSession.objects.filter(
+            user_id__in=user_ids, end_time__gte=since - self.gap, end_time__lte=since
+        ).order_by('user_id', 'end_time'):
+            sessions[session.user_id] = session
+        behaviors = {
+            behavior.session_id: behavior
+            for behavior in UserBehavior.objects.filter(session_id__in=[s.session_id for s in sessions.values()])
+        }
+        return {
+            user_id: OpenSession.resume(session, behaviors.get(session.session_id))
+            for user_id, session in sessions.items()
+        }
+
+    def _emit(self, state: OpenSession):
+        self.pending.append(state)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        sessions, behaviors = zip(*(state.rows() for state in self.pending))
+        with transaction.atomic():
+            UserSession.objects.bulk_create(
+                sessions,
+                update_conflicts=True,
+                unique_fields=['session_id'],
+                update_fields=['end_time', 'pages_viewed'],
+            )
+            UserBehavior.objects.bulk_create(
+                behaviors,
+                update_conflicts=True,
+                unique_fields=['session_id'],
+                update_fields=[
+                    'page_views', 'time_spent', 'exit_page', 'search_queries', 'filter_usage',
+                    'cart_additions', 'cart_removals', 'cart_abandonment', 'updated_at',
+                ],
+            )
+        self.stats["sessions_written"] += len(self.pending)
+        self.pending = []
+
+    def _events(self, user_ids: List[Any], since: datetime, until: datetime) -> Iterable:
+        return (
+            AnalyticsEvent.objects.filter(user_id__in=user_ids, created_at__gt=since, created_at__lte=until)
+            .order_by('user_id', 'created_at')
+            .values_list('user_id', 'event_type', 'created_at', 'product_id', 'search_query', 'metadata')
+            .iterator(chunk_size=self.batch_size)
+        )
+
+    def process(self, since: datetime, until: datetime) -> Dict[str, Any]:
+        """Sessionize events in (since, until]"""
+        started = time.perf_counter()
+        user_ids = list(
+            AnalyticsEvent.objects.filter(created_at__gt=since, created_at__lte=until)
+            .order_by('user_id').values_list('user_id', flat=True).distinct()
+        )
+        self.stats["users"] = len(user_ids)
+
+        for offset in range(0, len(user_ids), self.user_chunk):
+            chunk = user_ids[offset:offset + self.user_chunk]
+            resumable = self._resumable(chunk, since)
+            state: Optional[OpenSession] = None
+
+            for user_id, event_type, created_at, product_id, search_query, metadata in self._events(chunk, since, until):
+                self.stats["events"] += 1
+                metadata = metadata or {}
+                page = event_page(event_type, product_id, search_query, metadata)
+
+                if state is not None and (state.user_id != user_id or created_at - state.end > self.gap):
+                    self._emit(state)
+                    state = None
+                if state is None:
+                    previous = resumable.pop(user_id, None)
+                    if previous is not None and created_at - previous.end <= self.gap:
+                        state = previous
+                        self.stats["sessions_resumed"] += 1
+                    else:
+                        state = OpenSession(user_id, created_at, page)
+                state.add(event_type, created_at, page, search_query, metadata)
+
+            if state is not None:
+                self._emit(state)
+        self.flush()
+
+        elapsed = time.perf_counter() - started
+        self.stats.update({
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "duration": round(elapsed, 3),
+            "events_per_second": round(self.stats["events"] / elapsed, 1) if elapsed else 0.0,
+        })
+        logger.info(f"Sessionized events: {self.stats}")
+        return self.stats
+
+
+def rebuild_from(since: datetime) -> datetime:
+    """Prepare a re-run from `since`: sessions overlapping it are removed and the start moves back to the
+    earliest of them, so their events are replayed instead of counted twice"""
+    start = since
+    # Moving the start back can bring other users' sessions into range, so repeat until it is stable
+    while True:
+        earliest = (
+            UserSession.objects.filter(end_time__gte=start)
+            .order_by('start_time').values_list('start_time', flat=True).first()
+        )
+        if earliest is None or earliest >= start:
+            break
+        start = earliest
+    with transaction.atomic():
+        session_ids = UserSession.objects.filter(end_time__gte=start).values('session_id')
+        UserBehavior.objects.filter(session_id__in=session_ids).delete()
+        UserSession.objects.filter(end_time__gte=start).delete()
+    # Events at exactly `start` belong to the replayed sessions, and the window is exclusive at the start
+    return start - timedelta(microseconds=1)
+
+
+def sessionize_events(since: Optional[datetime] = None, rebuild: bool = False) -> Dict[str, Any]:
+    """Sessionize everything recorded since the stored watermark (or `since`) and advance the watermark.
+    Events younger than ANALYTICS_SESSIONIZE_DELAY_SECONDS are left for the next run, and the watermark never
+    passes the oldest event still waiting in the ingestion stream, so events written late by a lagging
+    consumer are not skipped"""
+    # The cache swallows connection errors and returns None, so only an explicit False means "held"
+    if cache.add(LOCK_KEY, 1, timeout=3600) is False:
+        return {"skipped": "another sessionizer run is in progress"}
+    try:
+        until = timezone.now() - timedelta(seconds=getattr(settings, 'ANALYTICS_SESSIONIZE_DELAY_SECONDS', 120))
+        try:
+            unwritten = oldest_unwritten_event_at()
+        except Exception as e:
+            logger.warning(f"Could not read the ingestion backlog, using the sessionize delay only: {str(e)}")
+            unwritten = None
+        if unwritten is not None:
+            # The window is exclusive at the start, so the next run still picks up events at `unwritten`
+            until = min(until, unwritten - timedelta(microseconds=1))
+        if since is None:
+            stored = cache.get(WATERMARK_KEY)
+            since = parse_datetime(stored) if stored else until - timedelta(days=1)
+        if rebuild:
+            since = rebuild_from(since)
+        if until <= since:
+            # Keep the watermark where it is; moving it back would count the sessions after it twice
+            return {"skipped": f"no settled events after the watermark {since.isoformat()}"}
+
+        stats = Sessionizer().process(since, until)
+        cache.set(WATERMARK_KEY, until.isoformat(), timeout=None)
+        cache.set(STATS_KEY, stats, timeout=None)
+        return stats
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def get_sessionizer_stats() -> Dict[str, Any]:
+    return {"watermark": cache.get(WATERMARK_KEY), "last_run": cache.get(STATS_KEY)}
@@ -0,0 +1,47 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from ecommerce.models import Order, OrderItem
+from .customers import refresh_customer_stats
+from .rollups import mark_sales_day_dirty
+
+logger = logging.getLogger(__name__)
+
+
+def _mark_order_day(order):
+    if order is None or order.created_at is None:
+        return
+    day = timezone.localdate(order.created_at)
+    transaction.on_commit(lambda: mark_sales_day_dirty(day))
+
+
+def _refresh_customer(user_id):
+    try:
+        refresh_customer_stats([user_id])
+    except Exception as e:
+        # The nightly reconciliation repairs anything missed here
+        logger.error(f"Failed to refresh customer stats for user {user_id}: {str(e)}")
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed(sender, instance, **kwargs):
+    """Flag the order's day for the sales rollup refresh and update the customer's lifetime stats"""
+    _mark_order_day(instance)
+    user_id = instance.user_id
+    transaction.on_commit(lambda: _refresh_customer(user_id))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    """Flag the parent order's day for the sales rollup refresh"""
+    try:
+        _mark_order_day(instance.order)
+    except Order.DoesNotExist:
+        # Parent already deleted; its own post_delete flagged the day
+        pass
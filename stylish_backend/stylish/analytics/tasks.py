@@ -0,0 +1,65 @@
+from celery import shared_task
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+import logging
+from .customers import reconcile_customer_stats
+from .materialize import materialize_analytics
+from .rollups import refresh_dirty_sales_days, refresh_sales_rollups
+from .sessionizer import sessionize_events
+from . import uniques
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name = "analytics.refresh_dirty_sales_rollups")
+def refresh_dirty_sales_rollups():
+    """Recompute the sales rollups for days touched by order saves since the last run"""
+    refreshed = refresh_dirty_sales_days()
+    if refreshed:
+        logger.info(f"Refreshed sales rollups for {refreshed} dirty days")
+    return f"Refreshed {refreshed} days"
+
+
+@shared_task(name = "analytics.reconcile_sales_rollups")
+def reconcile_sales_rollups(days: int = None):
+    """Nightly full recompute of recent days, catching bulk writes and updates that bypass the order hooks"""
+    days = days or getattr(settings, 'SALES_ROLLUP_RECONCILE_DAYS', 7)
+    end_day = timezone.localdate()
+    start_day = end_day - timedelta(days = days - 1)
+    written = refresh_sales_rollups(start_day, end_day)
+    return f"Reconciled {written} days ({start_day} to {end_day})"
+
+
+@shared_task(name = "analytics.reconcile_customer_stats")
+def reconcile_customer_stats_task():
+    """Nightly recompute of every customer's lifetime stats, segment and RFM scores"""
+    written = reconcile_customer_stats()
+    return f"Reconciled stats for {written} customers"
+
+
+@shared_task(name = "analytics.materialize_daily_analytics")
+def materialize_daily_analytics(days: int = None):
+    """Nightly materialization of the dashboard and summary rows. Recent days are recomputed so late events
+    and order changes are picked up"""
+    days = days or getattr(settings, 'ANALYTICS_MATERIALIZE_DAYS', 2)
+    end_day = timezone.localdate() - timedelta(days = 1)
+    start_day = end_day - timedelta(days = days - 1)
+    written = materialize_analytics(start_day, end_day)
+    return f"Materialized {written} days ({start_day} to {end_day})"
+
+
+@shared_task(name = "analytics.sessionize_events")
+def sessionize_events_task():
+    """Fold events recorded since the last run into UserSession and UserBehavior rows"""
+    stats = sessionize_events()
+    if "skipped" in stats:
+        return stats["skipped"]
+    return f"Sessionized {stats['events']} events for {stats['users']} users ({stats['events_per_second']} events/s)"
+
+
+@shared_task(name = "analytics.merge_unique_counters")
+def merge_unique_counters():
+    """Fold today's and yesterday's distinct-user HyperLogLogs into their week and month counters"""
+    merged = uniques.merge_unique_counters(days = 2)
+    return f"Merged {merged} daily unique counters"
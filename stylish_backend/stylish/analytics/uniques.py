@@ -0,0 +1,159 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from django.conf import settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# Namespaces of the distinct-user counters. Storefront visitors are fed by event ingestion, chat users by the
+# chat agent's analytics tracker
+VISITORS = "analytics:uniques:visitors"
+CHAT_USERS = "chat_analytics:users:unique"
+NAMESPACES = (VISITORS, CHAT_USERS)
+
+DAY = "d"
+WEEK = "w"
+MONTH = "m"
+
+
+def _day(when: Union[date, datetime, None]) -> date:
+    if when is None:
+        return timezone.localdate()
+    if isinstance(when, datetime):
+        return timezone.localdate(when) if timezone.is_aware(when) else when.date()
+    return when
+
+
+def day_key(namespace: str, day: date) -> str:
+    return f"{namespace}:{DAY}:{day:%Y-%m-%d}"
+
+
+def week_key(namespace: str, day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{namespace}:{WEEK}:{year}-W{week:02d}"
+
+
+def month_key(namespace: str, day: date) -> str:
+    return f"{namespace}:{MONTH}:{day:%Y-%m}"
+
+
+def week_days(day: date) -> List[date]:
+    monday = day - timedelta(days=day.weekday())
+    return [monday + timedelta(days=offset) for offset in range(7)]
+
+
+def month_days(day: date) -> List[date]:
+    first = day.replace(day=1)
+    following = (first + timedelta(days=32)).replace(day=1)
+    return [first + timedelta(days=offset) for offset in range((following - first).days)]
+
+
+def ttl_seconds(period: str) -> int:
+    """Days a counter is kept, by period. Daily keys only need to outlive the month they are merged into"""
+    defaults = {DAY: 40, WEEK: 120, MONTH: 400}
+    retention = getattr(settings, 'ANALYTICS_UNIQUES_RETENTION_DAYS', {})
+    return int(retention.get(period, defaults[period])) * 86400
+
+
+def add_to_pipeline(pipe, namespace: str, members: Iterable[Any], when=None):
+    """Queue PFADD of `members` into the day's counter on an existing (sync or async) pipeline, so callers
+    that already make a round trip record uniques without another one"""
+    members = [str(member) for member in members if member is not None]
+    if not members:
+        return
+    key = day_key(namespace, _day(when))
+    pipe.pfadd(key, *members)
+    pipe.expire(key, ttl_seconds(DAY))
+
+
+class UniqueCounter:
+    """Distinct-user counts kept as Redis HyperLogLogs: a fixed ~12 KB per counter and about 1% error
+    regardless of traffic. Members are added to one counter per day; days are merged with PFMERGE into
+    calendar week and month counters, which outlive the daily ones. Counts across several days are unions,
+    so a user active on three days of a week is counted once"""
+
+    def __init__(self, namespace: str, client=None):
+        self.namespace = namespace
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_redis_connection("default")
+        return self._client
+
+    def add(self, members: Iterable[Any], when=None):
+        pipe = self.client.pipeline(transaction=False)
+        add_to_pipeline(pipe, self.namespace, members, when)
+        pipe.execute()
+
+    def count(self, when=None) -> int:
+        return self.client.pfcount(day_key(self.namespace, _day(when)))
+
+    def count_days(self, days: List[date]) -> Dict[date, int]:
+        """Daily distinct counts for several days in one round trip"""
+        if not days:
+            return {}
+        pipe = self.client.pipeline(transaction=False)
+        for day in days:
+            pipe.pfcount(day_key(self.namespace, day))
+        return dict(zip(days, pipe.execute()))
+
+    def count_union(self, days: List[date]) -> int:
+        """Distinct members over a set of days; PFCOUNT merges the day counters on the fly"""
+        if not days:
+            return 0
+        return self.client.pfcount(*[day_key(self.namespace, day) for day in days])
+
+    def _count_period(self, key: str, days: List[date]) -> int:
+        # The merged counter also holds days whose daily keys already expired; the daily keys cover the part
+        # of the period that has not been merged yet
+        keys = [key] + [day_key(self.namespace, day) for day in days if day <= timezone.localdate()]
+        return self.client.pfcount(*keys)
+
+    def count_week(self, when=None) -> int:
+        day = _day(when)
+        return self._count_period(week_key(self.namespace, day), week_days(day))
+
+    def count_month(self, when=None) -> int:
+        day = _day(when)
+        return self._count_period(month_key(self.namespace, day), month_days(day))
+
+    def merge(self, when=None) -> Dict[str, str]:
+        """Fold the day's counter into its week and month counters. PFMERGE includes the destination, so
+        merging again, or after older daily keys expired, keeps everything already merged"""
+        day = _day(when)
+        source = day_key(self.namespace, day)
+        week, month = week_key(self.namespace, day), month_key(self.namespace, day)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.pfmerge(week, source)
+        pipe.expire(week, ttl_seconds(WEEK))
+        pipe.pfmerge(month, source)
+        pipe.expire(month, ttl_seconds(MONTH))
+        pipe.execute()
+        return {"week": week, "month": month}
+
+    def summary(self, when=None) -> Dict[str, int]:
+        day = _day(when)
+        return {"daily": self.count(day), "weekly": self.count_week(day), "monthly": self.count_month(day)}
+
+
+def merge_unique_counters(days: int = 2, namespaces: Optional[Iterable[str]] = None) -> int:
+    """Merge the last `days` daily counters of every namespace into their week and month counters. Today is
+    included so the rollups stay current; re-merging a day is harmless"""
+    today = timezone.localdate()
+    merged = 0
+    for namespace in namespaces or NAMESPACES:
+        counter = UniqueCounter(namespace)
+        for offset in range(days):
+            counter.merge(today - timedelta(days=offset))
+            merged += 1
+    return merged
+
+
+# Global instances
+visitor_counter = UniqueCounter(VISITORS)
+chat_user_counter = UniqueCounter(CHAT_USERS)
@@ -0,0 +1,11 @@
+from django.urls import path
+from .views import AnalyticsDashboardView, AnalyticsEventIngestView, AnalyticsIngestionStatusView, AnalyticsUniquesView
+
+app_name = 'analytics'
+
+urlpatterns = [
+    path('events/', AnalyticsEventIngestView.as_view(), name = 'ingest_events'),
+    path('dashboard/', AnalyticsDashboardView.as_view(), name = 'dashboard'),
+    path('events/status/', AnalyticsIngestionStatusView.as_view(), name = 'ingestion_status'),
+    path('uniques/', AnalyticsUniquesView.as_view(), name = 'uniques'),
+]
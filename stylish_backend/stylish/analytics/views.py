@@ -1,3 +1,128 @@
-from django.shortcuts import render
+import logging
+from datetime import date, timedelta
 
-# Create your views here.
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+
+from authentication.core.base_view import BaseAPIView
+from authentication.core.response import standardized_response
+
+from .ingestion import IngestionBackpressure, build_event, get_ingestion_stats, track_events
+from .models import AnalyticsDashboard
+from .sessionizer import get_sessionizer_stats
+from .uniques import chat_user_counter, visitor_counter
+
+logger = logging.getLogger(__name__)
+
+MAX_EVENTS_PER_REQUEST = 500
+
+
+class AnalyticsEventIngestView(BaseAPIView):
+    """Endpoint for recording analytics events. Accepts one event or {"events": [...]}; events are queued on
+    a Redis stream and written to the database in batches"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        payload = request.data.get('events', [request.data]) if hasattr(request.data, 'get') else request.data
+        if not isinstance(payload, list) or not payload:
+            return Response(
+                standardized_response(success = False, error = "No events provided"), status = status.HTTP_400_BAD_REQUEST
+            )
+        if len(payload) > MAX_EVENTS_PER_REQUEST:
+            return Response(
+                standardized_response(success = False, error = f"At most {MAX_EVENTS_PER_REQUEST} events per request"),
+                status = status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            events = [
+                build_event(
+                    request.user.id,
+                    item.get('event_type'),
+                    product_id = item.get('product_id'),
+                    search_query = item.get('search_query'),
+                    metadata = item.get('metadata') if isinstance(item.get('metadata'), dict) else None,
+                )
+                for item in payload
+            ]
+        except (AttributeError, TypeError, ValueError) as e:
+            return Response(
+                standardized_response(success = False, error = f"Invalid event: {str(e)}"), status = status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            accepted = track_events(events)
+        except IngestionBackpressure as e:
+            logger.warning(str(e))
+            response = Response(
+                standardized_response(success = False, error = "Event ingestion is busy, retry later"),
+                status = status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = '5'
+            return response
+
+        return Response(standardized_response(success = True, data = {'accepted': accepted}), status = status.HTTP_202_ACCEPTED)
+
+
+class AnalyticsIngestionStatusView(BaseAPIView):
+    """Endpoint reporting event stream backlog, consumer throughput, ingestion lag and sessionizer progress"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        data = get_ingestion_stats()
+        data['sessionizer'] = get_sessionizer_stats()
+        return Response(standardized_response(success = True, data = data))
+
+
+class AnalyticsDashboardView(BaseAPIView):
+    """Endpoint serving the materialized daily dashboard rows for a date range (defaults to the last 30 days)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            end_day = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else timezone.localdate()
+            start_day = (
+                date.fromisoformat(request.query_params['start']) if 'start' in request.query_params
+                else end_day - timedelta(days = 29)
+            )
+        except ValueError:
+            return Response(
+                standardized_response(success = False, error = "Dates must be YYYY-MM-DD"), status = status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = list(
+            AnalyticsDashboard.objects.filter(date__gte = start_day, date__lte = end_day)
+            .order_by('date')
+            .values()
+        )
+        return Response(standardized_response(success = True, data = rows))
+
+
+class AnalyticsUniquesView(BaseAPIView):
+    """Endpoint serving approximate distinct storefront visitors and chat users for a day (defaults to today)
+    and its calendar week and month"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            day = date.fromisoformat(request.query_params['date']) if 'date' in request.query_params else timezone.localdate()
+        except ValueError:
+            return Response(
+                standardized_response(success = False, error = "Date must be YYYY-MM-DD"), status = status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            data = {
+                'date': day.isoformat(),
+                'visitors': visitor_counter.summary(day),
+                'chat_users': chat_user_counter.summary(day),
+            }
+        except Exception as e:
+            logger.error(f"Failed to read unique counters: {str(e)}")
+            return Response(
+                standardized_response(success = False, error = "Unique counters unavailable"),
+                status = status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        return Response(standardized_response(success = True, data = data))
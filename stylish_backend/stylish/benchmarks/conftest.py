@@ -0,0 +1,132 @@
+import io
+import os
+import random
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.test import override_settings
+from faker import Faker
+
+from authentication.management.commands import seed_authentication
+from core.profiling import query_profiler
+from core.tracing import tracer
+from ecommerce.management.commands import seed_orders, seed_products
+
+SEED = 20240601
+# Multiplies the row counts below; query budgets must hold at any scale
+SCALE = float(os.getenv('BENCHMARK_SCALE', '1'))
+
+USERS = 60
+PARENT_CATEGORIES = 8
+CHILD_CATEGORIES = 30
+PRODUCTS = 300
+IMAGES_PER_PRODUCT = 3
+FLASH_SALES = 6
+REVIEWS = 600
+ORDERS = 800
+ORDER_DAYS = 180
+
+BENCHMARK_SETTINGS = {
+    # Cache hits would hide the queries being budgeted, and Redis is not needed for anything measured here
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+}
+
+
+def _scaled(count: int) -> int:
+    return max(1, int(count * SCALE))
+
+
+def _command(module):
+    return module.Command(stdout = io.StringIO(), stderr = io.StringIO())
+
+
+def _create_product_images(products):
+    # seed_products downloads every image; rows pointing at placeholder paths exercise the same queries
+    from ecommerce.models import ProductImage
+
+    ProductImage.objects.bulk_create([
+        ProductImage(
+            product = product, image = f"products/benchmark_{product.id}_{index}.jpg",
+            alt_text = f"{product.name} - View {index + 1}", order = index, is_primary = index == 0,
+        )
+        for product in products
+        for index in range(IMAGES_PER_PRODUCT)
+    ])
+
+
+def seed_dataset() -> SimpleNamespace:
+    """Build the benchmark dataset with the seed commands' own generators, seeded so every run produces the
+    same rows. Network image downloads are skipped"""
+    from authentication.models import CustomUser
+    from ecommerce.models import Category, Product
+
+    random.seed(SEED)
+    Faker.seed(SEED)
+    quiet = {'stdout': io.StringIO(), 'stderr': io.StringIO()}
+
+    with transaction.atomic():
+        _command(seed_authentication).create_users(_scaled(USERS))
+
+        products_command = _command(seed_products)
+        with mock.patch.object(seed_products.Command, '_download_and_save_image'):
+            categories = products_command.create_categories(PARENT_CATEGORIES, CHILD_CATEGORIES)
+            products = products_command.create_products(categories, _scaled(PRODUCTS))
+            for product in products:
+                products_command.create_product_variations_and_variants(product)
+            _create_product_images(products)
+            # Reseeded so the flash sales, which the list endpoints' budgets depend on, are the same at any scale
+            random.seed(SEED)
+            products_command.create_flash_sales(FLASH_SALES)
+
+        users = list(CustomUser.objects.filter(is_superuser = False).order_by('id'))
+        products_command.create_reviews(users, products, _scaled(REVIEWS))
+
+        _command(seed_orders).create_orders(
+            CustomUser.objects.order_by('id'), Product.objects.order_by('id'), Category.objects.all(),
+            _scaled(ORDERS), ORDER_DAYS,
+        )
+
+    call_command('seed_inventory', products = len(products), **quiet)
+
+    # Derived tables the MCP tools read instead of scanning orders
+    call_command('rebuild_sales_rollups', days = ORDER_DAYS + 1, **quiet)
+    call_command('rebuild_customer_stats', **quiet)
+    call_command('build_similar_products', **quiet)
+
+    return SimpleNamespace(
+        admin = CustomUser.objects.get(username = 'admin'),
+        product_ids = [product.id for product in products],
+        category_ids = [category.id for category in categories],
+    )
+
+
+@pytest.fixture(scope = 'session')
+def benchmark_settings():
+    # The tracer and profiler read their settings once at import, so they are patched directly
+    with (
+        override_settings(**BENCHMARK_SETTINGS),
+        mock.patch.object(tracer, 'enabled', False),
+        mock.patch.object(query_profiler, 'sample_rate', 0.0),
+    ):
+        yield
+
+
+@pytest.fixture(scope = 'session')
+def dataset(django_db_setup, django_db_blocker, benchmark_settings):
+    """The seeded dataset, created once per session and committed; tests marked django_db roll back their
+    own writes"""
+    with django_db_blocker.unblock():
+        return seed_dataset()
+
+
+@pytest.fixture
+def admin_client(dataset):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(dataset.admin)
+    return client
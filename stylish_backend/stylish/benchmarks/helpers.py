@@ -0,0 +1,60 @@
+from typing import Any, Callable, Dict, Tuple
+
+from core.profiling import QueryProfile, query_profiler
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def profile_queries(func: Callable, *args, **kwargs) -> Tuple[Any, QueryProfile]:
+    """Run func once and return its result with the queries it ran. The profile follows the context into
+    sync_to_async and MCP pool threads, which pytest-django's per-connection query capture does not"""
+    profile = QueryProfile()
+    token = query_profiler.start(profile)
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        query_profiler.stop(token)
+    return result, profile
+
+
+def assert_query_budget(profile: QueryProfile, max_queries: int, max_duplicates: int = None, label: str = ''):
+    summary = profile.summary()
+    duplicates = '\n'.join(f"  {entry['count']}x {entry['sql']}" for entry in summary['top_duplicates'])
+    detail = f"{label}: {summary['queries']} queries ({summary['duplicates']} duplicates) in {summary['db_ms']}ms"
+    if duplicates:
+        detail += f"\ntop duplicates:\n{duplicates}"
+    assert summary['queries'] <= max_queries, f"query budget of {max_queries} exceeded by {detail}"
+    if max_duplicates is not None:
+        assert summary['duplicates'] <= max_duplicates, f"duplicate budget of {max_duplicates} exceeded by {detail}"
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = (len(sorted_values) - 1) * pct / 100
+    lower = int(index)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (index - lower)
+
+
+def record_latency(benchmark, profile: QueryProfile) -> Dict[str, float]:
+    """Attach the query profile and latency percentiles to the benchmark's saved JSON (extra_info)"""
+    summary = profile.summary()
+    benchmark.extra_info['queries'] = summary['queries']
+    benchmark.extra_info['duplicate_queries'] = summary['duplicates']
+    benchmark.extra_info['db_ms'] = summary['db_ms']
+
+    stats = getattr(benchmark, 'stats', None)
+    data = sorted(stats.stats.data) if stats is not None else []
+    latencies = {f"p{pct}_ms": round(percentile(data, pct) * 1000, 3) for pct in PERCENTILES}
+    benchmark.extra_info.update(latencies)
+    return latencies
+
+
+def run_benchmark(benchmark, func: Callable, *args, max_queries: int, max_duplicates: int = None, **kwargs):
+    """Check func's query budget on a cold run, then benchmark it and record latency percentiles"""
+    result, profile = profile_queries(func, *args, **kwargs)
+    assert_query_budget(profile, max_queries, max_duplicates, label = getattr(func, '__name__', repr(func)))
+    benchmark(func, *args, **kwargs)
+    record_latency(benchmark, profile)
+    return result
@@ -0,0 +1,104 @@
+"""Query budgets and latency of the admin dashboard endpoints.
+
+Budgets are the query counts measured on the seeded dataset plus two. They depend on page sizes and on the
+fixed number of categories and flash sales, never on the number of products or orders, so a new per-row query
+(an N+1) fails here whatever the data. When an N+1 is fixed, lower the budget in the same change"""
+import pytest
+
+from .helpers import run_benchmark
+
+pytestmark = pytest.mark.django_db
+
+PAGE_SIZE = 20
+CATEGORY_PAGE_SIZE = 5
+
+
+def _get(client, path, **params):
+    response = client.get(path, params)
+    assert response.status_code == 200, response.content[:500]
+    return response
+
+
+@pytest.mark.parametrize('params, max_queries', [
+    ({}, 28),
+    ({'search': 'shirt'}, 29),
+    ({'stock_status': 'instock', 'sort_by': 'price'}, 29),
+    ({'min_price': '50', 'max_price': '150'}, 28),
+    # The basic-info queryset defers fields the list serializer still reads, one query per product each
+    ({'loadBasicInfo': 'true'}, 65),
+], ids = ['default', 'search', 'in-stock-by-price', 'price-range', 'basic-info'])
+def test_product_list(benchmark, admin_client, params, max_queries):
+    run_benchmark(
+        benchmark, _get, admin_client, '/api/admin/products/', page_size = PAGE_SIZE, **params,
+        max_queries = max_queries,
+    )
+
+
+def test_product_list_by_category(benchmark, admin_client, dataset):
+    from django.db.models import Count
+    from ecommerce.models import Category
+
+    # A page the largest category fills at any scale
+    category = Category.objects.annotate(product_count = Count('product')).order_by('-product_count', 'name').first()
+    run_benchmark(
+        benchmark, _get, admin_client, '/api/admin/products/', page_size = CATEGORY_PAGE_SIZE,
+        category_id = str(category.id), max_queries = 16,
+    )
+
+
+def test_product_filter_options(benchmark, admin_client):
+    run_benchmark(benchmark, _get, admin_client, '/api/admin/products/filters/', max_queries = 3)
+
+
+def test_product_detail(benchmark, admin_client, dataset):
+    product_id = dataset.product_ids[0]
+    run_benchmark(benchmark, _get, admin_client, f'/api/admin/products/{product_id}/', max_queries = 8)
+
+
+def test_product_update(benchmark, admin_client, dataset):
+    product_id = dataset.product_ids[1]
+
+    def update():
+        response = admin_client.patch(
+            f'/api/admin/products/{product_id}/', {'description': 'Benchmark description'}, format = 'json'
+        )
+        assert response.status_code == 200, response.content[:500]
+        return response
+
+    run_benchmark(benchmark, update, max_queries = 13)
+
+
+def test_stock_adjustment(benchmark, admin_client, dataset):
+    product_id = dataset.product_ids[2]
+
+    def adjust():
+        response = admin_client.post(
+            f'/api/admin/products/{product_id}/stock_adjustment/',
+            {'quantity': 1, 'adjustment_type': 'add', 'reason': 'benchmark'}, format = 'json',
+        )
+        assert response.status_code == 200, response.content[:500]
+        return response
+
+    run_benchmark(benchmark, adjust, max_queries = 14)
+
+
+def test_category_tree(benchmark, admin_client):
+    # Unpaginated, with children and parent name queried per category
+    run_benchmark(benchmark, _get, admin_client, '/api/admin/categories/', max_queries = 71)
+
+
+def test_root_categories(benchmark, admin_client):
+    run_benchmark(benchmark, _get, admin_client, '/api/admin/categories/root_categories/', max_queries = 11)
+
+
+# Unpaginated, with item counts, units sold and each item's product queried per sale
+@pytest.mark.parametrize('status, max_queries', [(None, 92), ('active', 17), ('upcoming', 47), ('expired', 34)])
+def test_flash_sale_list(benchmark, admin_client, status, max_queries):
+    params = {'status': status} if status else {}
+    run_benchmark(benchmark, _get, admin_client, '/api/admin/flash_sales/', max_queries = max_queries, **params)
+
+
+def test_flash_sale_stats(benchmark, admin_client):
+    run_benchmark(
+        benchmark, _get, admin_client, '/api/admin/flash_sales/stats/', bypass_cache = 'true', max_queries = 6
+    )
@@ -0,0 +1,64 @@
+"""Query budgets and latency of every MCP tool handler, called the way the chat agent calls them. The handlers
+run their queries on the MCP database pool, and profile_queries follows them there"""
+import pytest
+from asgiref.sync import async_to_sync
+
+from ai_agents.mcp_server.services import mcp_service
+
+from .helpers import run_benchmark
+
+pytestmark = pytest.mark.django_db
+
+# (tool name, arguments, query budget: measured count plus two); every registered tool needs at least one case
+CASES = [
+    ('get_sales_analytics', {'period': '30days'}, 7),
+    (
+        'get_sales_analytics',
+        {'period': '90days', 'group_by': 'week', 'metrics': ['revenue', 'orders', 'top_products']},
+        9,
+    ),
+    ('get_sales_analytics', {'period': '1year', 'group_by': 'category'}, 4),
+    ('get_inventory_status', {'alert_level': 'all', 'include_recommendations': True}, 4),
+    ('get_inventory_status', {'alert_level': 'low_stock'}, 4),
+    ('get_customer_insights', {'segment': 'all', 'analysis_type': 'behavior'}, 5),
+    ('get_customer_insights', {'segment': 'high_value', 'analysis_type': 'ltv', 'time_period': '1year'}, 3),
+    ('get_customer_insights', {'segment': 'at_risk', 'analysis_type': 'behavior', 'time_period': '30days'}, 5),
+    ('get_order_management', {'status': 'all', 'analytics': True}, 4),
+    ('get_order_management', {'status': 'processing'}, 4),
+    ('get_product_recommendations', {'recommendation_type': 'trending'}, 3),
+    ('get_product_recommendations', {'recommendation_type': 'similar', 'product_id': 'first'}, 6),
+    ('get_product_recommendations', {'recommendation_type': 'personal', 'customer_id': 'first'}, 5),
+    ('get_inventory_forecast', {'forecast_days': 30, 'historical_days': 90, 'limit': 20}, 6),
+]
+
+
+def _call_tool(name, args):
+    result = async_to_sync(mcp_service.get_server().tool_handlers[name])(args)
+    assert 'error' not in result, result
+    return result
+
+
+def _resolve(args, dataset):
+    """Replace 'first' placeholders with ids from the seeded dataset"""
+    from authentication.models import CustomUser
+
+    resolved = dict(args)
+    if resolved.get('product_id') == 'first':
+        resolved['product_id'] = str(dataset.product_ids[0])
+    if resolved.get('customer_id') == 'first':
+        resolved['customer_id'] = (
+            CustomUser.objects.filter(order__isnull = False).order_by('id').values_list('id', flat = True).first()
+        )
+    return resolved
+
+
+def test_every_tool_has_a_case():
+    covered = {name for name, _, _ in CASES}
+    assert set(mcp_service.get_server().tool_handlers) <= covered
+
+
+@pytest.mark.parametrize(
+    'name, args, max_queries', CASES, ids = [f"{name}-{index}" for index, (name, _, _) in enumerate(CASES)]
+)
+def test_tool_handler(benchmark, dataset, name, args, max_queries):
+    run_benchmark(benchmark, _call_tool, name, _resolve(args, dataset), max_queries = max_queries)
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .profiling import install_query_profiler
+
+        connection_created.connect(install_query_profiler, dispatch_uid = 'core.query_profiler')
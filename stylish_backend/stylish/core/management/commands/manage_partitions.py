@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.partitioning import EXPIRY_ACTIONS, PARTITIONED_TABLES, PartitionManager
+
+
+class Command(BaseCommand):
+    help = 'Pre-create upcoming monthly partitions and retire expired ones for the partitioned log tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, help='Months of future partitions to keep ready')
+        parser.add_argument('--action', choices=EXPIRY_ACTIONS, help='What to do with partitions past retention')
+        parser.add_argument('--table', action='append', choices=list(PARTITIONED_TABLES), help='Limit to a model (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Print the SQL without running it')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Table partitioning requires PostgreSQL')
+
+        manager = PartitionManager(dry_run=options['dry_run'])
+        results = manager.maintain_all(
+            months_ahead=options['months_ahead'],
+            action=options['action'],
+            only=options['table'],
+        )
+
+        if options['dry_run']:
+            for sql in manager.actions:
+                self.stdout.write(sql)
+        for model_label, result in results.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{model_label}: created {len(result['created'])}, expired {len(result['expired'])}"
+            ))
@@ -0,0 +1,105 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from .tracing import tracer
+
+# With PROMETHEUS_MULTIPROC_DIR set (before any worker starts, and emptied on deploy) every worker process
+# writes its values to mmap'd files in that directory and a scrape of any worker aggregates all of them.
+# Without it the registry is per process, which is fine for a single worker or the development server
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir'))
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CHAT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+HTTP_REQUESTS = Counter(
+    'stylish_http_requests_total', 'HTTP requests by method, route and status', ['method', 'route', 'status']
+)
+HTTP_LATENCY = Histogram(
+    'stylish_http_request_duration_seconds', 'Time to produce the HTTP response', ['method', 'route'],
+    buckets=HTTP_BUCKETS,
+)
+HTTP_EXCEPTIONS = Counter(
+    'stylish_http_exceptions_total', 'Unhandled view exceptions by route and type', ['route', 'exception']
+)
+HTTP_IN_PROGRESS = Gauge(
+    'stylish_http_requests_in_progress', 'HTTP requests being handled', ['method'], multiprocess_mode='livesum'
+)
+QUERY_BUDGET_EXCEEDED = Counter(
+    'stylish_query_budget_exceeded_total', 'Profiled requests over a query budget', ['route', 'budget']
+)
+
+CHAT_STAGE_LATENCY = Histogram(
+    'stylish_chat_stage_duration_seconds', 'Duration of each chat pipeline stage', ['stage'], buckets=CHAT_BUCKETS
+)
+CHAT_STAGE_ERRORS = Counter('stylish_chat_stage_errors_total', 'Chat pipeline stages that raised', ['stage'])
+CHAT_QUERIES = Counter('stylish_chat_queries_total', 'Chat queries by intent and outcome', ['intent', 'outcome'])
+CHAT_POSTPROCESS_LATENCY = Histogram(
+    'stylish_chat_postprocess_duration_seconds', 'Duration of each post-response step by outcome',
+    ['step', 'status'], buckets=CHAT_BUCKETS,
+)
+
+ENDPOINT_REQUESTS = Counter('stylish_endpoint_requests_total', 'Calls recorded through MetricsCollector', ['endpoint'])
+ENDPOINT_ERRORS = Counter('stylish_endpoint_errors_total', 'Failures recorded through MetricsCollector', ['endpoint'])
+ENDPOINT_LATENCY = Histogram(
+    'stylish_endpoint_duration_seconds', 'Durations recorded through MetricsCollector', ['endpoint'],
+    buckets=CHAT_BUCKETS,
+)
+
+
+def collection_registry():
+    """Registry to read from: one aggregating every worker's files in multiprocess mode, else this process"""
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """The text exposition format of every metric, and its content type"""
+    return generate_latest(collection_registry()), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Call from the process manager's worker-exit hook (e.g. gunicorn's child_exit) so a dead worker's
+    live gauges stop counting"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+def samples(metric_names: Iterable[str]) -> Dict[str, list]:
+    """Aggregated samples of the named metric families, as (sample name, labels, value)"""
+    wanted = set(metric_names)
+    found: Dict[str, list] = {name: [] for name in wanted}
+    for family in collection_registry().collect():
+        if family.name in wanted:
+            found[family.name].extend((sample.name, sample.labels, sample.value) for sample in family.samples)
+    return found
+
+
+@contextmanager
+def chat_stage(stage: str):
+    """Time one stage of the chat pipeline, as a histogram observation and a tracing span, and count it as
+    failed if it raises"""
+    started = time.perf_counter()
+    try:
+        with tracer.span(f"chat.{stage}"):
+            yield
+    except Exception:
+        CHAT_STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        CHAT_STAGE_LATENCY.labels(stage).observe(time.perf_counter() - started)
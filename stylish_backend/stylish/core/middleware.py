@@ -0,0 +1,120 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import HTTP_EXCEPTIONS, HTTP_IN_PROGRESS, HTTP_LATENCY, HTTP_REQUESTS, QUERY_BUDGET_EXCEEDED
+from .profiling import QueryProfile, query_profiler
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def _route(request) -> str:
+    # The URL pattern rather than the path, so ids in URLs do not create a label value per object
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match and match.route else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Counts requests and times responses per method, route and status into the process-wide metrics
+    registry. Runs natively under both WSGI and ASGI so async views are not pushed through a thread"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _start(self, request) -> float:
+        HTTP_IN_PROGRESS.labels(request.method).inc()
+        return time.perf_counter()
+
+    def _finish(self, request, started: float, status_code) -> None:
+        route = _route(request)
+        HTTP_IN_PROGRESS.labels(request.method).dec()
+        HTTP_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(request.method, route, str(status_code)).inc()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = self._start(request)
+        status_code = 500
+        try:
+            response = self.get_response(request)
+            status_code = response.status_code
+            return response
+        finally:
+            self._finish(request, started, status_code)
+
+    async def __acall__(self, request):
+        started = self._start(request)
+        status_code = 500
+        try:
+            response = await self.get_response(request)
+            status_code = response.status_code
+            return response
+        finally:
+            self._finish(request, started, status_code)
+
+    def process_exception(self, request, exception):
+        HTTP_EXCEPTIONS.labels(_route(request), type(exception).__name__).inc()
+        return None
+
+
+class QueryProfilerMiddleware:
+    """Profiles the SQL a request runs (see core.profiling): query count, DB time, duplicate fingerprints and
+    the slowest statements. Requests that ask for it get the summary in X-Query-* response headers; sampled
+    and requested requests that go over budget are logged and counted"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _begin(self, request):
+        if not query_profiler.enabled:
+            return None, None, False
+        requested = query_profiler.requested(request)
+        if not requested and not query_profiler.sampled():
+            return None, None, False
+        profile = QueryProfile()
+        return profile, query_profiler.start(profile), requested
+
+    def _finish(self, request, response, profile: QueryProfile, requested: bool):
+        route = _route(request)
+        summary = profile.summary()
+        for budget in query_profiler.report(request, route, summary):
+            QUERY_BUDGET_EXCEEDED.labels(route, budget).inc()
+        if requested and response is not None:
+            query_profiler.apply_headers(response, summary)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile, token, requested = self._begin(request)
+        if profile is None:
+            return self.get_response(request)
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            query_profiler.stop(token)
+            self._finish(request, response, profile, requested)
+
+    async def __acall__(self, request):
+        profile, token, requested = self._begin(request)
+        if profile is None:
+            return await self.get_response(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            query_profiler.stop(token)
+            self._finish(request, response, profile, requested)
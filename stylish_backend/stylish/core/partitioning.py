@@ -0,0 +1,242 @@
+import logging
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Append-mostly log tables stored as monthly range partitions, keyed by their timestamp column
+PARTITIONED_TABLES = {
+    'analytics.AnalyticsEvent': 'created_at',
+    'inventory.StockAdjustment': 'created_at',
+    'inventory.InventoryLog': 'created_at',
+    'inventory.VariantStockLog': 'timestamp',
+    'ai_agents.ChatMessage': 'created_at',
+}
+
+ARCHIVE_SCHEMA = 'archive'
+EXPIRY_ACTIONS = ('archive', 'detach', 'drop')
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def _bound(month: date) -> str:
+    # Partition bounds are UTC month boundaries, matching how timestamps are stored
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def _fetch(cursor, sql, params=None):
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def _table_definition(cursor, table: str):
+    """Secondary index and outgoing foreign key definitions of a table, used to recreate them after the table
+    is rebuilt. Unique indexes are dropped from a partitioned table unless they include the partition key"""
+    indexes = _fetch(cursor, """
+        SELECT ic.relname, pg_get_indexdef(i.indexrelid), i.indisunique
+        FROM pg_index i JOIN pg_class ic ON ic.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass AND NOT i.indisprimary
+    """, [table])
+    foreign_keys = _fetch(cursor, """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'
+    """, [table])
+    return indexes, foreign_keys
+
+
+def _rebuild_table(schema_editor, table: str, column: str, partitioned: bool, months_ahead: int = 3):
+    """Rebuild a table as (or back from) a monthly range-partitioned table. Rows are copied once; the
+    primary key becomes (id, column) because PostgreSQL requires unique keys to include the partition key"""
+    quote = schema_editor.quote_name
+    legacy = f"{table}_legacy"
+
+    with schema_editor.connection.cursor() as cursor:
+        schema_editor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}")
+        indexes, foreign_keys = _table_definition(cursor, legacy)
+        identity = _fetch(cursor, """
+            SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'
+        """, [legacy])
+        serial_sequence = _fetch(cursor, "SELECT pg_get_serial_sequence(%s, 'id')", [legacy])[0][0]
+
+        like = f"LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS INCLUDING STORAGE"
+        if partitioned:
+            schema_editor.execute(f"CREATE TABLE {quote(table)} ({like}) PARTITION BY RANGE ({quote(column)})")
+            schema_editor.execute(
+                f"CREATE TABLE {quote(default_partition_name(table))} PARTITION OF {quote(table)} DEFAULT"
+            )
+            oldest = _fetch(cursor, f"SELECT MIN({quote(column)}) FROM {quote(legacy)}")[0][0]
+            current = month_start(timezone.now().date())
+            month = month_start(oldest.date()) if oldest else current
+            while month <= add_months(current, months_ahead):
+                schema_editor.execute(
+                    f"CREATE TABLE {quote(partition_name(table, month))} PARTITION OF {quote(table)} "
+                    f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(add_months(month, 1))})"
+                )
+                month = add_months(month, 1)
+        else:
+            schema_editor.execute(f"CREATE TABLE {quote(table)} ({like})")
+
+        schema_editor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}")
+
+        # A serial (non-identity) id sequence belongs to the old table and would be dropped with it
+        if serial_sequence and identity and not identity[0][0]:
+            schema_editor.execute(f"ALTER SEQUENCE {serial_sequence} OWNED BY {quote(table)}.id")
+        schema_editor.execute(f"DROP TABLE {quote(legacy)} CASCADE")
+
+        primary_key = f"id, {quote(column)}" if partitioned else "id"
+        schema_editor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + '_pkey')} PRIMARY KEY ({primary_key})")
+
+        for name, definition, unique in indexes:
+            if partitioned and unique and column not in definition:
+                logger.warning(f"Dropping unique index {name} on {table}: it does not include {column}")
+                continue
+            definition = re.sub(rf" ON (ONLY )?(\S+\.)?{re.escape(legacy)} ", f" ON {quote(table)} ", definition)
+            schema_editor.execute(definition)
+        for name, definition in foreign_keys:
+            schema_editor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+
+        if identity and identity[0][0]:
+            schema_editor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {quote(table)}"
+            )
+
+
+def partition_table(schema_editor, table: str, column: str):
+    """Migration helper converting a table to monthly range partitions. PostgreSQL only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    months_ahead = getattr(settings, 'PARTITION_MONTHS_AHEAD', 3)
+    _rebuild_table(schema_editor, table, column, partitioned=True, months_ahead=months_ahead)
+
+
+def unpartition_table(schema_editor, table: str, column: str):
+    """Reverse of partition_table: folds the partitions back into a plain table"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _rebuild_table(schema_editor, table, column, partitioned=False)
+
+
+class PartitionManager:
+    """Maintains the monthly partitions of the tables in PARTITIONED_TABLES: pre-creates upcoming months and
+    retires months past their retention period by detaching, archiving or dropping whole partitions"""
+
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.actions: List[str] = []
+
+    def _execute(self, sql: str, params=None):
+        self.actions.append(sql)
+        if not self.dry_run:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+
+    def is_partitioned(self, table: str) -> bool:
+        with connection.cursor() as cursor:
+            return bool(_fetch(cursor, "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [table]))
+
+    def partitions(self, table: str) -> Dict[date, str]:
+        """Attached monthly partitions of a table keyed by month"""
+        with connection.cursor() as cursor:
+            rows = _fetch(cursor, """
+                SELECT c.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+            """, [table])
+        months = {}
+        for (name,) in rows:
+            match = PARTITION_SUFFIX.search(name)
+            if match:
+                months[date(int(match.group(1)), int(match.group(2)), 1)] = name
+        return months
+
+    def create_partition(self, table: str, column: str, month: date):
+        """Create and attach the partition for a month. Rows that already landed in the default partition
+        for that month are moved into it first, otherwise the attach would be rejected"""
+        quote = connection.ops.quote_name
+        name = partition_name(table, month)
+        lower, upper = _bound(month), _bound(add_months(month, 1))
+        with transaction.atomic():
+            self._execute(f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            self._execute(
+                f"WITH moved AS (DELETE FROM {quote(default_partition_name(table))} "
+                f"WHERE {quote(column)} >= {lower} AND {quote(column)} < {upper} RETURNING *) "
+                f"INSERT INTO {quote(name)} SELECT * FROM moved"
+            )
+            self._execute(f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM ({lower}) TO ({upper})")
+
+    def expire_partition(self, table: str, name: str, action: str):
+        quote = connection.ops.quote_name
+        with transaction.atomic():
+            if action == 'drop':
+                self._execute(f"DROP TABLE {quote(name)}")
+                return
+            self._execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            if action == 'archive':
+                self._execute(f"CREATE SCHEMA IF NOT EXISTS {quote(ARCHIVE_SCHEMA)}")
+                self._execute(f"ALTER TABLE {quote(name)} SET SCHEMA {quote(ARCHIVE_SCHEMA)}")
+
+    def maintain(
+        self,
+        model_label: str,
+        months_ahead: int,
+        retention_months: Optional[int] = None,
+        action: str = 'archive',
+    ) -> Dict[str, List[str]]:
+        """Bring one table's partitions up to date. Returns the partitions created and expired"""
+        if action not in EXPIRY_ACTIONS:
+            raise ValueError(f"Unknown expiry action '{action}', expected one of {EXPIRY_ACTIONS}")
+        column = PARTITIONED_TABLES[model_label]
+        table = apps.get_model(model_label)._meta.db_table
+        result = {"created": [], "expired": []}
+        if not self.is_partitioned(table):
+            logger.warning(f"{table} is not partitioned; run migrations first")
+            return result
+
+        existing = self.partitions(table)
+        current = month_start(timezone.now().date())
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                self.create_partition(table, column, month)
+                result["created"].append(partition_name(table, month))
+
+        if retention_months:
+            cutoff = add_months(current, -retention_months)
+            for month, name in sorted(existing.items()):
+                if month < cutoff:
+                    self.expire_partition(table, name, action)
+                    result["expired"].append(name)
+        return result
+
+    def maintain_all(self, months_ahead: Optional[int] = None, action: Optional[str] = None, only=None):
+        months_ahead = months_ahead if months_ahead is not None else getattr(settings, 'PARTITION_MONTHS_AHEAD', 3)
+        action = action or getattr(settings, 'PARTITION_EXPIRY_ACTION', 'archive')
+        retention = getattr(settings, 'PARTITION_RETENTION_MONTHS', {})
+        results = {}
+        for model_label in PARTITIONED_TABLES:
+            if only and model_label not in only:
+                continue
+            results[model_label] = self.maintain(model_label, months_ahead, retention.get(model_label) or None, action)
+        return results
@@ -0,0 +1,209 @@
+import hashlib
+import hmac
+import json
+import logging
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_LENGTH = 300
+MAX_HEADER_LENGTH = 4000
+TOP_STATEMENTS = 5
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_current_profile: ContextVar[Optional['QueryProfile']] = ContextVar('query_profile', default = None)
+
+
+def normalize_sql(sql: str) -> str:
+    """The statement with literals and placeholders replaced by `?` and IN lists collapsed, so the same query
+    issued for different rows (the N+1 signature) normalizes to one string"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode('utf-8')).hexdigest()[:12]
+
+
+class QueryProfile:
+    """Queries run on behalf of one request. The request may fan queries out to pool threads, so recording
+    is locked"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.fingerprints: Dict[str, Dict[str, Any]] = {}
+        self.slowest: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, duration_ms: float, many: bool):
+        key = fingerprint(sql)
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            entry = self.fingerprints.get(key)
+            if entry is None:
+                entry = self.fingerprints[key] = {'sql': normalize_sql(sql)[:MAX_STATEMENT_LENGTH], 'count': 0, 'ms': 0.0}
+            entry['count'] += 1
+            entry['ms'] += duration_ms
+            if len(self.slowest) < TOP_STATEMENTS or duration_ms > self.slowest[-1]['ms']:
+                self.slowest.append({'fingerprint': key, 'sql': sql[:MAX_STATEMENT_LENGTH], 'ms': duration_ms, 'many': many})
+                self.slowest.sort(key = lambda statement: statement['ms'], reverse = True)
+                del self.slowest[TOP_STATEMENTS:]
+
+    @property
+    def duplicate_count(self) -> int:
+        """Executions beyond the first of each fingerprint"""
+        return sum(entry['count'] - 1 for entry in self.fingerprints.values())
+
+    def duplicates(self, limit: int = TOP_STATEMENTS) -> List[Dict[str, Any]]:
+        repeated = [
+            {'fingerprint': key, 'count': entry['count'], 'ms': round(entry['ms'], 2), 'sql': entry['sql']}
+            for key, entry in self.fingerprints.items() if entry['count'] > 1
+        ]
+        repeated.sort(key = lambda entry: (entry['count'], entry['ms']), reverse = True)
+        return repeated[:limit]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'queries': self.count,
+                'db_ms': round(self.total_ms, 2),
+                'duplicates': self.duplicate_count,
+                'top_duplicates': self.duplicates(),
+                'slowest': [{**statement, 'ms': round(statement['ms'], 2)} for statement in self.slowest],
+            }
+
+
+def _profile_wrapper(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record(sql, (time.perf_counter() - started) * 1000, many)
+
+
+def install_query_profiler(sender, connection, **kwargs):
+    """connection_created receiver: keep the profiling wrapper on every connection for good. It is a no-op
+    unless a profile is active in the current context, and, because the profile lives in a context variable,
+    it also sees queries a request runs through sync_to_async or in pool threads started with a copied context.
+    Inserted first so the LIFO pop of a temporary execute_wrapper block never removes it"""
+    if _profile_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _profile_wrapper)
+
+
+class QueryProfiler:
+    """Decides which requests are profiled and reports on them.
+
+    A request is profiled when it sends the QUERY_PROFILER_HEADER with the QUERY_PROFILER_TOKEN value (any
+    truthy value in DEBUG), in which case the summary is returned in response headers, or when it is picked by
+    QUERY_PROFILER_SAMPLE_RATE, in which case it is only checked against the budgets. Statements are never put
+    in headers of requests that did not ask for them"""
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'QUERY_PROFILER_ENABLED', True)
+        self.header = getattr(settings, 'QUERY_PROFILER_HEADER', 'X-Profile-Queries')
+        self.token = getattr(settings, 'QUERY_PROFILER_TOKEN', '')
+        self.sample_rate = getattr(settings, 'QUERY_PROFILER_SAMPLE_RATE', 0.0)
+        self.max_queries = getattr(settings, 'QUERY_BUDGET_QUERIES', 50)
+        self.max_db_ms = getattr(settings, 'QUERY_BUDGET_DB_MS', 500.0)
+        self.max_duplicates = getattr(settings, 'QUERY_BUDGET_DUPLICATES', 10)
+        # {route prefix: {'queries': n, 'db_ms': ms, 'duplicates': n}} overriding the defaults
+        self.route_budgets = getattr(settings, 'QUERY_BUDGET_ROUTES', {})
+
+    def requested(self, request) -> bool:
+        value = request.headers.get(self.header, '')
+        if not value:
+            return False
+        if self.token:
+            return hmac.compare_digest(value, self.token)
+        return settings.DEBUG and value.lower() in ('1', 'true', 'yes')
+
+    def sampled(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, profile: QueryProfile):
+        return _current_profile.set(profile)
+
+    def stop(self, token):
+        try:
+            _current_profile.reset(token)
+        except ValueError:
+            _current_profile.set(None)
+
+    def budget(self, route: str) -> Dict[str, float]:
+        budget = {'queries': self.max_queries, 'db_ms': self.max_db_ms, 'duplicates': self.max_duplicates}
+        matched = ''
+        for prefix, overrides in self.route_budgets.items():
+            if route.startswith(prefix) and len(prefix) > len(matched):
+                matched = prefix
+        if matched:
+            budget.update(self.route_budgets[matched])
+        return budget
+
+    def exceeded(self, summary: Dict[str, Any], route: str) -> List[str]:
+        budget = self.budget(route)
+        return [
+            name for name, measured in (
+                ('queries', summary['queries']), ('db_ms', summary['db_ms']), ('duplicates', summary['duplicates'])
+            )
+            if budget.get(name) is not None and measured > budget[name]
+        ]
+
+    def report(self, request, route: str, summary: Dict[str, Any]) -> List[str]:
+        """Log the request if it is over budget. Returns the exceeded budget names"""
+        over = self.exceeded(summary, route)
+        if over:
+            duplicates = '; '.join(
+                f"{entry['count']}x {entry['sql'][:120]}" for entry in summary['top_duplicates'][:3]
+            )
+            logger.warning(
+                f"Query budget exceeded ({', '.join(over)}) on {request.method} {route}: "
+                f"{summary['queries']} queries, {summary['db_ms']}ms, {summary['duplicates']} duplicates"
+                + (f"; top duplicates: {duplicates}" if duplicates else ''),
+                extra = {'query_profile': summary, 'route': route},
+            )
+        return over
+
+    def apply_headers(self, response, summary: Dict[str, Any]):
+        response['X-Query-Count'] = str(summary['queries'])
+        response['X-Query-Time-Ms'] = f"{summary['db_ms']:.2f}"
+        response['X-Query-Duplicates'] = str(summary['duplicates'])
+        detail = {
+            'top_duplicates': [
+                {'fingerprint': entry['fingerprint'], 'count': entry['count'], 'sql': entry['sql'][:120]}
+                for entry in summary['top_duplicates']
+            ],
+            'slowest': [
+                {'fingerprint': entry['fingerprint'], 'ms': entry['ms'], 'sql': entry['sql'][:120]}
+                for entry in summary['slowest']
+            ],
+        }
+        # ensure_ascii keeps the header latin-1 safe; drop statements until it fits common proxy limits
+        encoded = json.dumps(detail, separators = (',', ':'))
+        while len(encoded) > MAX_HEADER_LENGTH and (detail['slowest'] or detail['top_duplicates']):
+            (detail['slowest'] or detail['top_duplicates']).pop()
+            encoded = json.dumps(detail, separators = (',', ':'))
+        response['X-Query-Profile'] = encoded
+
+
+# Global instance
+query_profiler = QueryProfiler()
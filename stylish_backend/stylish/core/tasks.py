@@ -0,0 +1,17 @@
+from celery import shared_task
+import logging
+from django.db import connection
+from .partitioning import PartitionManager
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name = "core.manage_partitions")
+def manage_partitions():
+    """Daily partition upkeep so inserts always land in a monthly partition and expired months are retired"""
+    if connection.vendor != 'postgresql':
+        return "Skipped: partitioning requires PostgreSQL"
+    results = PartitionManager().maintain_all()
+    created = sum(len(result['created']) for result in results.values())
+    expired = sum(len(result['expired']) for result in results.values())
+    return f"Created {created} partitions, expired {expired}"
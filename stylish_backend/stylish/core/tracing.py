@@ -0,0 +1,256 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+MAX_SPANS_PER_TRACE = 1000
+MAX_STATEMENT_LENGTH = 300
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('tracing_current_span', default = None)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Span:
+    """One timed operation. Ids, timestamps and attributes follow the OpenTelemetry data model so exported
+    spans can be loaded by any OTLP/JSON consumer"""
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'start_ns', 'end_ns', 'attributes', 'status', 'message')
+
+    def __init__(self, trace: 'Trace', name: str, parent: Optional['Span'], kind: int, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes)
+        self.status = STATUS_OK
+        self.message = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.message = f"{type(error).__name__}: {error}"[:500]
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns or time.time_ns()),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': self.status, **({'message': self.message} if self.message else {})},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class Trace:
+    """The spans of one traced operation. Spans may be added from the pool threads the operation fans out to"""
+
+    def __init__(self, sampled: bool):
+        self.trace_id = os.urandom(16).hex()
+        self.sampled = sampled
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> bool:
+        with self._lock:
+            if len(self.spans) >= MAX_SPANS_PER_TRACE:
+                self.dropped += 1
+                return False
+            self.spans.append(span)
+            return True
+
+    def timings(self) -> Dict[str, Any]:
+        """Compact breakdown for storing with the traced record: milliseconds per direct child of the root
+        span plus count and time of MCP calls, database queries and Redis round trips"""
+        with self._lock:
+            spans = list(self.spans)
+        if not spans:
+            return {}
+        root = spans[0]
+        summary: Dict[str, Any] = {'trace_id': self.trace_id, 'total_ms': round(root.duration_ms, 2), 'stages': {}}
+        for prefix in ('mcp', 'db', 'redis'):
+            summary[prefix] = {'count': 0, 'ms': 0.0}
+        for span in spans[1:]:
+            if span.parent_id == root.span_id:
+                stage = span.name.split('.', 1)[-1]
+                summary['stages'][stage] = round(summary['stages'].get(stage, 0.0) + span.duration_ms, 2)
+            prefix = span.name.split('.', 1)[0]
+            if prefix in ('mcp', 'db', 'redis'):
+                summary[prefix]['count'] += 1
+                summary[prefix]['ms'] = round(summary[prefix]['ms'] + span.duration_ms, 2)
+        if self.dropped:
+            summary['dropped_spans'] = self.dropped
+        return summary
+
+
+class FileSpanExporter:
+    """Appends each finished trace to a file as one OTLP/JSON ExportTraceServiceRequest per line, the format
+    an OpenTelemetry collector's file receiver (or `otelcol` replay) reads"""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': _otlp_value(self.service_name)}]},
+                'scopeSpans': [{
+                    'scope': {'name': 'stylish.tracing'},
+                    'spans': [span.to_otlp() for span in trace.spans],
+                }],
+            }],
+        }
+        line = json.dumps(payload, separators = (',', ':'))
+        try:
+            with self._lock:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok = True)
+                with open(self.path, 'a', encoding = 'utf-8') as handle:
+                    handle.write(line + '\n')
+        except OSError as e:
+            logger.warning(f"Could not export trace {trace.trace_id}: {str(e)}")
+
+
+class Tracer:
+    """Minimal in-process tracer. The current span lives in a context variable, so it follows awaits and is
+    copied into sync_to_async threads; spans opened with no trace in progress are no-ops"""
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'TRACING_ENABLED', True)
+        self.sample_rate = getattr(settings, 'TRACING_SAMPLE_RATE', 1.0)
+        export_path = getattr(settings, 'TRACING_EXPORT_PATH', '')
+        service_name = getattr(settings, 'TRACING_SERVICE_NAME', 'stylish-backend')
+        self.exporter = FileSpanExporter(export_path, service_name) if export_path else None
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def current_trace(self) -> Optional[Trace]:
+        span = _current_span.get()
+        return span.trace if span else None
+
+    def begin_trace(self, name: str, kind: int = KIND_SERVER, **attributes):
+        """Start a root span and make it current. Returns (span, token) for end_trace, or (None, None) when
+        tracing is disabled"""
+        if not self.enabled:
+            return None, None
+        trace = Trace(sampled = random.random() < self.sample_rate)
+        root = Span(trace, name, None, kind, attributes)
+        trace.add(root)
+        return root, _current_span.set(root)
+
+    def end_trace(self, root: Optional[Span], token, error: Optional[BaseException] = None):
+        if root is None:
+            return
+        if error is not None:
+            root.record_error(error)
+        root.end()
+        self._restore(token, None)
+        if self.exporter and root.trace.sampled:
+            self.exporter.export(root.trace)
+
+    @contextmanager
+    def trace(self, name: str, kind: int = KIND_SERVER, **attributes):
+        root, token = self.begin_trace(name, kind, **attributes)
+        try:
+            yield root
+        except BaseException as e:
+            self.end_trace(root, token, e)
+            raise
+        else:
+            self.end_trace(root, token)
+
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL, **attributes):
+        """Child span of the current span; yields None when no trace is in progress"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace, name, parent, kind, attributes)
+        if not parent.trace.add(span):
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.record_error(e)
+            raise
+        finally:
+            span.end()
+            self._restore(token, parent)
+
+    def _restore(self, token, parent: Optional[Span]):
+        # An async generator can be resumed from a different context than the one that set the token
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            _current_span.set(parent)
+
+    def _db_wrapper(self, execute, sql, params, many, context):
+        connection = context['connection']
+        with self.span(
+            'db.query', KIND_CLIENT,
+            **{'db.system': connection.vendor, 'db.statement': sql[:MAX_STATEMENT_LENGTH], 'db.many': many},
+        ):
+            return execute(sql, params, many, context)
+
+    @contextmanager
+    def traced_queries(self, connection):
+        """Record a span per query run on `connection` (this thread's) while inside the block"""
+        if _current_span.get() is None:
+            yield
+            return
+        with connection.execute_wrapper(self._db_wrapper):
+            yield
+
+
+# Global instance
+tracer = Tracer()
@@ -1,3 +1,18 @@
-from django.shortcuts import render
+import hmac
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse
+
+from .metrics import render_latest
+
+
+def metrics_view(request):
+    """Prometheus exposition of the metrics of every worker process. When METRICS_AUTH_TOKEN is set the
+    scraper must send it as a bearer token"""
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied, token):
+            return HttpResponse(status = 401)
+    body, content_type = render_latest()
+    return HttpResponse(body, content_type = content_type)
@@ -57,6 +57,7 @@ class Command(BaseCommand):
         for _ in range(count):
             user = random.choice(list(users))
             status = random.choices(list(status_weights.keys()), weights=list(status_weights.values()), k=1)[0]
+            created_at = timezone.now() - datetime.timedelta(days=random.randint(1, days))
 
             order = Order.objects.create(
                 user=user,
@@ -65,7 +66,6 @@ class Command(BaseCommand):
                 contact=fake.phone_number()[:20],
                 status=status,
                 tracking_number=f"TRK-{uuid.uuid4().hex[:12].upper()}" if status in ['in_transit', 'completed'] else None,
-                created_at=timezone.now() - datetime.timedelta(days=random.randint(1, days))
             )
 
             item_count = random.randint(1, 5)
@@ -99,7 +99,9 @@ class Command(BaseCommand):
                 total_amount += item_total
 
             order.total_amount = total_amount
-            order.save(update_fields=['total_amount'])
+            # created_at is auto_now_add, so the historical date can only be written after the insert
+            order.created_at = created_at
+            order.save(update_fields=['total_amount', 'created_at'])
 
             for category in order_categories:
                 OrderCategory.objects.get_or_create(order=order, category=category)
\ No newline at end of file
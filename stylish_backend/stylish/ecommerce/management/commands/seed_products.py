@@ -797,7 +797,7 @@ class Command(BaseCommand):
                 end_date=end_date,
                 is_active=True,
                 purchase_limit=random.choice([None, 3, 5, 10]),
-                minimum_order_value=random.choice([None, Decimal('50.00'), Decimal('100.00')]),
+                minimun_order_value=random.choice([None, Decimal('50.00'), Decimal('100.00')]),
                 is_public=sale_config.get('is_public', True),
                 allow_stacking_discounts=random.random() < 0.3  # 30% chance
             )
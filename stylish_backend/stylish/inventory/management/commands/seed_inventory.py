@@ -61,7 +61,7 @@ class Command(BaseCommand):
                 # Get existing products or limit to the specified number
                 self.stdout.write("Finding new products without inventory records...")
                 products = list(
-                    Product.objects.filter(inventoryrecord__isnull=True).order_by(
+                    Product.objects.filter(inventory__isnull=True).order_by(
                         "-id"
                     )[: options["products"]]
                 )
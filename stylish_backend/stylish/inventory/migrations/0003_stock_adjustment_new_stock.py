@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-19 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0002_partition_logs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stockadjustment",
+            name="new_stock",
+            field=models.IntegerField(
+                blank=True, help_text="Stock level after adjustment", null=True
+            ),
+        ),
+    ]
@@ -85,6 +85,7 @@ class StockAdjustment(models.Model):
     inventory = models.ForeignKey(InventoryRecord, on_delete = models.CASCADE, related_name='adjustments')
     quantity = models.IntegerField(help_text= "Amount of change(psotive for increase, negative for decrease)")
     previous_stock = models.IntegerField(help_text= "Stock level before adjustment")
+    new_stock = models.IntegerField(null = True, blank = True, help_text= "Stock level after adjustment")
     adjustment_type = models.CharField(max_length=20, choices=ADJUSTMENT_TYPES, default = 'manual')
     reference = models.CharField(max_length= 100, blank = True, help_text="Order number, invoice number, etc")
     reason = models.TextField(blank = True)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from recommendations.similarity import SIMILARITY_METRICS, build_similar_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuild SimilarProducts from co-purchase similarity between products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', choices=SIMILARITY_METRICS, help='Similarity measure')
+        parser.add_argument('--top-k', type=int, help='Neighbours kept per product')
+        parser.add_argument('--min-co-purchases', type=int, help='Minimum orders two products must share')
+        parser.add_argument('--lookback-days', type=int, help='Only use orders from the last N days')
+
+    def handle(self, *args, **options):
+        stats = build_similar_products(
+            metric=options['metric'],
+            top_k=options['top_k'],
+            min_co_purchases=options['min_co_purchases'],
+            lookback_days=options['lookback_days'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {stats['pairs_written']} pairs for {stats['products']} products "
+            f"from {stats['orders']} orders in {stats['duration']}s"
+        ))
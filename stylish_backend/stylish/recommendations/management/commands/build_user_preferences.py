@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from recommendations.preferences import build_user_preferences
+
+
+class Command(BaseCommand):
+    help = 'Rebuild UserPreferences from time-decayed analytics events and order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--half-life-days', type=float, help='Days for an interaction to lose half its weight')
+        parser.add_argument('--lookback-days', type=int, help='Only use interactions from the last N days')
+
+    def handle(self, *args, **options):
+        stats = build_user_preferences(
+            half_life_days=options['half_life_days'],
+            lookback_days=options['lookback_days'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {stats['preferences_written']} preferences for {stats['users']} users "
+            f"from {stats['signals']} signals, removed {stats['preferences_removed']} in {stats['duration']}s"
+        ))
@@ -0,0 +1,202 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from analytics.models import AnalyticsEvent
+from ecommerce.models import OrderItem
+from .models import UserPreferences
+
+logger = logging.getLogger(__name__)
+
+# Relative strength of each interaction as a signal of category interest. Purchases from OrderItem are
+# weighted per unit bought; the purchase event is kept lower so it does not double count orders
+DEFAULT_EVENT_WEIGHTS = {
+    'view': 1.0,
+    'wishilist_add': 3.0,
+    'wishlist_add': 3.0,
+    'cart_add': 4.0,
+    'purchase': 2.0,
+}
+DEFAULT_ORDER_ITEM_WEIGHT = 8.0
+
+
+class UserPreferenceBuilder:
+    """Batch builder for UserPreferences. Interaction events and order items are streamed in chunks; every
+    chunk is turned into arrays of (user, category, decayed weight) and summed into a sparse users x
+    categories matrix, so memory grows with the number of distinct pairs rather than the number of events.
+    Weights are normalised per user so the strongest category scores 1.0"""
+
+    def __init__(
+        self,
+        half_life_days: float = 30.0,
+        lookback_days: Optional[int] = 180,
+        min_weight: float = 0.01,
+        batch_size: int = 5000,
+        event_weights: Optional[Dict[str, float]] = None,
+        order_item_weight: float = DEFAULT_ORDER_ITEM_WEIGHT,
+    ):
+        self.half_life_days = half_life_days
+        self.lookback_days = lookback_days
+        self.min_weight = min_weight
+        self.batch_size = batch_size
+        self.event_weights = event_weights or DEFAULT_EVENT_WEIGHTS
+        self.order_item_weight = order_item_weight
+        self.now = timezone.now()
+
+    def _decay(self, timestamps: np.ndarray) -> np.ndarray:
+        """Exponential decay factor for epoch-second timestamps, halving every half_life_days"""
+        age_days = np.maximum(self.now.timestamp() - timestamps, 0) / 86400
+        return np.exp2(-age_days / self.half_life_days)
+
+    def _chunks(self, rows: Iterable[Tuple]) -> Iterable[list]:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _event_rows(self):
+        events = AnalyticsEvent.objects.filter(
+            event_type__in=list(self.event_weights), product__isnull=False
+        )
+        if self.lookback_days:
+            events = events.filter(created_at__gte=self.now - timedelta(days=self.lookback_days))
+        return events.values_list(
+            "user_id", "product__category_id", "event_type", "created_at"
+        ).iterator(chunk_size=self.batch_size)
+
+    def _order_item_rows(self):
+        items = OrderItem.objects.exclude(order__status="rejected")
+        if self.lookback_days:
+            items = items.filter(order__created_at__gte=self.now - timedelta(days=self.lookback_days))
+        return items.values_list(
+            "order__user_id", "product__category_id", "quantity", "order__created_at"
+        ).iterator(chunk_size=self.batch_size)
+
+    def load_affinity_matrix(self):
+        """Decayed interaction weights as a users x categories CSR matrix plus the id for every row and
+        column"""
+        user_index: Dict[Any, int] = {}
+        category_index: Dict[Any, int] = {}
+        matrix = None
+        signals = 0
+
+        def accumulate(users, categories, weights):
+            nonlocal matrix
+            chunk = sparse.coo_matrix(
+                (weights, (users, categories)), shape=(len(user_index), len(category_index))
+            ).tocsr()
+            if matrix is None:
+                matrix = chunk
+            else:
+                matrix.resize(chunk.shape)
+                matrix = matrix + chunk
+
+        for chunk in self._chunks(self._event_rows()):
+            users = np.fromiter((user_index.setdefault(row[0], len(user_index)) for row in chunk), dtype=np.int64)
+            categories = np.fromiter(
+                (category_index.setdefault(row[1], len(category_index)) for row in chunk), dtype=np.int64
+            )
+            base = np.fromiter((self.event_weights[row[2]] for row in chunk), dtype=np.float64)
+            stamps = np.fromiter((row[3].timestamp() for row in chunk), dtype=np.float64)
+            accumulate(users, categories, base * self._decay(stamps))
+            signals += len(chunk)
+
+        for chunk in self._chunks(self._order_item_rows()):
+            users = np.fromiter((user_index.setdefault(row[0], len(user_index)) for row in chunk), dtype=np.int64)
+            categories = np.fromiter(
+                (category_index.setdefault(row[1], len(category_index)) for row in chunk), dtype=np.int64
+            )
+            quantities = np.fromiter((row[2] for row in chunk), dtype=np.float64)
+            stamps = np.fromiter((row[3].timestamp() for row in chunk), dtype=np.float64)
+            accumulate(users, categories, self.order_item_weight * quantities * self._decay(stamps))
+            signals += len(chunk)
+
+        if matrix is None:
+            matrix = sparse.csr_matrix((0, 0))
+        user_ids = list(user_index)
+        category_ids = list(category_index)
+        return matrix, user_ids, category_ids, signals
+
+    def normalise(self, matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+        """Scale every user's row so their top category is 1.0 and drop negligible weights"""
+        matrix = matrix.tocsr()
+        if matrix.nnz == 0:
+            return matrix
+        row_max = matrix.max(axis=1).toarray().ravel()
+        scale = np.divide(1.0, row_max, out=np.zeros_like(row_max), where=row_max > 0)
+        matrix = sparse.diags(scale) @ matrix
+        matrix.data[matrix.data < self.min_weight] = 0
+        matrix.eliminate_zeros()
+        return matrix.tocsr()
+
+    def build(self) -> Dict[str, Any]:
+        """Recompute UserPreferences. Weights are upserted in batches and pairs that no longer carry any
+        signal are removed in the same transaction"""
+        started = time.perf_counter()
+        matrix, user_ids, category_ids, signals = self.load_affinity_matrix()
+        matrix = self.normalise(matrix)
+        coo = matrix.tocoo()
+
+        kept = set()
+        written = 0
+        with transaction.atomic():
+            batch = []
+            for row, column, weight in zip(coo.row, coo.col, coo.data):
+                user_id, category_id = user_ids[row], category_ids[column]
+                kept.add((user_id, category_id))
+                batch.append(UserPreferences(user_id=user_id, category_id=category_id, weight=round(float(weight), 4)))
+                if len(batch) >= self.batch_size:
+                    written += self._upsert(batch)
+                    batch = []
+            if batch:
+                written += self._upsert(batch)
+
+            stale = [
+                pk for pk, user_id, category_id in
+                UserPreferences.objects.values_list("pk", "user_id", "category_id").iterator(chunk_size=self.batch_size)
+                if (user_id, category_id) not in kept
+            ]
+            removed = 0
+            for start in range(0, len(stale), self.batch_size):
+                removed += UserPreferences.objects.filter(pk__in=stale[start:start + self.batch_size]).delete()[0]
+
+        stats = {
+            "signals": signals,
+            "users": len(user_ids),
+            "categories": len(category_ids),
+            "preferences_written": written,
+            "preferences_removed": removed,
+            "duration": round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"Built user preferences: {stats}")
+        return stats
+
+    def _upsert(self, batch) -> int:
+        UserPreferences.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=["user", "category"],
+            update_fields=["weight", "updated_at"],
+        )
+        return len(batch)
+
+
+def build_user_preferences(**overrides) -> Dict[str, Any]:
+    """Rebuild UserPreferences with settings-driven defaults"""
+    options = {
+        "half_life_days": getattr(settings, 'USER_PREFERENCE_HALF_LIFE_DAYS', 30.0),
+        "lookback_days": getattr(settings, 'USER_PREFERENCE_LOOKBACK_DAYS', 180),
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return UserPreferenceBuilder(**options).build()
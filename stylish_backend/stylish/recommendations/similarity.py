@@ -0,0 +1,136 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from ecommerce.models import OrderItem
+from .models import SimilarProducts
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_METRICS = ("cosine", "jaccard")
+
+
+class CoPurchaseSimilarityBuilder:
+    """Offline item-to-item recommender. Builds a sparse orders x products purchase matrix from OrderItem,
+    derives product co-occurrence counts as X^T X and keeps the top-K most similar products per product"""
+
+    def __init__(
+        self,
+        metric: str = "cosine",
+        top_k: int = 20,
+        min_co_purchases: int = 2,
+        lookback_days: Optional[int] = None,
+        batch_size: int = 5000,
+    ):
+        if metric not in SIMILARITY_METRICS:
+            raise ValueError(f"Unknown similarity metric '{metric}', expected one of {SIMILARITY_METRICS}")
+        self.metric = metric
+        self.top_k = top_k
+        self.min_co_purchases = min_co_purchases
+        self.lookback_days = lookback_days
+        self.batch_size = batch_size
+
+    def load_purchase_matrix(self):
+        """Binary orders x products CSR matrix plus the product id for every column"""
+        items = OrderItem.objects.exclude(order__status="rejected")
+        if self.lookback_days:
+            items = items.filter(order__created_at__gte=timezone.now() - timedelta(days=self.lookback_days))
+
+        order_index: Dict[Any, int] = {}
+        product_index: Dict[Any, int] = {}
+        rows, cols = [], []
+        for order_id, product_id in items.values_list("order_id", "product_id").iterator(chunk_size=self.batch_size):
+            rows.append(order_index.setdefault(order_id, len(order_index)))
+            cols.append(product_index.setdefault(product_id, len(product_index)))
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(order_index), len(product_index)),
+        )
+        # An order listing the same product twice still counts as one purchase
+        matrix.data = np.minimum(matrix.data, 1.0)
+        product_ids = np.empty(len(product_index), dtype=object)
+        for product_id, column in product_index.items():
+            product_ids[column] = product_id
+        return matrix, product_ids
+
+    def similarity_matrix(self, purchases: sparse.csr_matrix) -> sparse.csr_matrix:
+        """Sparse products x products similarity from co-purchase counts"""
+        co_counts = (purchases.T @ purchases).tocsr()
+        item_counts = np.asarray(purchases.sum(axis=0)).ravel()
+
+        co_counts.setdiag(0)
+        co_counts.data[co_counts.data < self.min_co_purchases] = 0
+        co_counts.eliminate_zeros()
+
+        coo = co_counts.tocoo()
+        if self.metric == "cosine":
+            denominator = np.sqrt(item_counts[coo.row] * item_counts[coo.col])
+        else:
+            denominator = item_counts[coo.row] + item_counts[coo.col] - coo.data
+        scores = coo.data / np.maximum(denominator, 1e-9)
+
+        return sparse.csr_matrix((scores, (coo.row, coo.col)), shape=co_counts.shape)
+
+    def top_neighbors(self, similarity: sparse.csr_matrix, product_ids: np.ndarray):
+        """Yield (product_id, similar_product_id, score) for the top-K neighbours of every product"""
+        for row in range(similarity.shape[0]):
+            start, end = similarity.indptr[row], similarity.indptr[row + 1]
+            if start == end:
+                continue
+            scores = similarity.data[start:end]
+            columns = similarity.indices[start:end]
+            if len(scores) > self.top_k:
+                keep = np.argpartition(-scores, self.top_k - 1)[: self.top_k]
+                scores, columns = scores[keep], columns[keep]
+            for column, score in zip(columns, scores):
+                yield product_ids[row], product_ids[column], float(score)
+
+    def build(self) -> Dict[str, Any]:
+        """Rebuild SimilarProducts. The table is replaced in one transaction so readers never see a
+        half-written neighbour list"""
+        started = time.perf_counter()
+        purchases, product_ids = self.load_purchase_matrix()
+        similarity = self.similarity_matrix(purchases)
+
+        with transaction.atomic():
+            SimilarProducts.objects.all().delete()
+            batch, written = [], 0
+            for product_id, similar_id, score in self.top_neighbors(similarity, product_ids):
+                batch.append(SimilarProducts(product_id=product_id, similar_product_id=similar_id, similarity_score=score))
+                if len(batch) >= self.batch_size:
+                    SimilarProducts.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                SimilarProducts.objects.bulk_create(batch)
+                written += len(batch)
+
+        stats = {
+            "metric": self.metric,
+            "orders": purchases.shape[0],
+            "products": purchases.shape[1],
+            "pairs_written": written,
+            "duration": round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"Built co-purchase similarities: {stats}")
+        return stats
+
+
+def build_similar_products(**overrides) -> Dict[str, Any]:
+    """Rebuild SimilarProducts with settings-driven defaults"""
+    options = {
+        "metric": getattr(settings, 'RECOMMENDATION_SIMILARITY_METRIC', 'cosine'),
+        "top_k": getattr(settings, 'RECOMMENDATION_TOP_K', 20),
+        "min_co_purchases": getattr(settings, 'RECOMMENDATION_MIN_CO_PURCHASES', 2),
+        "lookback_days": getattr(settings, 'RECOMMENDATION_LOOKBACK_DAYS', None),
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return CoPurchaseSimilarityBuilder(**options).build()
@@ -0,0 +1,28 @@
+from celery import shared_task
+import logging
+from .preferences import build_user_preferences
+from .similarity import build_similar_products
+from .view_counter import product_view_counter
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name = "recommendations.build_similar_products")
+def build_similar_products_task():
+    """Nightly rebuild of the co-purchase similarity table served by the recommendation tool"""
+    stats = build_similar_products()
+    return f"Wrote {stats['pairs_written']} similar product pairs for {stats['products']} products"
+
+
+@shared_task(name = "recommendations.build_user_preferences")
+def build_user_preferences_task():
+    """Nightly rebuild of per-user category affinities used for personal recommendations"""
+    stats = build_user_preferences()
+    return f"Wrote {stats['preferences_written']} preferences for {stats['users']} users"
+
+
+@shared_task(name = "recommendations.flush_product_views")
+def flush_product_views_task():
+    """Drain buffered product view counters into ProductView"""
+    stats = product_view_counter.flush()
+    return f"Flushed {stats['views']} views into {stats['rows']} ProductView rows"
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import ProductViewRecordView
+
+app_name = 'recommendations'
+
+urlpatterns = [
+    path('views/', ProductViewRecordView.as_view(), name = 'record_product_view'),
+]
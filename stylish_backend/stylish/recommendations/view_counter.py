@@ -0,0 +1,163 @@
+import logging
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django_redis import get_redis_connection
+
+from authentication.models import CustomUser
+from ecommerce.models import Product
+from .models import ProductView
+
+logger = logging.getLogger(__name__)
+
+
+class ProductViewCounter:
+    """Buffers product views in Redis hashes and flushes them to ProductView in batches. Recording a view is
+    two pipelined hash writes; the database sees one upsert per (user, product) per flush instead of one
+    write per view"""
+
+    PENDING_KEY = "recommendations:product_views:pending"
+    LAST_SEEN_KEY = "recommendations:product_views:last_seen"
+    FLUSHING_KEY = "recommendations:product_views:flushing"
+    FLUSHING_LAST_SEEN_KEY = "recommendations:product_views:flushing:last_seen"
+    FLUSH_LOCK_KEY = "recommendations:product_views:flush_lock"
+
+    def __init__(self, batch_size: int = None):
+        self.batch_size = batch_size or getattr(settings, 'PRODUCT_VIEW_FLUSH_BATCH', 1000)
+
+    def _redis(self):
+        return get_redis_connection("default")
+
+    def record(self, user_id: Any, product_id: Any) -> None:
+        """Count one product view. Falls back to a direct upsert when Redis is unavailable"""
+        field = f"{user_id}:{product_id}"
+        seen = int(time.time())
+        try:
+            pipe = self._redis().pipeline(transaction=False)
+            pipe.hincrby(self.PENDING_KEY, field, 1)
+            pipe.hset(self.LAST_SEEN_KEY, field, seen)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Buffering product view failed, writing through: {str(e)}")
+            self._upsert([(field, 1, seen)])
+
+    def flush(self) -> Dict[str, int]:
+        """Move the pending counters into ProductView. Counters are swapped out atomically so views recorded
+        during a flush land in a fresh hash, and each batch is removed from Redis only after its upsert
+        commits, so a failed flush resumes where it stopped on the next run"""
+        client = self._redis()
+        stats = {"rows": 0, "views": 0, "skipped": 0, "batches": 0}
+
+        lock = client.lock(self.FLUSH_LOCK_KEY, timeout=300)
+        if not lock.acquire(blocking=False):
+            return stats
+
+        try:
+            # Leftovers from an interrupted flush are finished before new counters are swapped in
+            if not client.exists(self.FLUSHING_KEY) and client.exists(self.PENDING_KEY):
+                pipe = client.pipeline(transaction=True)
+                pipe.rename(self.PENDING_KEY, self.FLUSHING_KEY)
+                pipe.rename(self.LAST_SEEN_KEY, self.FLUSHING_LAST_SEEN_KEY)
+                pipe.execute()
+
+            cursor = 0
+            while True:
+                cursor, counters = client.hscan(self.FLUSHING_KEY, cursor, count=self.batch_size)
+                if counters:
+                    fields = list(counters.keys())
+                    last_seen = client.hmget(self.FLUSHING_LAST_SEEN_KEY, fields)
+                    batch = [
+                        (field.decode() if isinstance(field, bytes) else field, int(count), int(seen or time.time()))
+                        for (field, count), seen in zip(counters.items(), last_seen)
+                    ]
+                    written, views, skipped = self._upsert(batch)
+                    client.hdel(self.FLUSHING_KEY, *fields)
+                    client.hdel(self.FLUSHING_LAST_SEEN_KEY, *fields)
+                    stats["rows"] += written
+                    stats["views"] += views
+                    stats["skipped"] += skipped
+                    stats["batches"] += 1
+                if cursor == 0:
+                    break
+
+            client.delete(self.FLUSHING_KEY, self.FLUSHING_LAST_SEEN_KEY)
+        finally:
+            lock.release()
+
+        if stats["rows"]:
+            logger.info(f"Flushed product views: {stats}")
+        return stats
+
+    def _upsert(self, batch: List[Tuple[str, int, int]]) -> Tuple[int, int, int]:
+        """INSERT ... ON CONFLICT DO UPDATE adding the buffered counts to existing rows"""
+        parsed = []
+        for field, count, seen in batch:
+            user_id, _, product_id = field.partition(":")
+            parsed.append((user_id, product_id, count, seen))
+
+        # Drop counters for users or products deleted since the view was recorded
+        valid_users = {
+            str(pk)
+            for pk in CustomUser.objects.filter(
+                pk__in={int(row[0]) for row in parsed if row[0].isdigit()}
+            ).values_list("pk", flat=True)
+        }
+        valid_products = set()
+        for product_id in {row[1] for row in parsed}:
+            try:
+                valid_products.add(uuid.UUID(product_id))
+            except ValueError:
+                continue
+        valid_products = {
+            str(pk) for pk in Product.objects.filter(pk__in=valid_products).values_list("pk", flat=True)
+        }
+        rows = [row for row in parsed if row[0] in valid_users and row[1] in valid_products]
+        skipped = len(parsed) - len(rows)
+        if not rows:
+            return 0, 0, skipped
+
+        meta = ProductView._meta
+        id_field, user_field, product_field = meta.get_field("id"), meta.get_field("user"), meta.get_field("product")
+        last_viewed_field, created_field = meta.get_field("last_viewed"), meta.get_field("created_at")
+        table = connection.ops.quote_name(meta.db_table)
+        greatest = "GREATEST" if connection.vendor == "postgresql" else "MAX"
+
+        now = datetime.now(dt_timezone.utc)
+        params = []
+        for user_id, product_id, count, seen in rows:
+            params.extend([
+                id_field.get_db_prep_value(uuid.uuid4(), connection),
+                user_field.get_db_prep_value(int(user_id), connection),
+                product_field.get_db_prep_value(uuid.UUID(product_id), connection),
+                count,
+                last_viewed_field.get_db_prep_value(datetime.fromtimestamp(seen, dt_timezone.utc), connection),
+                created_field.get_db_prep_value(now, connection),
+            ])
+
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(rows))
+        sql = f"""
+            INSERT INTO {table} (id, user_id, product_id, view_count, last_viewed, created_at)
+            VALUES {placeholders}
+            ON CONFLICT (user_id, product_id) DO UPDATE SET
+                view_count = {table}.view_count + EXCLUDED.view_count,
+                last_viewed = {greatest}({table}.last_viewed, EXCLUDED.last_viewed)
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+        return len(rows), sum(row[2] for row in rows), skipped
+
+    def get_stats(self) -> Dict[str, int]:
+        client = self._redis()
+        return {
+            "pending_pairs": client.hlen(self.PENDING_KEY),
+            "flushing_pairs": client.hlen(self.FLUSHING_KEY),
+        }
+
+
+# Global instance
+product_view_counter = ProductViewCounter()
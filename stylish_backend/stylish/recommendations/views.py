@@ -1,3 +1,30 @@
-from django.shortcuts import render
+import logging
+import uuid
 
-# Create your views here.
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from authentication.core.base_view import BaseAPIView
+from authentication.core.response import standardized_response
+
+from .view_counter import product_view_counter
+
+logger = logging.getLogger(__name__)
+
+
+class ProductViewRecordView(BaseAPIView):
+    """Endpoint for recording a product view. Views are buffered and written to ProductView in batches"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        product_id = request.data.get('product_id')
+        try:
+            product_id = uuid.UUID(str(product_id))
+        except (TypeError, ValueError):
+            return Response(
+                standardized_response(success = False, error = "A valid product_id is required"), status = status.HTTP_400_BAD_REQUEST
+            )
+
+        product_view_counter.record(request.user.id, product_id)
+        return Response(standardized_response(success = True), status = status.HTTP_202_ACCEPTED)
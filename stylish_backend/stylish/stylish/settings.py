@@ -2,6 +2,7 @@ import os
 from decouple import config
 from pathlib import Path
 from datetime import timedelta
+from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryProfilerMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -184,6 +187,92 @@ CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'refresh-dirty-sales-rollups': {
+        'task': 'analytics.refresh_dirty_sales_rollups',
+        'schedule': 60.0,
+    },
+    'reconcile-sales-rollups': {
+        'task': 'analytics.reconcile_sales_rollups',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'reconcile-customer-stats': {
+        'task': 'analytics.reconcile_customer_stats',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    'build-similar-products': {
+        'task': 'recommendations.build_similar_products',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'build-user-preferences': {
+        'task': 'recommendations.build_user_preferences',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'sessionize-events': {
+        'task': 'analytics.sessionize_events',
+        'schedule': 300.0,
+    },
+    'merge-unique-counters': {
+        'task': 'analytics.merge_unique_counters',
+        'schedule': crontab(minute=5),
+    },
+    'materialize-daily-analytics': {
+        'task': 'analytics.materialize_daily_analytics',
+        'schedule': crontab(hour=2, minute=15),
+    },
+    'cleanup-chat-analytics': {
+        'task': 'ai_agents.cleanup_chat_analytics',
+        'schedule': crontab(hour=1, minute=30),
+    },
+    'manage-partitions': {
+        'task': 'core.manage_partitions',
+        'schedule': crontab(hour=1, minute=0),
+    },
+    'flush-product-views': {
+        'task': 'recommendations.flush_product_views',
+        'schedule': 30.0,
+    },
+}
+
+SALES_ROLLUP_RECONCILE_DAYS = int(os.getenv('SALES_ROLLUP_RECONCILE_DAYS', '7'))
+SALES_ROLLUP_DIRTY_BATCH = int(os.getenv('SALES_ROLLUP_DIRTY_BATCH', '100'))
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+PARTITION_EXPIRY_ACTION = os.getenv('PARTITION_EXPIRY_ACTION', 'archive')
+# Months of history kept attached per partitioned model; 0 keeps everything
+PARTITION_RETENTION_MONTHS = {
+    'analytics.AnalyticsEvent': int(os.getenv('ANALYTICS_EVENT_RETENTION_MONTHS', '0')),
+    'ai_agents.ChatMessage': int(os.getenv('CHAT_MESSAGE_RETENTION_MONTHS', '0')),
+    'inventory.StockAdjustment': int(os.getenv('STOCK_ADJUSTMENT_RETENTION_MONTHS', '0')),
+    'inventory.InventoryLog': int(os.getenv('INVENTORY_LOG_RETENTION_MONTHS', '0')),
+    'inventory.VariantStockLog': int(os.getenv('VARIANT_STOCK_LOG_RETENTION_MONTHS', '0')),
+}
+ANALYTICS_INGEST_MAX_BACKLOG = int(os.getenv('ANALYTICS_INGEST_MAX_BACKLOG', '1000000'))
+ANALYTICS_INGEST_BATCH_SIZE = int(os.getenv('ANALYTICS_INGEST_BATCH_SIZE', '5000'))
+ANALYTICS_INGEST_BLOCK_MS = int(os.getenv('ANALYTICS_INGEST_BLOCK_MS', '1000'))
+# Deliveries of a failing batch before its events are moved to the dead-letter stream
+ANALYTICS_INGEST_MAX_DELIVERIES = int(os.getenv('ANALYTICS_INGEST_MAX_DELIVERIES', '5'))
+ANALYTICS_SESSION_GAP_MINUTES = int(os.getenv('ANALYTICS_SESSION_GAP_MINUTES', '30'))
+ANALYTICS_SESSIONIZE_BATCH_SIZE = int(os.getenv('ANALYTICS_SESSIONIZE_BATCH_SIZE', '2000'))
+ANALYTICS_SESSIONIZE_DELAY_SECONDS = int(os.getenv('ANALYTICS_SESSIONIZE_DELAY_SECONDS', '120'))
+# Days the distinct-user HyperLogLogs are kept, by period (d = day, w = week, m = month)
+ANALYTICS_UNIQUES_RETENTION_DAYS = {
+    'd': int(os.getenv('ANALYTICS_UNIQUES_DAILY_RETENTION_DAYS', '40')),
+    'w': int(os.getenv('ANALYTICS_UNIQUES_WEEKLY_RETENTION_DAYS', '120')),
+    'm': int(os.getenv('ANALYTICS_UNIQUES_MONTHLY_RETENTION_DAYS', '400')),
+}
+ANALYTICS_MATERIALIZE_DAYS = int(os.getenv('ANALYTICS_MATERIALIZE_DAYS', '2'))
+ANALYTICS_MATERIALIZE_CHUNK_DAYS = int(os.getenv('ANALYTICS_MATERIALIZE_CHUNK_DAYS', '31'))
+CUSTOMER_HIGH_VALUE_SPEND = float(os.getenv('CUSTOMER_HIGH_VALUE_SPEND', '1000'))
+CUSTOMER_FREQUENT_ORDERS = int(os.getenv('CUSTOMER_FREQUENT_ORDERS', '5'))
+CUSTOMER_AT_RISK_DAYS = int(os.getenv('CUSTOMER_AT_RISK_DAYS', '90'))
+CUSTOMER_NEW_DAYS = int(os.getenv('CUSTOMER_NEW_DAYS', '30'))
+RECOMMENDATION_SIMILARITY_METRIC = os.getenv('RECOMMENDATION_SIMILARITY_METRIC', 'cosine')
+RECOMMENDATION_TOP_K = int(os.getenv('RECOMMENDATION_TOP_K', '20'))
+RECOMMENDATION_MIN_CO_PURCHASES = int(os.getenv('RECOMMENDATION_MIN_CO_PURCHASES', '2'))
+RECOMMENDATION_LOOKBACK_DAYS = int(os.getenv('RECOMMENDATION_LOOKBACK_DAYS', '0')) or None
+USER_PREFERENCE_HALF_LIFE_DAYS = float(os.getenv('USER_PREFERENCE_HALF_LIFE_DAYS', '30'))
+USER_PREFERENCE_LOOKBACK_DAYS = int(os.getenv('USER_PREFERENCE_LOOKBACK_DAYS', '180')) or None
+PRODUCT_VIEW_FLUSH_BATCH = int(os.getenv('PRODUCT_VIEW_FLUSH_BATCH', '1000'))
 
 FRONTEND_URL ='http://127.0.0.1/api'
 
@@ -259,7 +348,35 @@ CHAT_MAX_QUERY_LENGTH = int(os.getenv('CHAT_MAX_QUERY_LENGTH', '1000'))
 OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '30.0'))
 OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '3'))
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+CHAT_LOCAL_INTENT_ENABLED = os.getenv('CHAT_LOCAL_INTENT_ENABLED', 'True') == 'True'
+CHAT_LOCAL_INTENT_THRESHOLD = float(os.getenv('CHAT_LOCAL_INTENT_THRESHOLD', '0.6'))
+CHAT_LOCAL_INTENT_RETRAIN_INTERVAL = int(os.getenv('CHAT_LOCAL_INTENT_RETRAIN_INTERVAL', '3600'))
+CHAT_TOOL_CALL_TIMEOUT = float(os.getenv('CHAT_TOOL_CALL_TIMEOUT', '20.0'))
+MCP_DB_POOL_SIZE = int(os.getenv('MCP_DB_POOL_SIZE', '8'))
+CHAT_POST_PROCESS_TIMEOUT = float(os.getenv('CHAT_POST_PROCESS_TIMEOUT', '2.0'))
+CHAT_POST_PROCESS_CONCURRENCY = int(os.getenv('CHAT_POST_PROCESS_CONCURRENCY', '3'))
 CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_FAILURE_THRESHOLD', '5'))
 CIRCUIT_BREAKER_RECOVERY_TIMEOUT = int(os.getenv('CIRCUIT_BREAKER_RECOVERY_TIMEOUT', '60'))
 REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '20'))
+CHAT_ANALYTICS_RETENTION_DAYS = int(os.getenv('CHAT_ANALYTICS_RETENTION_DAYS', '30'))
+CHAT_ANALYTICS_CLEANUP_BATCH = int(os.getenv('CHAT_ANALYTICS_CLEANUP_BATCH', '500'))
+# Bearer token required by the /metrics/ endpoint; leave empty to rely on network-level access control
+METRICS_AUTH_TOKEN = config('METRICS_AUTH_TOKEN', default = '')
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'True') == 'True'
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', '1.0'))
+# OTLP/JSON lines file that sampled traces are appended to; empty keeps timings on messages only
+TRACING_EXPORT_PATH = os.getenv('TRACING_EXPORT_PATH', '')
+TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'stylish-backend')
+QUERY_PROFILER_ENABLED = os.getenv('QUERY_PROFILER_ENABLED', 'True') == 'True'
+# Requests sending QUERY_PROFILER_HEADER with this value get the SQL profile in X-Query-* response headers.
+# Empty allows any truthy header value in DEBUG only, since the headers expose SQL
+QUERY_PROFILER_HEADER = os.getenv('QUERY_PROFILER_HEADER', 'X-Profile-Queries')
+QUERY_PROFILER_TOKEN = config('QUERY_PROFILER_TOKEN', default = '')
+# Fraction of all requests profiled silently and checked against the budgets below
+QUERY_PROFILER_SAMPLE_RATE = float(os.getenv('QUERY_PROFILER_SAMPLE_RATE', '0.01'))
+QUERY_BUDGET_QUERIES = int(os.getenv('QUERY_BUDGET_QUERIES', '50'))
+QUERY_BUDGET_DB_MS = float(os.getenv('QUERY_BUDGET_DB_MS', '500'))
+QUERY_BUDGET_DUPLICATES = int(os.getenv('QUERY_BUDGET_DUPLICATES', '10'))
+# Per route prefix overrides, e.g. {'api/analytics/': {'queries': 100, 'db_ms': 2000}}
+QUERY_BUDGET_ROUTES = {}
 
@@ -8,4 +8,7 @@ urlpatterns = [
     path('api/auth/', include('authentication.urls')),
     path('api/admin/', include('admin_dashboard.urls')),
     path('api/agents/', include('ai_agents.urls')),
+    path('api/recommendations/', include('recommendations.urls')),
+    path('api/analytics/', include('analytics.urls')),
+    path('metrics/', include('core.urls')),
 ] + static(settings.MEDIA_URL, document_root = settings.MEDIA_ROOT)